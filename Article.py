@@ -6,15 +6,21 @@ An Article object that holds information about a scientific article obtained
 from the Internet.
 
 @author: Alek
-@version: 1.0.0
+@version: 1.1.0
 @since: Sat Oct  3 13:06:06 2015
 
 CHANGELOG:
 Sat Oct  3 13:06:06 2015 - 1.0.0 - Alek - Issued the first version based on a class previously defined elsewhere.
+Sun Oct 18 17:40:12 2026 - 1.1.0 - Alek - Declared all the attributes in __slots__, including the ones
+                                          set by GoogleScholarSearch, to save memory.
 """
 
 class Article(object):
-    def __init__(self, title, authorList, year, journal, doi="", volume=-1, number=-1, tagList=[], abstract="", citeULikeID=-1):
+    __slots__ = ('CiteULikeID', 'Title', 'Authors', 'Year', 'Journal', 'DOI', 'Vol', 'No', 'Keywords', 'Abstract',
+                 'fullURL', 'pubURL', 'citingArticlesURL', 'relatedArticlesURL', 'pubNoCitations')
+
+    def __init__(self, title, authorList, year, journal, doi="", volume=-1, number=-1, tagList=None, abstract="", citeULikeID=-1,
+                 fullURL="Unavailable", pubURL="", citingArticlesURL="", relatedArticlesURL="", pubNoCitations=0):
         """ Initialise an Article class that holds the information about a scientific
         article.
         
@@ -30,6 +36,11 @@ class Article(object):
         tagList - list of str with keywords of the article.
         abstract - str with the abstract of the article.
         citeULikeID - int with the ID from CiteULike.org.
+        fullURL - str with a link to the full text in HTML/PDF format.
+        pubURL - str with a link to the publicly available version of the article.
+        citingArticlesURL - str with a link to the Google Scholar page with articles citing this one.
+        relatedArticlesURL - str with a link to the Google Scholar page with articles related to this one.
+        pubNoCitations - int with the number of times the article has been cited.
         
         Guaranteed Attributes
         ----------
@@ -48,6 +59,11 @@ class Article(object):
         Keywords - list of str with keywords of the article; empty list if unknown.
         Abstract - str with the abstract of the article; empty string if unkown.
         CiteULikeID - int with the ID from CiteULike.org.
+        fullURL - str with a link to the full text; "Unavailable" if unknown.
+        pubURL - str with a link to the public version; empty string if unknown.
+        citingArticlesURL - str with a link to the citing articles; empty string if unknown.
+        relatedArticlesURL - str with a link to the related articles; empty string if unknown.
+        pubNoCitations - int with the number of citations; 0 if unknown.
         """
         self.CiteULikeID = citeULikeID
         self.Title = title
@@ -57,8 +73,21 @@ class Article(object):
         self.DOI = doi
         self.Vol = volume
         self.No = number
-        self.Keywords = tagList
+        self.Keywords = [] if tagList is None else tagList # Don't share a default list between instances.
         self.Abstract = abstract
+        self.fullURL = fullURL
+        self.pubURL = pubURL
+        self.citingArticlesURL = citingArticlesURL
+        self.relatedArticlesURL = relatedArticlesURL
+        self.pubNoCitations = pubNoCitations
+
+    def __getstate__(self):
+        """ Objects with __slots__ have no __dict__ to pickle, give the values instead. """
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
         
     def __str__(self):
         return "{}, {} ({})".format(self.Authors, self.Title, self.Year)
\ No newline at end of file
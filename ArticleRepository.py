@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:41:26 2026
+
+Keep the Articles we've downloaded in an SQLite database, so they can be analysed
+again without scraping them again. An article is identified by its DOI or, if it
+hasn't got one, by the hash of its normalised title together with its year and
+journal, where they're known; storing an article that's
+already there merges the two instead of adding a copy. The articles are written
+in batches, each in a single transaction, and read back one by one.
+
+Running this file times writing and reading synthetic articles.
+
+@author: Alek
+@version: 1.0.1
+@since: Sun Oct 18 20:41:26 2026
+
+CHANGELOG:
+Sun Oct 18 20:41:26 2026 - 1.0.0 - Alek - Issued the first version.
+                         - 1.0.1 - Alek - Don't merge articles with the same title but different years or journals.
+"""
+import sqlite3, hashlib
+import Article
+from ArticleStore import asInt
+from RecordLinkage import normalise, surname
+
+Schema = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    doi TEXT,
+    titleHash INTEGER NOT NULL,
+    title TEXT, year INTEGER, journal TEXT, volume, number,
+    abstract TEXT, citeULikeID INTEGER, fullURL TEXT, pubURL TEXT,
+    citingArticlesURL TEXT, relatedArticlesURL TEXT, pubNoCitations INTEGER);
+CREATE UNIQUE INDEX IF NOT EXISTS articlesDOI ON articles(doi) WHERE doi IS NOT NULL;
+CREATE INDEX IF NOT EXISTS articlesTitleHash ON articles(titleHash); -- Serves as the index of the normalised titles.
+CREATE INDEX IF NOT EXISTS articlesYear ON articles(year);
+CREATE TABLE IF NOT EXISTS authors (
+    articleID INTEGER NOT NULL, position INTEGER NOT NULL, name TEXT, surname TEXT,
+    PRIMARY KEY (articleID, position)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS authorsSurname ON authors(surname);
+CREATE TABLE IF NOT EXISTS keywords (
+    articleID INTEGER NOT NULL, keyword TEXT NOT NULL,
+    PRIMARY KEY (articleID, keyword)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS keywordsKeyword ON keywords(keyword);
+"""
+Columns = ['doi', 'titleHash', 'title', 'year', 'journal', 'volume', 'number', 'abstract', 'citeULikeID',
+           'fullURL', 'pubURL', 'citingArticlesURL', 'relatedArticlesURL', 'pubNoCitations'] # Of the articles table, apart from the id.
+Unknown = set([None, "", -1, "Unavailable", "Abstract unavailable"]) # Values that don't overwrite known ones when merging.
+Separator = u"\x1f" # Between the authors and keywords read in one go, can't appear in them.
+MaxParameters = 900 # SQLite can't take more than 999 parameters in one statement.
+
+def normaliseDOI(doi):
+    """ Get the DOI in lower case without the resolver's address, None if there isn't one. """
+    doi = (doi or "").strip().lower()
+    for prefix in ("http://dx.doi.org/", "https://doi.org/", "doi:"):
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+    return doi or None
+
+def titleHash(title):
+    """ Hash of the normalised title, identifies articles without a DOI; a 60-bit
+    int, so its index is smaller and faster than one of the titles would be.
+    """
+    return int(hashlib.sha1(normalise(title).encode('utf-8')).hexdigest()[:15], 16)
+
+def articleRow(article):
+    """ Get the values of the Columns of article. """
+    return [normaliseDOI(article.DOI), titleHash(article.Title), article.Title, asInt(article.Year),
+            article.Journal, article.Vol, article.No, article.Abstract, asInt(article.CiteULikeID), article.fullURL,
+            article.pubURL, article.citingArticlesURL, article.relatedArticlesURL, asInt(article.pubNoCitations, 0)]
+
+def sameArticle(old, new):
+    """ Check if two rows with the same normalised title can be of the same article,
+    i.e. their DOIs, years and journals don't differ where both of them are known.
+    """
+    for i in (0, 3): # DOI and year.
+        if not old[i] in Unknown and not new[i] in Unknown and old[i] != new[i]:
+            return False
+    return old[4] in Unknown or new[4] in Unknown or normalise(old[4]) == normalise(new[4])
+
+def mergeRows(old, new):
+    """ Merge two rows of the same article: known values of new replace those of
+    old, unknown ones don't, and the larger number of citations is kept.
+    """
+    merged = [n if not n in Unknown else o for o, n in zip(old, new)]
+    merged[-1] = max(old[-1], new[-1])
+    return merged
+
+class ArticleRepository(object):
+    """ Articles stored in an SQLite database file. Only one process should write
+    to a repository at a time.
+
+    Example
+    ----------
+    <tt>
+    > repository = ArticleRepository("articles.db")\n
+    > repository.upsert(engine.getCitingArticles(url, 5000, terms))\n
+    > for article in repository.iterArticles(years=(2000, 2010), author="Langmuir"):\n
+    >     print article\n
+    > repository.close()
+    </tt>
+    """
+    def __init__(self, path, batchSize=5000):
+        """ Open the database, create it if it doesn't exist.
+
+        Arguments
+        ----------
+        @param path - str with the path of the database file, ":memory:" for a
+            database that isn't saved.
+        @param batchSize - int, number of articles written in one transaction (default=5000).
+        """
+        self.path = path
+        self.batchSize = batchSize
+        self.connection = sqlite3.connect(path)
+        self.connection.text_factory = unicode
+        self.connection.execute("PRAGMA journal_mode=WAL") # Readers don't block the writer.
+        self.connection.execute("PRAGMA synchronous=NORMAL") # Still safe with WAL, much faster commits.
+        self.connection.execute("PRAGMA cache_size=-65536") # 64 MB, keeps the indices in memory while writing.
+        self.connection.executescript(Schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT count(*) FROM articles").fetchone()[0]
+
+    def upsert(self, articles):
+        """ Store articles, merging them with the ones already stored that have the
+        same DOI or, without a DOI, the same normalised title and no different
+        year or journal, @see sameArticle.
+
+        Arguments
+        ----------
+        @param articles - iterable of Article.Articles.
+
+        Returns
+        ----------
+        @return tuple of (int number of articles added, int number merged into existing ones).
+        """
+        nAdded, nMerged, batch = 0, 0, []
+        for article in articles:
+            batch.append(article)
+            if len(batch) == self.batchSize:
+                added, merged = self.upsertBatch(batch)
+                nAdded, nMerged, batch = nAdded+added, nMerged+merged, []
+        if batch:
+            added, merged = self.upsertBatch(batch)
+            nAdded, nMerged = nAdded+added, nMerged+merged
+        return nAdded, nMerged
+
+    def upsertBatch(self, articles):
+        """ Store a list of articles in one transaction, @see upsert. """
+        rows = [articleRow(article) for article in articles]
+        with self.connection: # Commits at the end, rolls back on errors.
+            cursor = self.connection.cursor()
+            " Look up all the articles that may already be stored at once. "
+            existing = {} # id : row.
+            byDOI, byHash = {}, {} # DOI : id, title hash : list of ids.
+            for column, keys, index in [('doi', set(r[0] for r in rows if r[0] is not None), byDOI),
+                                        ('titleHash', set(r[1] for r in rows), byHash)]:
+                keys = list(keys)
+                for start in xrange(0, len(keys), MaxParameters):
+                    chunk = keys[start:start+MaxParameters]
+                    for row in cursor.execute("SELECT id, {} FROM articles WHERE {} IN ({})".format(
+                            ", ".join(Columns), column, ",".join("?"*len(chunk))), chunk):
+                        existing[row[0]] = list(row[1:])
+                        if index is byDOI:
+                            byDOI[row[1]] = row[0]
+                        else:
+                            byHash.setdefault(row[2], []).append(row[0])
+
+            " Merge the articles with the stored ones and with each other. "
+            nextID = (cursor.execute("SELECT max(id) FROM articles").fetchone()[0] or 0) + 1
+            added, merged = [], set()
+            authors, keywords = {}, {} # id : list of str, to be written.
+            for article, row in zip(articles, rows):
+                articleID = byDOI.get(row[0])
+                if articleID is None: # The same title is enough unless the DOIs, years or journals differ.
+                    articleID = next((i for i in byHash.get(row[1], []) if sameArticle(existing[i], row)), None)
+                if articleID is None:
+                    articleID, nextID = nextID, nextID+1
+                    existing[articleID] = row
+                    added.append(articleID)
+                    byHash.setdefault(row[1], []).append(articleID)
+                else:
+                    existing[articleID] = mergeRows(existing[articleID], row)
+                    merged.add(articleID)
+                if row[0] is not None:
+                    byDOI[row[0]] = articleID
+                if article.Authors:
+                    authors[articleID] = article.Authors
+                keywords.setdefault(articleID, set()).update(article.Keywords)
+
+            " Write everything. "
+            cursor.executemany("INSERT INTO articles (id, {}) VALUES (?, {})".format(", ".join(Columns), ",".join("?"*len(Columns))),
+                               ([i] + existing[i] for i in added))
+            updated = merged.difference(added)
+            cursor.executemany("UPDATE articles SET {} WHERE id = ?".format(", ".join(c+" = ?" for c in Columns)),
+                               (existing[i] + [i] for i in updated))
+            cursor.executemany("DELETE FROM authors WHERE articleID = ?", ([i] for i in authors if i in updated))
+            surnames = {} # The same authors come up many times.
+            for names in authors.itervalues():
+                for name in names:
+                    if not name in surnames:
+                        surnames[name] = surname(name)
+            cursor.executemany("INSERT INTO authors VALUES (?, ?, ?, ?)",
+                               ((i, position, name, surnames[name])
+                                for i, names in authors.iteritems() for position, name in enumerate(names)))
+            cursor.executemany("INSERT OR IGNORE INTO keywords VALUES (?, ?)",
+                               ((i, keyword) for i, words in keywords.iteritems() for keyword in words))
+        return len(added), len(articles)-len(added)
+
+    def iterArticles(self, years=None, doi=None, title=None, author=None, keyword=None, orderBy="id"):
+        """ Go through the stored articles that meet all the given criteria, one by
+        one, without reading all of them into memory.
+
+        Arguments
+        ----------
+        @param years - tuple of (int, int) with the first and last year, either can
+            be None to have no limit; any year if None (default).
+        @param doi - str, the DOI of the article.
+        @param title - str, the title of the article, compared after normalising it.
+        @param author - str, name of one of the authors; only the surname is compared,
+            e.g. "I. Langmuir" finds "Irving Langmuir".
+        @param keyword - str, one of the keywords of the article.
+        @param orderBy - str, column of the articles to order them by (default="id",
+            i.e. in the order they were first stored).
+
+        Returns
+        ----------
+        @return generator of Article.Articles.
+        """
+        conditions, parameters = [], []
+        if years is not None and years[0] is not None:
+            conditions.append("a.year >= ?")
+            parameters.append(years[0])
+        if years is not None and years[1] is not None:
+            conditions.append("a.year <= ?")
+            parameters.append(years[1])
+        if doi is not None:
+            conditions.append("a.doi = ?")
+            parameters.append(normaliseDOI(doi))
+        if title is not None:
+            conditions.append("a.titleHash = ?")
+            parameters.append(titleHash(title))
+        if author is not None:
+            conditions.append("a.id IN (SELECT articleID FROM authors WHERE surname = ?)")
+            parameters.append(surname(author))
+        if keyword is not None:
+            conditions.append("a.id IN (SELECT articleID FROM keywords WHERE keyword = ?)")
+            parameters.append(keyword)
+        if not orderBy in ['id'] + Columns:
+            raise ValueError("Can't order by {}.".format(orderBy))
+        return self.query(" AND ".join(conditions) or "1", parameters, orderBy)
+
+    def query(self, where, parameters=(), orderBy="id"):
+        """ Go through the stored articles that satisfy an SQL condition on the
+        columns of the articles table, aliased as a, @see iterArticles.
+
+        Returns
+        ----------
+        @return generator of Article.Articles.
+        """
+        cursor = self.connection.cursor()
+        cursor.arraysize = 1000
+        cursor.execute("""SELECT a.title, a.year, a.journal, a.doi, a.volume, a.number, a.abstract, a.citeULikeID,
+                                 a.fullURL, a.pubURL, a.citingArticlesURL, a.relatedArticlesURL, a.pubNoCitations,
+                                 (SELECT group_concat(name, char(31)) FROM (SELECT name FROM authors WHERE articleID = a.id ORDER BY position)),
+                                 (SELECT group_concat(keyword, char(31)) FROM keywords WHERE articleID = a.id)
+                          FROM articles AS a WHERE {} ORDER BY a.{}""".format(where, orderBy), parameters)
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                return
+            for (title, year, journal, doi, volume, number, abstract, citeULikeID, fullURL, pubURL,
+                 citingArticlesURL, relatedArticlesURL, pubNoCitations, authors, keywords) in rows:
+                yield Article.Article(title, authors.split(Separator) if authors else [], year, journal,
+                                      doi=doi or "", volume=volume, number=number,
+                                      tagList=keywords.split(Separator) if keywords else [], abstract=abstract,
+                                      citeULikeID=citeULikeID, fullURL=fullURL, pubURL=pubURL,
+                                      citingArticlesURL=citingArticlesURL, relatedArticlesURL=relatedArticlesURL,
+                                      pubNoCitations=pubNoCitations)
+
+if __name__ == '__main__':
+    import sys, time, random, os, tempfile
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(0)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10))) for _ in range(20000)]
+    articles = [Article.Article(" ".join(rng.choice(words) for _ in range(8)).capitalize(),
+                                ["{}. {}".format(rng.choice("ABCDEFGH"), rng.choice(words).capitalize()) for _ in range(3)],
+                                rng.randint(1900, 2015), "Journal of {}".format(rng.choice(words[:500]).capitalize()),
+                                doi="10.1000/{}".format(i) if i % 2 else "", tagList=rng.sample(words[:200], 2),
+                                abstract=" ".join(rng.choice(words) for _ in range(100)), pubNoCitations=rng.randint(0, 1000))
+                for i in range(n)]
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "articles.db")
+    with ArticleRepository(path) as repository:
+        start = time.time()
+        added, merged = repository.upsert(articles)
+        elapsed = time.time()-start
+        print "Added {} articles in {:.2f} s, {:.0f} articles/s.".format(added, elapsed, n/elapsed)
+        start = time.time()
+        added, merged = repository.upsert(articles[::2])
+        elapsed = time.time()-start
+        print "Merged {} articles again in {:.2f} s, {:.0f} articles/s, {} stored.".format(merged, elapsed, merged/elapsed, len(repository))
+        start = time.time()
+        nRead = sum(1 for article in repository.iterArticles(years=(1950, 2000)))
+        elapsed = time.time()-start
+        print "Read {} articles from 1950-2000 in {:.2f} s, {:.0f} articles/s.".format(nRead, elapsed, nRead/elapsed)
+        start = time.time()
+        found = list(repository.iterArticles(author=articles[0].Authors[0]))
+        print "Found {} articles of {} in {:.1f} ms.".format(len(found), articles[0].Authors[0], 1e3*(time.time()-start))
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:05:44 2026
+
+A compact collection of many Articles that keeps every attribute in its own
+column instead of keeping many Article objects. Numbers sit in arrays, strings
+that repeat a lot (authors, journals, keywords) are stored once and referred to
+by their index. Articles are only made when they're asked for.
+
+@author: Alek
+@version: 1.0.0
+@since: Sun Oct 18 18:05:44 2026
+
+CHANGELOG:
+Sun Oct 18 18:05:44 2026 - 1.0.0 - Alek - Issued the first version.
+"""
+import array
+import numpy
+import Article
+
+class StringPool(object):
+    """ Keeps every distinct string once and gives it an int index. """
+    def __init__(self):
+        self.strings = []
+        self.indices = {}
+
+    def add(self, string):
+        """ Get the index of string, add it to the pool if it's not there yet. """
+        index = self.indices.get(string)
+        if index is None:
+            index = self.indices[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+    def __getitem__(self, index):
+        return self.strings[index]
+
+    def __len__(self):
+        return len(self.strings)
+
+def asInt(value, default=-1):
+    """ Get value as an int or default if it isn't one, e.g. an unknown year. """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+class ArticleStore(object):
+    """ Holds many Articles column by column.
+
+    Numeric attributes (Year, Vol, No, pubNoCitations, CiteULikeID) have to be
+    integers, anything else is stored as -1.
+
+    Example
+    ----------
+    <tt>
+    > store = ArticleStore(engine.getCitingArticles(url, 5000, terms))\n
+    > for article in store.articles(store.filter(years=(2000, 2010), citations=(100, None))):\n
+    >     print article
+    </tt>
+    """
+    def __init__(self, articles=()):
+        """ Make a store, optionally with some Articles already in it.
+
+        Arguments
+        ----------
+        @param articles - iterable of Article.Articles to add.
+        """
+        " Numbers. "
+        self.years = array.array('i')
+        self.volumes = array.array('i')
+        self.numbers = array.array('i')
+        self.citations = array.array('i')
+        self.citeULikeIDs = array.array('l')
+        " Strings that are mostly different for every article. "
+        self.titles = []
+        self.dois = []
+        self.abstracts = []
+        self.fullURLs = []
+        self.pubURLs = []
+        self.citingArticlesURLs = []
+        self.relatedArticlesURLs = []
+        " Strings that repeat, stored as indices in self.strings. "
+        self.strings = StringPool()
+        self.journals = array.array('i')
+        self.authors = array.array('i') # Authors of all the articles one after another...
+        self.authorStarts = array.array('l', [0]) # ...those of article i are authors[authorStarts[i]:authorStarts[i+1]].
+        self.keywords = array.array('i') # Same for the keywords.
+        self.keywordStarts = array.array('l', [0])
+        self.extend(articles)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def append(self, article):
+        """ Add an Article.Article to the store. """
+        self.years.append(asInt(article.Year))
+        self.volumes.append(asInt(article.Vol))
+        self.numbers.append(asInt(article.No))
+        self.citations.append(asInt(article.pubNoCitations))
+        self.citeULikeIDs.append(asInt(article.CiteULikeID))
+        self.titles.append(article.Title)
+        self.dois.append(article.DOI)
+        self.abstracts.append(article.Abstract)
+        self.fullURLs.append(article.fullURL)
+        self.pubURLs.append(article.pubURL)
+        self.citingArticlesURLs.append(article.citingArticlesURL)
+        self.relatedArticlesURLs.append(article.relatedArticlesURL)
+        self.journals.append(self.strings.add(article.Journal))
+        self.authors.extend(self.strings.add(author) for author in article.Authors)
+        self.authorStarts.append(len(self.authors))
+        self.keywords.extend(self.strings.add(keyword) for keyword in article.Keywords)
+        self.keywordStarts.append(len(self.keywords))
+
+    def extend(self, articles):
+        """ Add many Article.Articles to the store. """
+        for article in articles:
+            self.append(article)
+
+    def __getitem__(self, i):
+        """ Make the Article.Article with index i. """
+        if i < 0:
+            i += len(self)
+        strings = self.strings.strings
+        return Article.Article(self.titles[i],
+                               [strings[a] for a in self.authors[self.authorStarts[i]:self.authorStarts[i+1]]],
+                               self.years[i], strings[self.journals[i]], doi=self.dois[i],
+                               volume=self.volumes[i], number=self.numbers[i],
+                               tagList=[strings[k] for k in self.keywords[self.keywordStarts[i]:self.keywordStarts[i+1]]],
+                               abstract=self.abstracts[i], citeULikeID=self.citeULikeIDs[i],
+                               fullURL=self.fullURLs[i], pubURL=self.pubURLs[i],
+                               citingArticlesURL=self.citingArticlesURLs[i],
+                               relatedArticlesURL=self.relatedArticlesURLs[i],
+                               pubNoCitations=self.citations[i])
+
+    def __iter__(self):
+        return self.articles()
+
+    def articles(self, indices=None):
+        """ Make the Article.Articles one by one.
+
+        Arguments
+        ----------
+        @param indices - iterable of int with the indices of the articles to make,
+            e.g. from filter; all of them if None (default).
+
+        Returns
+        ----------
+        @return generator of Article.Articles.
+        """
+        for i in (xrange(len(self)) if indices is None else indices):
+            yield self[int(i)]
+
+    def column(self, name):
+        """ Get a copy of a numeric column (years, volumes, numbers, citations or
+        citeULikeIDs) as a numpy array. It's a copy because the array may move in
+        memory when more articles are appended.
+        """
+        values = getattr(self, name)
+        if len(values) == 0:
+            return numpy.zeros(0, dtype='i{}'.format(values.itemsize))
+        return numpy.frombuffer(values, dtype='i{}'.format(values.itemsize)).copy()
+
+    def filter(self, years=None, citations=None):
+        """ Find the articles published in a range of years and cited a given
+        number of times.
+
+        Arguments
+        ----------
+        @param years - tuple of (int, int) with the first and last year to accept,
+            either can be None to have no limit; all the years if None (default).
+        @param citations - tuple of (int, int) with the minimum and maximum number
+            of citations, either can be None; any number if None (default).
+
+        Returns
+        ----------
+        @return numpy array of int with the indices of the matching articles.
+        """
+        mask = numpy.ones(len(self), dtype=bool)
+        for name, limits in [('years', years), ('citations', citations)]:
+            if limits is None:
+                continue
+            values = self.column(name)
+            if limits[0] is not None:
+                mask &= values >= limits[0]
+            if limits[1] is not None:
+                mask &= values <= limits[1]
+        return numpy.flatnonzero(mask)
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:04:15 2026
+
+Benchmarks of parsing and downloading that run off-line, so that the effect of
+every change on speed can be measured and compared between commits.
+
+The pages come from a corpus in a directory (fixtures by default): Google Scholar
+and CiteULike.org results pages and pages of a link graph. It's made of synthetic
+pages the first time it's needed; real pages can be recorded into it with --record.
+StandInServer replays the corpus with a given latency and rate of errors.
+
+Running this file runs all the benchmarks and prints the results as JSON, or
+saves them with --output. --compare checks them against earlier results and
+reports what got slower.
+
+@author: Alek
+@version: 1.2.0
+@since: Sun Oct 18 22:04:15 2026
+
+CHANGELOG:
+Sun Oct 18 22:04:15 2026 - 1.0.0 - Alek - Issued the first version.
+                         - 1.1.0 - Alek - Bytes and time saved by compressing the Google Scholar pages.
+                         - 1.2.0 - Alek - Harvest with the pages parsed in parser processes.
+"""
+import os, sys, json, time, hashlib, platform, subprocess, multiprocessing
+import StandInServer, GoogleScholarSearch, DownloadArticles, netWorm, Metrics
+
+Kinds = ['scholar', 'citeulike', 'links'] # Kinds of pages in the corpus.
+CitedURL = "/scholar?cites=1000&hl=en" # Synthetic article whose citing articles' pages are in the corpus.
+CiteULikeQuery = (["langmuir"], ["probe"], 1900, 2015, "", "none") # Synthetic search whose results pages are in the corpus.
+
+def loadIndex(directory):
+    """ Get the index of the corpus in directory, an empty one if there's no corpus yet. """
+    try:
+        with open(os.path.join(directory, "index.json")) as f:
+            return json.load(f)
+    except IOError:
+        return {'pages': {}, 'nCitations': 0, 'pageSize': 20, 'nCiteULikePages': 0, 'nLinkPages': 0}
+
+def saveIndex(directory, index):
+    with open(os.path.join(directory, "index.json"), 'w') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+
+def addPage(directory, index, kind, url, body, replace=True):
+    """ Save body as the page at url (only its path and query matter) of the given
+    kind, unless replace is False and the corpus has that page already.
+    """
+    key = StandInServer.replayKey(url)
+    if not replace and key in index['pages']:
+        return
+    fileName = os.path.join(kind, hashlib.sha1(key).hexdigest()[:16]+".html")
+    if not os.path.isdir(os.path.join(directory, kind)):
+        os.makedirs(os.path.join(directory, kind))
+    with open(os.path.join(directory, fileName), 'wb') as f:
+        f.write(body)
+    index['pages'][key] = {'kind': kind, 'file': fileName}
+
+def makeCorpus(directory, nCitations=400, pageSize=20, nCiteULikePages=5, nLinkPages=500):
+    """ Fill directory with a synthetic corpus: all the pages of the articles citing
+    CitedURL, all the pages of the CiteULikeQuery results and a link graph. Pages
+    recorded there before are kept.
+    """
+    index = loadIndex(directory)
+    engine = GoogleScholarSearch.GoogleScholarSearchEngine() # Only to make the URLs of the pages.
+    for start in range(0, nCitations, pageSize):
+        addPage(directory, index, 'scholar', engine.getResultPageURL(CitedURL, start, pageSize),
+                StandInServer.scholarPage(start, pageSize, nCitations), replace=False)
+    for pageNo in range(1, nCiteULikePages+2): # The last one is empty, that's where the search stops.
+        addPage(directory, index, 'citeulike', DownloadArticles.getSearchURLCiteULike(pageNo, *CiteULikeQuery),
+                StandInServer.citeULikePage(pageNo, 50 if pageNo <= nCiteULikePages else 0), replace=False)
+    for n in range(nLinkPages):
+        addPage(directory, index, 'links', "/page/{}".format(n), StandInServer.linkGraphPage(n, nLinkPages, 10), replace=False)
+    index.update({'nCitations': nCitations, 'pageSize': pageSize, 'nCiteULikePages': nCiteULikePages, 'nLinkPages': nLinkPages})
+    saveIndex(directory, index)
+
+def recordPage(directory, url, kind):
+    """ Download the page at url and add it to the corpus in directory. """
+    index = loadIndex(directory)
+    body = netWorm.fetchPage(url, netWorm.hdrs, 30)
+    addPage(directory, index, kind, url, body)
+    saveIndex(directory, index)
+
+def loadCorpus(directory):
+    """ Read all the pages of the corpus in directory, add the synthetic pages to
+    it first if they aren't there, e.g. if only recorded pages are.
+
+    Returns
+    ----------
+    @return tuple of (dict of kind : list of str with the bodies of the pages,
+        dict of the replay key of every page : its body, dict with the index).
+    """
+    index = loadIndex(directory)
+    if not (index['nCitations'] and index['nCiteULikePages'] and index['nLinkPages']): # The benchmarks need all of them.
+        makeCorpus(directory)
+        index = loadIndex(directory)
+    byKind, byKey = dict((kind, []) for kind in Kinds), {}
+    for key in sorted(index['pages']):
+        page = index['pages'][key]
+        with open(os.path.join(directory, page['file']), 'rb') as f:
+            body = f.read()
+        byKind.setdefault(page['kind'], []).append(body)
+        byKey[key] = body
+    return byKind, byKey, index
+
+def timeParsers(pages, parse, repeats):
+    """ Best time in seconds of parsing all the pages with parse, repeats times. """
+    best = float('inf')
+    for r in range(repeats):
+        start = time.time()
+        for page in pages:
+            parse(page)
+        best = min(best, time.time()-start)
+    return best
+
+def benchmarkScholarParsing(pages, repeats=3):
+    """ Throughput of parsing Google Scholar results pages with every parser. """
+    results = {}
+    for parser in GoogleScholarSearch.Parsers:
+        engine = GoogleScholarSearch.GoogleScholarSearchEngine(parser=parser)
+        results[parser+"PagesPerSecond"] = len(pages)/timeParsers(pages, lambda page: engine.parseArticles(page, []), repeats)
+    results['articles'] = sum(len(engine.parseArticles(page, [])) for page in pages)
+    return results
+
+def benchmarkCiteULikeParsing(pages, repeats=3):
+    """ Throughput of parsing CiteULike.org results pages. """
+    return {'pagesPerSecond': len(pages)/timeParsers(pages, lambda page: list(DownloadArticles.parseArticlesCiteULike([page])), repeats),
+            'articles': sum(len(list(DownloadArticles.parseArticlesCiteULike([page]))) for page in pages)}
+
+def benchmarkScholarPagination(corpus, index, latency=0.02, errorRate=0., maxWorkers=4, nParsers=0):
+    """ Time GoogleScholarSearchEngine.getCitingArticles downloading all the pages
+    of the articles citing CitedURL from the replayed corpus, parsing them in
+    nParsers processes if it's not 0.
+    """
+    server = StandInServer.startServer(StandInServer.ReplayHandler, latency=latency, errorRate=errorRate, corpus=corpus)
+    engine = GoogleScholarSearch.GoogleScholarSearchEngine("127.0.0.1", server.server_address[1], parser='strainer', nParsers=nParsers)
+    nPages = -(-index['nCitations']//index['pageSize'])
+    start = time.time()
+    try:
+        articles = engine.getCitingArticles(CitedURL, index['nCitations'], [], index['pageSize'], maxWorkers)
+        failed = 0
+    except IOError:
+        articles, failed = [], 1
+    elapsed = time.time()-start
+    engine.close()
+    server.shutdown()
+    return {'seconds': elapsed, 'pagesPerSecond': nPages/elapsed, 'articles': len(articles), 'failed': failed,
+            'requests': server.nRequests, 'injectedErrors': server.nErrors}
+
+def benchmarkCompression(corpus, index, latency=0.02, maxWorkers=4):
+    """ Download the pages of the articles citing CitedURL from the replayed corpus
+    with and without compression and compare the bytes received and the time.
+    """
+    results = {}
+    for compress in [False, True]:
+        server = StandInServer.startServer(StandInServer.ReplayHandler, latency=latency, corpus=corpus)
+        metrics = Metrics.MetricsRegistry()
+        engine = GoogleScholarSearch.GoogleScholarSearchEngine("127.0.0.1", server.server_address[1], parser='strainer',
+                                                                metrics=metrics, compress=compress)
+        start = time.time()
+        engine.getCitingArticles(CitedURL, index['nCitations'], [], index['pageSize'], maxWorkers)
+        elapsed = time.time()-start
+        engine.close()
+        server.shutdown()
+        histograms = metrics.summary()['histograms']
+        results['compressed' if compress else 'plain'] = (elapsed, histograms.get('scholar.bytes', {}).get('sum', 0),
+                                                          histograms.get('scholar.body', {}).get('sum', 0.)) # 0 if no page was downloaded.
+    (plainSeconds, plainBytes, plainBody), (seconds, nBytes, body) = results['plain'], results['compressed']
+    return {'seconds': seconds, 'plainSeconds': plainSeconds, 'bytes': nBytes, 'plainBytes': plainBytes,
+            'compressionRatio': plainBytes/max(nBytes, 1.), 'bodyReadingSeconds': body, 'plainBodyReadingSeconds': plainBody}
+
+def benchmarkCiteULikeSearch(corpus, index, latency=0.02, errorRate=0.):
+    """ Time DownloadArticles.getArticlesCiteULike going through all the pages of
+    the CiteULikeQuery results from the replayed corpus. The search stops at the
+    first page that fails, the run then counts as failed.
+    """
+    server = StandInServer.startServer(StandInServer.ReplayHandler, latency=latency, errorRate=errorRate, corpus=corpus)
+    baseURL = DownloadArticles.CiteULikeBaseURL
+    DownloadArticles.CiteULikeBaseURL = "http://127.0.0.1:{}".format(server.server_address[1])
+    start = time.time()
+    try:
+        articles = DownloadArticles.getArticlesCiteULike(*CiteULikeQuery, pageLimit=index['nCiteULikePages']+1)
+        failed = 0
+    except IOError:
+        articles, failed = [], 1
+    finally:
+        elapsed = time.time()-start
+        DownloadArticles.CiteULikeBaseURL = baseURL
+        server.shutdown()
+    return {'seconds': elapsed, 'pagesPerSecond': server.nRequests/elapsed, 'articles': len(articles), 'failed': failed,
+            'requests': server.nRequests, 'injectedErrors': server.nErrors}
+
+def benchmarkNetWorm(corpus, index, latency=0.02, errorRate=0., nWorkers=8, maxPages=300):
+    """ Pages per second crawled by netWorm.NetWorm in the replayed link graph. """
+    server = StandInServer.startServer(StandInServer.ReplayHandler, latency=latency, errorRate=errorRate, corpus=corpus)
+    worm = netWorm.NetWorm(["TerraPower"], nWorkers=nWorkers, minDelay=0., maxPerHost=nWorkers, verbose=False)
+    start = time.time()
+    worm.crawl(["http://127.0.0.1:{}/page/0".format(server.server_address[1])], maxPages=min(maxPages, index['nLinkPages']))
+    elapsed = time.time()-start
+    server.shutdown()
+    return {'seconds': elapsed, 'pagesPerSecond': worm.nVisited/elapsed, 'pages': worm.nVisited, 'errors': worm.nErrors,
+            'pagesOfInterest': len(worm.urlsOfInterest), 'injectedErrors': server.nErrors}
+
+def runAll(directory="fixtures", latency=0.02, errorRate=0., repeats=3):
+    """ Run all the benchmarks.
+
+    Arguments
+    ----------
+    @param directory - str with the directory of the corpus (default="fixtures").
+    @param latency - float, seconds the replaying server waits before answering (default=0.02).
+    @param errorRate - float, fraction of the requests it fails on purpose (default=0).
+    @param repeats - int, how many times to time the parsers, the best time is kept.
+
+    Returns
+    ----------
+    @return dict with the 'settings', information about the 'environment' and the
+        'results' of every benchmark.
+    """
+    pages, corpus, index = loadCorpus(directory)
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.STDOUT,
+                                         cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError): # Not a git repository or no git.
+        commit = None
+    results = {}
+    results['scholarParsing'] = benchmarkScholarParsing(pages['scholar'], repeats)
+    results['citeULikeParsing'] = benchmarkCiteULikeParsing(pages['citeulike'], repeats)
+    results['scholarPagination'] = benchmarkScholarPagination(corpus, index, latency, errorRate)
+    results['scholarPaginationPipelined'] = benchmarkScholarPagination(corpus, index, latency, errorRate, nParsers=multiprocessing.cpu_count())
+    results['compression'] = benchmarkCompression(corpus, index, latency)
+    results['citeULikeSearch'] = benchmarkCiteULikeSearch(corpus, index, latency, errorRate)
+    results['netWorm'] = benchmarkNetWorm(corpus, index, latency, errorRate)
+    return {'settings': {'corpus': directory, 'pages': len(corpus), 'latency': latency, 'errorRate': errorRate, 'repeats': repeats},
+            'environment': {'commit': commit, 'time': time.strftime("%Y-%m-%d %H:%M:%S"), 'python': platform.python_version(),
+                            'platform': platform.platform()},
+            'results': results}
+
+def compareResults(baseline, current, tolerance=0.1):
+    """ Compare the results of two runs of runAll. Metrics ending in PerSecond
+    should be higher, the ones ending in seconds lower; others aren't compared.
+
+    Arguments
+    ----------
+    @param baseline, current - dicts returned by runAll.
+    @param tolerance - float, relative change that isn't a regression yet (default=0.1).
+
+    Returns
+    ----------
+    @return tuple of (list of str describing every change, list of str with the regressions).
+    """
+    changes, regressions = [], []
+    for name in sorted(current['results']):
+        for metric, value in sorted(current['results'][name].items()):
+            old = baseline['results'].get(name, {}).get(metric)
+            if old is None or not old or not (metric.endswith('PerSecond') or metric.lower().endswith('seconds')):
+                continue
+            change = value/float(old)-1.
+            line = "{}.{}: {:.4g} -> {:.4g} ({:+.1%})".format(name, metric, old, value, change)
+            changes.append(line)
+            if (metric.endswith('PerSecond') and change < -tolerance) or (metric.lower().endswith('seconds') and change > tolerance):
+                regressions.append(line)
+    return changes, regressions
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the off-line benchmarks.")
+    parser.add_argument('--corpus', default="fixtures", help="directory of the corpus of pages")
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds the stand-in waits before answering")
+    parser.add_argument('--error-rate', type=float, default=0., help="fraction of the requests the stand-in fails")
+    parser.add_argument('--repeats', type=int, default=3, help="how many times to time the parsers")
+    parser.add_argument('--output', help="save the results to this JSON file instead of printing them")
+    parser.add_argument('--compare', help="JSON file with earlier results to compare with; exits with 1 if anything got slower")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="relative slow-down that isn't a regression yet")
+    parser.add_argument('--record', metavar="URL", help="download the page at URL into the corpus and exit")
+    parser.add_argument('--kind', choices=Kinds, default='scholar', help="kind of the page to --record")
+    args = parser.parse_args()
+
+    if args.record:
+        recordPage(args.corpus, args.record, args.kind)
+        sys.exit()
+
+    results = runAll(args.corpus, args.latency, args.error_rate, args.repeats)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    else:
+        print json.dumps(results, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            changes, regressions = compareResults(json.load(f), results, args.tolerance)
+        for line in changes:
+            sys.stderr.write(line+"\n")
+        if regressions:
+            sys.stderr.write("{} regressions:\n{}\n".format(len(regressions), "\n".join(regressions)))
+            sys.exit(1)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:22:08 2026
+
+Save the state of a long harvest or crawl to a file every now and then, so that
+it can be resumed from where it stopped instead of starting all over again. The
+file is replaced atomically, so a run killed while saving leaves the previous
+checkpoint intact.
+
+@author: Alek
+@version: 1.0.0
+@since: Sun Oct 18 21:22:08 2026
+
+CHANGELOG:
+Sun Oct 18 21:22:08 2026 - 1.0.0 - Alek - Issued the first version.
+"""
+import os, time, cPickle
+
+class Checkpoint(object):
+    """ A file with the pickled state of a job.
+
+    Example
+    ----------
+    <tt>
+    > checkpoint = Checkpoint("harvest.checkpoint", interval=30)\n
+    > state = checkpoint.load() or {'done': []}\n
+    > for item in work:\n
+    >     state['done'].append(process(item))\n
+    >     if checkpoint.due():\n
+    >         checkpoint.save(state)
+    </tt>
+    """
+    def __init__(self, path, interval=30.):
+        """ Initialise the checkpoint, doesn't touch the file yet.
+
+        Arguments
+        ----------
+        @param path - str with the path of the file.
+        @param interval - float, minimum number of seconds between saves, @see due (default=30).
+        """
+        self.path = path
+        self.interval = interval
+        self.lastSave = time.time()
+        self.nSaves = 0
+
+    def due(self):
+        """ Check if interval seconds have passed since the last save. """
+        return time.time()-self.lastSave >= self.interval
+
+    def save(self, state):
+        """ Replace the saved state with state, anything that can be pickled. """
+        tempName = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(tempName, 'wb') as f:
+            cPickle.dump(state, f, cPickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno()) # Make sure the data is on the disk before it replaces the old checkpoint.
+        os.rename(tempName, self.path)
+        self.lastSave = time.time()
+        self.nSaves += 1
+
+    def load(self):
+        """ Get the saved state or None if nothing has been saved yet. """
+        try:
+            with open(self.path, 'rb') as f:
+                return cPickle.load(f)
+        except IOError: # No such file.
+            return None
+
+    def remove(self):
+        """ Delete the saved state, e.g. when the job is finished. """
+        if os.path.exists(self.path):
+            os.remove(self.path)
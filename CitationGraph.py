@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:03:51 2026
+
+A graph of which Articles cite which, grown breadth-first from some seed Articles
+by following their citingArticlesURLs on Google Scholar. Every article is a node
+once, no matter how many times it's found. The edges are kept in flat arrays and
+turned into a compressed sparse row (CSR) adjacency, so the degrees, PageRank and
+co-citation counts of all the articles are computed at once with numpy.
+
+Running this file grows a graph from the synthetic Google Scholar served by
+StandInServer and checks that the edges are the ones served.
+
+@author: Alek
+@version: 1.0.1
+@since: Sun Oct 18 20:03:51 2026
+
+CHANGELOG:
+Sun Oct 18 20:03:51 2026 - 1.0.0 - Alek - Issued the first version.
+                         - 1.0.1 - Alek - citedBy looks the citing articles up in a reverse adjacency.
+"""
+import array, urlparse
+import numpy
+import GoogleScholarSearch, RecordLinkage
+from ArticleStore import asInt
+
+def nodeKey(article):
+    """ Get what identifies article in the graph: the ID of its cluster on Google
+    Scholar, i.e. the cites parameter of its citingArticlesURL, or its normalised
+    title and year if it's not been cited.
+    """
+    query = urlparse.parse_qs(urlparse.urlsplit(article.citingArticlesURL).query)
+    if 'cites' in query:
+        return "cites:" + query['cites'][0]
+    return u"title:{}:{}".format(asInt(article.Year), RecordLinkage.normalise(article.Title))
+
+class CitationGraph(object):
+    """ Articles and the citations between them. Edges point from the citing to
+    the cited article.
+
+    Example
+    ----------
+    <tt>
+    > graph = CitationGraph()\n
+    > graph.expand(engine, engine.search(['langmuir', 'probe']), depth=2)\n
+    > ranks = graph.pageRank()\n
+    > for node in ranks.argsort()[::-1][:10]:\n
+    >     print ranks[node], graph.articles[node]
+    </tt>
+    """
+    def __init__(self):
+        self.articles = [] # Article of every node, in the order in which they were found.
+        self.depths = array.array('i') # Number of citation steps from the nearest seed to every node.
+        self.nodeIDs = {} # nodeKey : index of the node.
+        self.citing = array.array('i') # Source of every edge...
+        self.cited = array.array('i') # ...and its target.
+        self.expanded = set() # Nodes whose citing articles have been downloaded.
+        self.failed = [] # (node, exception) for the nodes whose citing articles couldn't be downloaded.
+        self.csr = None # Cached adjacency, @see adjacency...
+        self.reverseCSR = None # ...and its reverse, @see reverseAdjacency.
+
+    def __len__(self):
+        return len(self.articles)
+
+    def addArticle(self, article, depth=0):
+        """ Add a node for article unless it's already in the graph.
+
+        Returns
+        ----------
+        @return tuple of (int index of the node, bool whether it's new).
+        """
+        key = nodeKey(article)
+        node = self.nodeIDs.get(key)
+        if node is not None:
+            return node, False
+        node = self.nodeIDs[key] = len(self.articles)
+        self.articles.append(article)
+        self.depths.append(depth)
+        self.csr = self.reverseCSR = None
+        return node, True
+
+    def addCitation(self, citing, cited):
+        """ Add an edge from node citing to node cited. """
+        self.citing.append(citing)
+        self.cited.append(cited)
+        self.csr = self.reverseCSR = None
+
+    def expand(self, engine, seeds, depth=1, maxCitations=None, pageSize=20, maxWorkers=4, maxRequestsPerSecond=None):
+        """ Grow the graph breadth-first: download the articles citing the seeds,
+        then the ones citing those and so on, depth times.
+
+        Arguments
+        ----------
+        @param engine - GoogleScholarSearch.GoogleScholarSearchEngine to download the pages with.
+        @param seeds - list of Article.Articles to start from.
+        @param depth - int, how many times to follow the citations (default=1).
+        @param maxCitations - int, follow at most this many citations of every
+            article, e.g. the most relevant 100 of an article cited 10 000 times;
+            all of them if None (default).
+        @param pageSize, maxWorkers - @see GoogleScholarSearchEngine.getCitingArticles.
+        @param maxRequestsPerSecond - float, shared by all the downloads; no limit if None (default).
+
+        Returns
+        ----------
+        @return list of int with the indices of the seeds' nodes.
+        """
+        rateLimiter = GoogleScholarSearch.HostRateLimiter(maxRequestsPerSecond)
+        seedNodes = [self.addArticle(article, 0)[0] for article in seeds]
+        level = list(seedNodes)
+        for d in range(depth):
+            nextLevel = []
+            for node in level:
+                if node in self.expanded:
+                    continue
+                self.expanded.add(node)
+                article = self.articles[node]
+                nCitations = asInt(article.pubNoCitations, 0)
+                if maxCitations is not None:
+                    nCitations = min(nCitations, maxCitations)
+                if nCitations <= 0 or not article.citingArticlesURL:
+                    continue
+                try:
+                    citingArticles = engine.getCitingArticles(article.citingArticlesURL, nCitations, article.Keywords,
+                                                              pageSize, maxWorkers, rateLimiter=rateLimiter)
+                except IOError as e: # Carry on with the other articles.
+                    self.failed.append((node, e))
+                    continue
+                for citingArticle in citingArticles:
+                    citingNode, isNew = self.addArticle(citingArticle, d+1)
+                    self.addCitation(citingNode, node)
+                    if isNew:
+                        nextLevel.append(citingNode)
+            level = nextLevel
+        return seedNodes
+
+    def adjacency(self):
+        """ Get the edges as a compressed sparse row adjacency without duplicates
+        or self-citations: the nodes cited by node i are indices[indptr[i]:indptr[i+1]],
+        in increasing order.
+
+        Returns
+        ----------
+        @return tuple of two numpy arrays of int, (indptr, indices).
+        """
+        if self.csr is None:
+            n = len(self)
+            citing = numpy.frombuffer(self.citing, dtype=numpy.int32).astype(numpy.int64) if len(self.citing) else numpy.zeros(0, numpy.int64)
+            cited = numpy.frombuffer(self.cited, dtype=numpy.int32).astype(numpy.int64) if len(self.cited) else numpy.zeros(0, numpy.int64)
+            edges = numpy.unique((citing*n + cited)[citing != cited])
+            indptr = numpy.zeros(n+1, dtype=numpy.int64)
+            numpy.cumsum(numpy.bincount(edges//n, minlength=n), out=indptr[1:])
+            self.csr = (indptr, edges % n)
+        return self.csr
+
+    def reverseAdjacency(self):
+        """ Get the edges the other way round, @see adjacency: the nodes that cite
+        node i are indices[indptr[i]:indptr[i+1]], in increasing order.
+
+        Returns
+        ----------
+        @return tuple of two numpy arrays of int, (indptr, indices).
+        """
+        if self.reverseCSR is None:
+            n = len(self)
+            indptr, indices = self.adjacency()
+            citing = numpy.repeat(numpy.arange(n), numpy.diff(indptr))
+            order = numpy.lexsort((citing, indices)) # By the cited node, then by the citing one.
+            reverseIndptr = numpy.zeros(n+1, dtype=numpy.int64)
+            numpy.cumsum(numpy.bincount(indices, minlength=n), out=reverseIndptr[1:])
+            self.reverseCSR = (reverseIndptr, citing[order])
+        return self.reverseCSR
+
+    def nEdges(self):
+        """ Number of distinct citations in the graph. """
+        return len(self.adjacency()[1])
+
+    def outDegrees(self):
+        """ Number of articles in the graph cited by every article, as a numpy array. """
+        return numpy.diff(self.adjacency()[0])
+
+    def inDegrees(self):
+        """ Number of articles in the graph citing every article, as a numpy array;
+        only the expanded nodes have all their citations in the graph.
+        """
+        return numpy.bincount(self.adjacency()[1], minlength=len(self))
+
+    def citedBy(self, node):
+        """ Indices of the nodes that cite node, as a numpy array. """
+        indptr, indices = self.reverseAdjacency()
+        return indices[indptr[node]:indptr[node+1]]
+
+    def pageRank(self, damping=0.85, tolerance=1e-10, maxIterations=100):
+        """ Compute the PageRank of all the nodes with power iterations, rank flows
+        from the citing to the cited articles. Articles that cite nothing in the
+        graph spread their rank evenly over all the nodes.
+
+        Arguments
+        ----------
+        @param damping - float, probability of following a citation rather than
+            jumping to a random article (default=0.85).
+        @param tolerance - float, stop when the ranks change by less than this in total.
+        @param maxIterations - int, stop after this many iterations at the latest.
+
+        Returns
+        ----------
+        @return numpy array of float with the rank of every node, they add up to 1.
+        """
+        n = len(self)
+        if n == 0:
+            return numpy.zeros(0)
+        indptr, indices = self.adjacency()
+        outDegrees = numpy.diff(indptr)
+        sources = numpy.repeat(numpy.arange(n), outDegrees) # Citing node of every edge.
+        dangling = outDegrees == 0
+        weights = 1./numpy.maximum(outDegrees, 1)
+        ranks = numpy.full(n, 1./n)
+        for i in range(maxIterations):
+            flow = numpy.bincount(indices, weights=(ranks*weights)[sources], minlength=n)
+            newRanks = damping*(flow + ranks[dangling].sum()/n) + (1.-damping)/n
+            change = numpy.abs(newRanks-ranks).sum()
+            ranks = newRanks
+            if change < tolerance:
+                break
+        return ranks
+
+    def coCitations(self, minCount=1):
+        """ Count how many articles cite every pair of articles together.
+
+        Arguments
+        ----------
+        @param minCount - int, leave out the pairs cited together fewer times (default=1).
+
+        Returns
+        ----------
+        @return tuple of three numpy arrays of int (first, second, count), one entry
+            per pair of nodes with first < second.
+        """
+        n = len(self)
+        indptr, indices = self.adjacency()
+        outDegrees = numpy.diff(indptr)
+        pairs = [numpy.zeros(0, dtype=numpy.int64)]
+        # All the articles that cite k others give the same k*(k-1)/2 pairs of positions in their lists.
+        for k in numpy.unique(outDegrees[outDegrees >= 2]):
+            nodes = numpy.flatnonzero(outDegrees == k)
+            lists = indices[indptr[nodes][:, None] + numpy.arange(k)] # Cited nodes, one row per citing node.
+            first, second = numpy.triu_indices(k, 1)
+            pairs.append((lists[:, first]*n + lists[:, second]).ravel())
+        pairs, counts = numpy.unique(numpy.concatenate(pairs), return_counts=True)
+        keep = counts >= minCount
+        pairs, counts = pairs[keep], counts[keep]
+        return pairs // n, pairs % n, counts
+
+if __name__ == '__main__':
+    import time, StandInServer
+    server = StandInServer.startServer(StandInServer.ScholarHandler, nPages=5000, maxCitations=30)
+    engine = GoogleScholarSearch.GoogleScholarSearchEngine("127.0.0.1", server.server_address[1], parser='strainer')
+    seeds = engine.search(["probe"], 10)
+    start = time.time()
+    graph = CitationGraph()
+    graph.expand(engine, seeds, depth=2)
+    print "{} articles, {} citations in {:.2f} s, {} pages requested.".format(len(graph), graph.nEdges(), time.time()-start, server.nRequests)
+
+    " Check the edges against the citations the stand-in serves. "
+    numbers = [int(RecordLinkage.normalise(a.Title).split()[3]) for a in graph.articles] # "Synthetic article number <n> about probes"
+    for node in graph.expanded:
+        expected = set(c for c in StandInServer.scholarCiters(numbers[node], 5000, 30) # Less the [CITATION]s, they aren't parsed.
+                       if not "[CITATION]" in StandInServer.scholarPage(c, 1, 5000))
+        found = set(numbers[c] for c in graph.citedBy(node))
+        assert found == expected, "Wrong citations of article {}: {} instead of {}".format(numbers[node], found, expected)
+    print "All the citations are the ones served."
+
+    ranks = graph.pageRank()
+    first, second, counts = graph.coCitations()
+    for node in ranks.argsort()[::-1][:5]:
+        print "PageRank {:.4f}, cited by {}, cites {}: {}".format(ranks[node], graph.inDegrees()[node], graph.outDegrees()[node], graph.articles[node].Title)
+    if len(counts):
+        i = counts.argmax()
+        print "Most co-cited: {} and {}, {} times.".format(graph.articles[first[i]].Title, graph.articles[second[i]].Title, counts[i])
+    engine.close()
+    server.shutdown()
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:02:47 2026
+
+The frontier of a web crawl: the queue of URLs still to be visited and a record
+of every URL that has ever been queued, so that no page is queued twice. Both
+take constant time per URL regardless of how large the crawl gets.
+
+@author: Alek
+@version: 1.0.1
+@since: Sun Oct 18 13:02:47 2026
+
+CHANGELOG:
+Sun Oct 18 13:02:47 2026 - 1.0.0 - Alek - Issued the first version.
+                         - 1.0.1 - Alek - Queue the URLs as they were found, the canonical ones are only the keys.
+"""
+import collections, hashlib, math, struct, urlparse
+from ResponseCache import normaliseURL
+
+CRAWLABLE_SCHEMES = ('http', 'https')
+
+def canonicaliseURL(url):
+    """ Bring url to its canonical form, so that different spellings of the same
+    link are only crawled once, @see ResponseCache.normaliseURL. It's the key
+    the link is remembered by, the link itself is what gets downloaded.
+
+    Arguments
+    ----------
+    @param url - str with an absolute URL.
+
+    Returns
+    ----------
+    @return str with the canonical URL or None if it can't be crawled, e.g.
+        because it's a mailto: or javascript: link.
+    """
+    if isinstance(url, unicode): # Links found by BeautifulSoup.
+        url = url.encode('utf-8')
+    try:
+        if urlparse.urlsplit(url).scheme.lower() not in CRAWLABLE_SCHEMES:
+            return None
+        return normaliseURL(url)
+    except ValueError: # E.g. the port isn't a number.
+        return None
+
+def urlHash(url):
+    """ A 64-bit hash of url, cheaper to keep in memory than url itself. """
+    return struct.unpack("<Q", hashlib.md5(url).digest()[:8])[0]
+
+class SeenSet(object):
+    """ Exact set of the URLs seen so far; only keeps their 64-bit hashes. """
+    def __init__(self):
+        self.hashes = set()
+
+    def add(self, url):
+        """ Add url to the set. Returns True if it hadn't been there before. """
+        h = urlHash(url)
+        if h in self.hashes:
+            return False
+        self.hashes.add(h)
+        return True
+
+    def __contains__(self, url):
+        return urlHash(url) in self.hashes
+
+    def __len__(self):
+        return len(self.hashes)
+
+class BloomFilter(object):
+    """ Approximate set of the URLs seen so far with a fixed memory footprint.
+    May wrongly report a new URL as seen with probability errorRate as long as
+    no more than capacity URLs are added, but never forgets a seen one.
+    """
+    def __init__(self, capacity=10**6, errorRate=1e-4):
+        """ Initialise an empty filter.
+
+        Arguments
+        ----------
+        @param capacity - int, expected number of URLs that will be added (default=10**6).
+        @param errorRate - float, acceptable probability of false positives (default=1e-4).
+        """
+        self.nBits = int(math.ceil(-capacity*math.log(errorRate)/math.log(2)**2))
+        self.nHashes = max(1, int(round(self.nBits/float(capacity)*math.log(2))))
+        self.bits = bytearray((self.nBits+7)//8)
+        self.count = 0
+
+    def positions(self, url):
+        """ Indices of the bits that correspond to url; double hashing of md5. """
+        h1, h2 = struct.unpack("<QQ", hashlib.md5(url).digest())
+        return [(h1 + i*h2) % self.nBits for i in xrange(self.nHashes)]
+
+    def add(self, url):
+        """ Add url to the filter. Returns True if it hadn't been there before. """
+        isNew = False
+        for p in self.positions(url):
+            if not self.bits[p>>3] & (1<<(p&7)):
+                self.bits[p>>3] |= 1<<(p&7)
+                isNew = True
+        if isNew:
+            self.count += 1
+        return isNew
+
+    def __contains__(self, url):
+        return all(self.bits[p>>3] & (1<<(p&7)) for p in self.positions(url))
+
+    def __len__(self):
+        return self.count
+
+class CrawlFrontier(object):
+    """ First-in-first-out queue of URLs to crawl that accepts only one URL with
+    a given canonical form, @see canonicaliseURL.
+
+    Example
+    ----------
+    <tt>
+    > frontier = CrawlFrontier(['http://www.bbc.co.uk/news'])\n
+    > url = frontier.pop()\n
+    > frontier.extend(linksFoundAt(url))
+    </tt>
+    """
+    def __init__(self, seeds=[], useBloomFilter=False, capacity=10**6, errorRate=1e-4):
+        """ Initialise the frontier.
+
+        Arguments
+        ----------
+        @param seeds - list of str with the URLs to start crawling from.
+        @param useBloomFilter - bool, whether to remember the seen URLs in a
+            BloomFilter instead of an exact SeenSet; use it for crawls much larger
+            than ~10**5 pages (default=False).
+        @param capacity - int, expected number of URLs seen, only for the BloomFilter.
+        @param errorRate - float, probability of skipping a new URL, only for the BloomFilter.
+        """
+        self.seen = BloomFilter(capacity, errorRate) if useBloomFilter else SeenSet()
+        self.queue = collections.deque()
+        self.nVisited = 0 # How many URLs have been popped.
+        self.extend(seeds)
+
+    def push(self, url):
+        """ Queue url unless it (or its other spelling) has already been queued.
+
+        Returns
+        ----------
+        @return bool, True if url has been queued.
+        """
+        key = canonicaliseURL(url)
+        if key is None or not self.seen.add(key):
+            return False
+        self.queue.append(url.encode('utf-8') if isinstance(url, unicode) else url)
+        return True
+
+    def extend(self, urls):
+        """ Push all the urls, returns how many of them were new. """
+        return sum(self.push(url) for url in urls)
+
+    def pop(self):
+        """ Get the next URL to visit. Raises IndexError if there are none. """
+        url = self.queue.popleft()
+        self.nVisited += 1
+        return url
+
+    def __len__(self):
+        return len(self.queue)
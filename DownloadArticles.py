@@ -7,8 +7,8 @@ Created on Sun Apr 19 20:46:55 2015
 @author: alek
 """
 
-import requests, re, difflib
-import Article, GoogleScholarSearch
+import requests, re, itertools, time, codecs
+import Article, GoogleScholarSearch, ResponseCache, RecordLinkage, ArticleRepository, Checkpoint, Metrics
 
 scholarSearchEngine = GoogleScholarSearch.GoogleScholarSearchEngine() # Convenient to search through Google Scholar.
 
@@ -17,6 +17,8 @@ IntegersParern = re.compile("\d+") # Any integer.
 YearPattern = re.compile('\([0-9a-zA-Z\s]*\d{4}\)') # Any four-digit year encolsed in parentheses; may be preceded by a month in any format and also a day.
 LinksPattern = re.compile('"((http|ftp)s?://.*?)"') # Will find URLs in a website text.
 
+CiteULikeBaseURL = "http://www.citeulike.org" # Where to search CiteULike.org, can be pointed at a local server that serves saved pages.
+
 " CiteULike.org-specific regexes. "
 TitlePattern = re.compile(';</span>.+</a></h2>') # A number of regexes designed to extract bits of information from the lines of CiteULike.org results website.
 JournalPattern = re.compile('<i>[a-zA-Z\s\W\d]+</i>')
@@ -26,6 +28,11 @@ DOIPattern = re.compile(">doi\:[\W\w]+</a></div>")
 AuthorPattern = re.compile('>[a-zA-Z\s.-]+</a>')
 TagPattern = re.compile('>[a-zA-Z]+</a>')
 ArticleIDsPattern = re.compile('<tr class="list {article_id:\d+}" data-article_id=\d+>') # Will find the beginnings of the articles from CIteULike.org.
+# What the lines of a results page hold; the name of the group that matches tells which information it is.
+# All of them start with '<', so the regex engine can skip to the next '<' quickly.
+CiteULikeLinePattern = re.compile('<(?:(?P<start>tr class="list {article_id:(?P<articleID>\d+))|(?P<title>a class="title")|'
+                                  '(?P<doi>a href=\'http://dx\.doi\.org)|(?P<author>a class="author")|'
+                                  '(?P<tags>span class="taglist">)|(?P<abstract>h3>Abstract</h3>))')
 
 " Google Scholar-specific regexes. "
 CitedByPattern = re.compile('cites=\d+') # Will find those parts of the links that enable the papers that cite a given article to be displayed on Google Scholar.
@@ -34,7 +41,7 @@ YearPatternGoogle = re.compile('\,\s\d{4}[\s\-<]*')
 ArticleInfoPatternGoogle = re.compile('[\.\,\-\s\w]+\,\s\d{4}[\s\-<]*') # Will find the list of authors, journal, and year.
 CitedByNumberPattern = re.compile('Cited\sby\s\d+') # How many times the given article has been cited.
 
-def getArticlesCiteULike(authors=[], keywords=[], yearStart=1800, yearEnd=3000, title="", isbn="none", pageLimit=2):
+def getArticlesCiteULike(authors=[], keywords=[], yearStart=1800, yearEnd=3000, title="", isbn="none", pageLimit=2, cache=None, metrics=None):
     """ Find scientific articles that match given criteria on-line.
     
     Arguments
@@ -49,102 +56,384 @@ def getArticlesCiteULike(authors=[], keywords=[], yearStart=1800, yearEnd=3000,
     title - string with the title of the article.
     isbn - str with the ISBN of the publication.
     pageLimit - int, how many pages of the results will be searched.
+    cache - ResponseCache.ResponseCache where the downloaded results pages will be
+        kept and looked up before going on-line; no caching if None.
+    metrics - Metrics.MetricsRegistry where an event is recorded for every results
+        page under 'citeulike'; nothing is recorded if None. The chunks of the
+        page are decoded as they're downloaded, so 'body' includes decoding them.
         
     Returns
     ----------
-    A list of Articles @see Article.
+    A list of Articles @see Article, from all the result pages.
     """
-    pageNo = 1 # Number of the page with results.
+    return list(iterArticlesCiteULike(authors, keywords, yearStart, yearEnd, title, isbn, pageLimit, cache, metrics))
+
+def iterArticlesCiteULike(authors=[], keywords=[], yearStart=1800, yearEnd=3000, title="", isbn="none", pageLimit=2, cache=None, metrics=None):
+    """ Find scientific articles that match given criteria on-line, like
+    getArticlesCiteULike, but yield them one at a time as the result pages are
+    being downloaded. Stops going through the pages when one has no articles.
     
+    Arguments
+    ----------
+    @see getArticlesCiteULike
+        
+    Returns
+    ----------
+    A generator of Articles @see Article.
+    """
     " Go through all the result pages we might get. "
-    while pageNo <= pageLimit: # Unlikely that we'll get so many results but we don't want infinite loops, do we?
-        " Build the search URL. "
-        if not title: # We aren't looking for a specific title.
-            BASE_SEARCH_URL = "http://www.citeulike.org/search/all/page/{}?q=".format( pageNo ) # All the search criteria are appended to this.
-            searchURL = BASE_SEARCH_URL # Start from this and add all the search criteria.
-            for tag in keywords:
-                searchURL += "tag%3A"
-                searchURL += '"{}"'.format(tag)
-                searchURL += "+"
-            for author in authors:
-                searchURL += "author%3A"
-                searchURL += '"{}"'.format(author) # author has to be in quotes.
-                searchURL += "+"
-            searchURL += "year%3A%5B{}+TO+{}%5D".format(yearStart,yearEnd)
-            searchURL += "+isbn%3A{}".format(isbn)
-        else: # The URL to look for specific titles is a bit different.
-            BASE_SEARCH_URL = "http://www.citeulike.org/search/all/page/{}?q=title>".format( pageNo )
-            searchURL = BASE_SEARCH_URL # Start from this and add all the search criteria.
-            searchURL += title + "+"
-            for tag in keywords:
-                searchURL += "tag%3A"
-                searchURL += '"{}"'.format(tag)
-                searchURL += "+"
-            for author in authors:
-                searchURL += "author%3A"
-                searchURL += '"{}"'.format(author) # author has to be in quotes.
-                searchURL += "+"
-            searchURL += "year%3A%5B{}+TO+{}%5D".format(yearStart,yearEnd)
-            searchURL += "+isbn%3A{}".format(isbn)
-
-        " Perform the actual search. "
-        the_page = requests.get(searchURL).text # Get the text version of the website. Use requests not urllib2 because the page will be too large for it.
+    for pageNo in range(1, pageLimit+1): # Unlikely that we'll get so many results but we don't want infinite loops, do we?
+        searchURL = getSearchURLCiteULike(pageNo, authors, keywords, yearStart, yearEnd, title, isbn)
         
-        lines = the_page.split("\n") # Parsing lines is easier than coming up with regexes to get the info about all the articles from the_page. Besides not every article will have all the information.
+        " Perform the actual search. "
+        nArticles = 0
+        if metrics is None:
+            for article in parseArticlesCiteULike(iterPageCiteULike(searchURL, cache)):
+                nArticles += 1
+                yield article
+        else:
+            event = {'url': searchURL}
+            chunks = Metrics.timedIterator(iterPageCiteULike(searchURL, cache, event), event, 'body')
+            try:
+                # Waiting for the articles includes waiting for the chunks, take it out of the parsing time later.
+                for article in Metrics.timedIterator(parseArticlesCiteULike(chunks), event, 'parse'):
+                    nArticles += 1
+                    yield article
+            except Exception as e:
+                event['error'] = type(e).__name__
+                raise
+            finally:
+                event['parse'] -= event.get('body', 0.)
+                event['body'] = event.get('body', 0.) - event.get('firstByte', 0.)
+                event['records'] = nArticles
+                metrics.record('citeulike', event)
+        if nArticles == 0: # No more results.
+            return
+
+def getSearchURLCiteULike(pageNo, authors, keywords, yearStart, yearEnd, title, isbn):
+    """ Build the URL of a CiteULike.org search results page, @see getArticlesCiteULike.
+    
+    Arguments
+    ----------
+    pageNo - int, number of the page with results, starting from 1.
+    
+    Returns
+    ----------
+    str with the URL.
+    """
+    if not title: # We aren't looking for a specific title.
+        BASE_SEARCH_URL = CiteULikeBaseURL + "/search/all/page/{}?q=".format( pageNo ) # All the search criteria are appended to this.
+        searchURL = BASE_SEARCH_URL # Start from this and add all the search criteria.
+        for tag in keywords:
+            searchURL += "tag%3A"
+            searchURL += '"{}"'.format(tag)
+            searchURL += "+"
+        for author in authors:
+            searchURL += "author%3A"
+            searchURL += '"{}"'.format(author) # author has to be in quotes.
+            searchURL += "+"
+        searchURL += "year%3A%5B{}+TO+{}%5D".format(yearStart,yearEnd)
+        searchURL += "+isbn%3A{}".format(isbn)
+    else: # The URL to look for specific titles is a bit different.
+        BASE_SEARCH_URL = CiteULikeBaseURL + "/search/all/page/{}?q=title>".format( pageNo )
+        searchURL = BASE_SEARCH_URL # Start from this and add all the search criteria.
+        searchURL += title + "+"
+        for tag in keywords:
+            searchURL += "tag%3A"
+            searchURL += '"{}"'.format(tag)
+            searchURL += "+"
+        for author in authors:
+            searchURL += "author%3A"
+            searchURL += '"{}"'.format(author) # author has to be in quotes.
+            searchURL += "+"
+        searchURL += "year%3A%5B{}+TO+{}%5D".format(yearStart,yearEnd)
+        searchURL += "+isbn%3A{}".format(isbn)
+    return searchURL
+
+def iterPageCiteULike(searchURL, cache=None, event=None):
+    """ Get the text of a CiteULike.org results page in chunks, as it's being
+    downloaded, or from the cache if the page is there.
+    
+    Arguments
+    ----------
+    searchURL - str with the URL of the page.
+    cache - ResponseCache.ResponseCache to use or None.
+    event - dict where the 'status', the number of 'bytes' received and 'pageBytes'
+        after decompressing, whether the page was 'cached' and the seconds until
+        the headers arrived ('firstByte') are put, @see Metrics.MetricsRegistry; or None.
+    
+    Returns
+    ----------
+    A generator of unicode with consecutive chunks of the page.
+    
+    Raises
+    ----------
+    IOError if the page isn't cached and the cache is offline, or if the server
+    doesn't answer with the page (status other than 200); those answers aren't cached.
+    """
+    if cache is not None:
+        body = cache.get(searchURL)
+        if body is not None:
+            if event is not None:
+                event.update(cached=True, bytes=0, pageBytes=len(body))
+            yield body.decode('utf-8')
+            return
+        elif cache.offline:
+            raise IOError("Page isn't cached and the cache is offline: {}".format(searchURL))
+    
+    # Use requests not urllib2 because the page will be too large for it. It asks
+    # for gzip or deflate and decompresses the chunks as they arrive.
+    start = time.time()
+    resp = requests.get(searchURL, stream=True)
+    if event is not None:
+        event.update(cached=False, status=resp.status_code, firstByte=time.time()-start)
+    try: # Give the connection back even if the consumer stops reading or the download fails.
+        if resp.status_code != 200: # Don't cache error or captcha pages as if they were results.
+            raise IOError("Connection can't be established. Error code: {}, Reason: {}".format(resp.status_code, resp.reason))
+        encoding = codecs.lookup(resp.encoding or 'utf-8').name
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        chunks = [] # Only kept if the page has to be cached.
+        pageBytes = 0
+        for data in resp.iter_content(chunk_size=64*1024):
+            pageBytes += len(data)
+            if cache is not None:
+                chunks.append(data)
+            chunk = decoder.decode(data)
+            if chunk:
+                yield chunk
+        chunk = decoder.decode("", final=True)
+        if chunk:
+            yield chunk
+        if event is not None:
+            event.update(bytes=resp.raw.tell(), pageBytes=pageBytes) # The former as sent, before decompressing.
+        if cache is not None:
+            body = "".join(chunks)
+            cache.put(searchURL, body if encoding == 'utf-8' else body.decode(encoding, 'replace').encode('utf-8'))
+    finally:
+        resp.close()
+
+def parseArticlesCiteULike(chunks):
+    """ Parse a CiteULike.org results page as it arrives and yield every article
+    as soon as all of it has been seen. Only complete lines are parsed, the
+    rest of a chunk waits for the next one. CiteULikeLinePattern finds all the
+    interesting lines in one scan, the lines between them are never looked at,
+    and only the lines it finds are parsed further.
+    
+    Arguments
+    ----------
+    chunks - iterable of str or unicode with consecutive parts of the page, of any length.
+    
+    Returns
+    ----------
+    A generator of Articles @see Article.
+    """
+    fields = None # Attributes of the article being parsed, None before the first one.
+    expectAbstract = False # The abstract is in the line after its header, which may be in the next chunk.
+    rest = [] # Parts of an incomplete line left over from the last chunks.
+    for chunk in itertools.chain(chunks, [None]):
+        if chunk is None: # The last line of the page doesn't have to end with a new line.
+            block = "".join(rest)
+        else:
+            end = chunk.rfind("\n")+1
+            if end == 0:
+                rest.append(chunk)
+                continue
+            block = "".join(rest) + chunk[:end]
+            rest = [chunk[end:]]
         
-        # Initialise the artcile attributes.
-        articleID=-1; articleTitle=""; authors=[]; year=0; journalTitle=""; doi=""; volume=-1; number=-1; tags=[]; abstract="";
-        articles = [] # Articles we've found.
-        firstArticle = True # If this is the first article we're reading.
-        for i in range(len(lines)):
-            if lines[i].startswith('<tr class="list {article_id:'):
-                if firstArticle: # articleID and all the rest aren't defined yet.
-                    articleID = int(IntegersParern.findall(lines[i])[0])
-                    firstArticle = False
-                else: # First add the artcile we've just parsed, then proceed to parsing the new one.
-                    articles.append( Article.Article(articleID, articleTitle, authors, year, journalTitle, doi, volume, number, tags, abstract) )
-                    articleID = int(IntegersParern.findall(lines[i])[0])
-            if '<a class="title"' in lines[i]:
-                articleTitle = TitlePattern.findall(lines[i])[0].rstrip("</a></h2>").lstrip(";</span>")
-            if "<a href='http://dx.doi.org" in lines[i]:
-                try:
-                    journalTitle = JournalPattern.findall(lines[i])[0].rstrip("</i>").lstrip("<i>")
-                except IndexError:
-                    print "\nNo journalTitle for:\n\t{}".format(lines[i])
-                    journalTitle = "UNKNOWN JOURNAL"
-                    
-                try:
-                    year = int( YearPattern.findall(lines[i])[0][-5:-1] ) # This may have a day and month in front, only extract the year (always last and followed by ")" ).
-                except IndexError:
-                    print "\nNo year for:\n\t{}".format(lines[i])
-                    year = 0
-                
-                try:
-                    volume = int(VolPattern.findall(lines[i])[0].lstrip("Vol. "))
-                except IndexError:
-                    print "\nNo volume for:\n\t{}".format(lines[i])
-                    volume = -1
-                
-                try:
-                    number = int(NoPattern.findall(lines[i])[0].lstrip("No. "))
-                except (IndexError, ValueError):
-                    print "\nNo number for:\n\t{}".format(lines[i])
-                    number = -1
+        pos = 0 # Where to look for the next interesting line in the block.
+        if expectAbstract:
+            expectAbstract = False
+            pos = block.find("\n")+1 or len(block)
+            fields['abstract'] = stripAffixes(block[:pos].rstrip("\n"), "<p>", "</p>")
+        while True:
+            match = CiteULikeLinePattern.search(block, pos)
+            if match is None:
+                break
+            kind = match.lastgroup
+            pos = match.end()
+            if kind == 'start':
+                if match.start() > 0 and block[match.start()-1] != "\n": # Only counts at the start of a line.
+                    continue
+                if fields is not None: # First yield the article we've just parsed, then proceed to parsing the new one.
+                    yield makeArticleCiteULike(fields)
+                fields = {'articleID': int(match.group('articleID'))}
+                continue
+            elif fields is None: # Not an article yet.
+                continue
+            
+            lineEnd = block.find("\n", pos)
+            if lineEnd < 0:
+                lineEnd = len(block)
+            if kind == 'abstract':
+                if lineEnd+1 >= len(block):
+                    expectAbstract = True
+                else:
+                    pos = block.find("\n", lineEnd+1)
+                    if pos < 0:
+                        pos = len(block)
+                    fields['abstract'] = stripAffixes(block[lineEnd+1:pos], "<p>", "</p>")
+                continue
+            
+            line = block[block.rfind("\n", 0, match.start())+1:lineEnd]
+            if kind == 'title':
+                fields['title'] = TitlePattern.search(line).group()[len(";</span>"):-len("</a></h2>")]
+            elif kind == 'doi':
+                parseDOILineCiteULike(line, fields)
+            elif kind == 'author': # All the authors are in this line, go straight to the next one.
+                fields['authors'] = [x[1:-4] for x in AuthorPattern.findall(line)] # Without the '>' and '</a>'.
+                pos = lineEnd
+            elif kind == 'tags':
+                fields['tags'] = [x[1:-4] for x in TagPattern.findall(line)]
+                pos = lineEnd
+    # Yield the last article.
+    if fields is not None:
+        yield makeArticleCiteULike(fields)
+
+def stripAffixes(text, prefix, suffix):
+    """ Remove prefix from the start and suffix from the end of text, if they're there. """
+    if text.startswith(prefix):
+        text = text[len(prefix):]
+    if suffix and text.endswith(suffix):
+        text = text[:-len(suffix)]
+    return text
+
+def parseDOILineCiteULike(line, fields):
+    """ Get the journal, year, volume, number and DOI from the line of a CiteULike.org
+    results page that has the DOI link and put them in the fields dict.
+    """
+    journal = JournalPattern.search(line)
+    if journal is not None:
+        fields['journalTitle'] = journal.group()[3:-4] # Without the '<i>' and '</i>'.
+    else:
+        print "\nNo journalTitle for:\n\t{}".format(line)
+        fields['journalTitle'] = "UNKNOWN JOURNAL"
+    
+    year = YearPattern.search(line)
+    if year is not None:
+        fields['year'] = int(year.group()[-5:-1]) # This may have a day and month in front, only extract the year (always last and followed by ")" ).
+    else:
+        print "\nNo year for:\n\t{}".format(line)
+    
+    volume = VolPattern.search(line)
+    if volume is not None:
+        fields['volume'] = int(volume.group()[len("Vol. "):])
+    else:
+        print "\nNo volume for:\n\t{}".format(line)
+    
+    number = NoPattern.search(line)
+    if number is not None:
+        fields['number'] = int(number.group()[len("No. "):])
+    else:
+        print "\nNo number for:\n\t{}".format(line)
+    
+    doi = DOIPattern.search(line)
+    if doi is not None:
+        fields['doi'] = doi.group()[len(">doi:"):-len("</a></div>")]
+
+def makeArticleCiteULike(fields):
+    """ Make an Article out of the fields parsed by parseArticlesCiteULike,
+    using the same defaults as getArticlesCiteULike always has for the missing ones.
+    """
+    return Article.Article(fields.get('title', ""), fields.get('authors', []), fields.get('year', 0),
+                           fields.get('journalTitle', ""),
+                           fields.get('doi', ""), fields.get('volume', -1), fields.get('number', -1),
+                           fields.get('tags', []), fields.get('abstract', ""), fields['articleID'])
+
+def parsePageCiteULikeByLines(the_page):
+    """ Parse a whole CiteULike.org results page at once by splitting it into
+    lines and checking every line for every kind of information in turn. This
+    is how getArticlesCiteULike used to work, it's kept as the baseline for
+    benchmarkCiteULikeParser.
+    
+    Arguments
+    ----------
+    the_page - str or unicode with the whole page.
+    
+    Returns
+    ----------
+    A list of Articles @see Article.
+    """
+    lines = the_page.split("\n") # Parsing lines is easier than coming up with regexes to get the info about all the articles from the_page. Besides not every article will have all the information.
+    
+    # Initialise the artcile attributes.
+    articleID=-1; articleTitle=""; authors=[]; year=0; journalTitle=""; doi=""; volume=-1; number=-1; tags=[]; abstract="";
+    articles = [] # Articles we've found.
+    firstArticle = True # If this is the first article we're reading.
+    for i in range(len(lines)):
+        if lines[i].startswith('<tr class="list {article_id:'):
+            if firstArticle: # articleID and all the rest aren't defined yet.
+                articleID = int(IntegersParern.findall(lines[i])[0])
+                firstArticle = False
+            else: # First add the artcile we've just parsed, then proceed to parsing the new one.
+                articles.append( Article.Article(articleTitle, authors, year, journalTitle, doi, volume, number, tags, abstract, articleID) )
+                articleID = int(IntegersParern.findall(lines[i])[0])
+        if '<a class="title"' in lines[i]:
+            articleTitle = TitlePattern.findall(lines[i])[0].rstrip("</a></h2>").lstrip(";</span>")
+        if "<a href='http://dx.doi.org" in lines[i]:
+            try:
+                journalTitle = JournalPattern.findall(lines[i])[0].rstrip("</i>").lstrip("<i>")
+            except IndexError:
+                print "\nNo journalTitle for:\n\t{}".format(lines[i])
+                journalTitle = "UNKNOWN JOURNAL"
                 
-                doi = DOIPattern.findall(lines[i])[0].lstrip(">").rstrip("</a></div>")
-            if '<a class="author"' in lines[i]:
-                authors = map(lambda x: x.lstrip(">").rstrip("</a>"), AuthorPattern.findall(lines[i]))
-            if '<span class="taglist">' in lines[i]:
-                tags = map(lambda x: x.lstrip(">").rstrip("</a>"), TagPattern.findall(lines[i]))
-            if '<h3>Abstract</h3>' in lines[i]:
-                abstract = lines[i+1].lstrip("<p>").rstrip("</p>")
-        # Add the last article.
-        articles.append( Article.Article(articleTitle, authors, year, journalTitle, doi, volume, number, tags, abstract, articleID) )
-
-        pageNo += 1 # Go to the next results page.
-        
+            try:
+                year = int( YearPattern.findall(lines[i])[0][-5:-1] ) # This may have a day and month in front, only extract the year (always last and followed by ")" ).
+            except IndexError:
+                print "\nNo year for:\n\t{}".format(lines[i])
+                year = 0
+            
+            try:
+                volume = int(VolPattern.findall(lines[i])[0].lstrip("Vol. "))
+            except IndexError:
+                print "\nNo volume for:\n\t{}".format(lines[i])
+                volume = -1
+            
+            try:
+                number = int(NoPattern.findall(lines[i])[0].lstrip("No. "))
+            except (IndexError, ValueError):
+                print "\nNo number for:\n\t{}".format(lines[i])
+                number = -1
+            
+            doi = DOIPattern.findall(lines[i])[0].lstrip(">").rstrip("</a></div>")
+        if '<a class="author"' in lines[i]:
+            authors = map(lambda x: x.lstrip(">").rstrip("</a>"), AuthorPattern.findall(lines[i]))
+        if '<span class="taglist">' in lines[i]:
+            tags = map(lambda x: x.lstrip(">").rstrip("</a>"), TagPattern.findall(lines[i]))
+        if '<h3>Abstract</h3>' in lines[i]:
+            abstract = lines[i+1].lstrip("<p>").rstrip("</p>")
+    # Add the last article.
+    articles.append( Article.Article(articleTitle, authors, year, journalTitle, doi, volume, number, tags, abstract, articleID) )
+    
     return articles
 
+def benchmarkCiteULikeParser(pages, repeats=3):
+    """ Time parsing CiteULike.org results pages with parseArticlesCiteULike and
+    with parsePageCiteULikeByLines.
+    
+    Arguments
+    ----------
+    pages - list of str with the sources of the pages.
+    repeats - int, how many times to time each parser, the best time is kept.
+    
+    Returns
+    ----------
+    A dict with the numbers of pages/s parsed by both parsers.
+    """
+    import time
+    parsers = {'parseArticlesCiteULike': lambda page: list(parseArticlesCiteULike([page])),
+               'parsePageCiteULikeByLines': parsePageCiteULikeByLines}
+    rates = {}
+    for name in parsers:
+        best = float('inf')
+        for r in range(repeats):
+            start = time.time()
+            for page in pages:
+                parsers[name](page)
+            best = min(best, time.time()-start)
+        rates[name] = len(pages)/best
+    return rates
+
 if __name__=="__main__": # If this is run as a stand-alone script run the verification/example searches.
     " Example search for many articles following search terms. "
 #    authors = ["langmuir", "tonks"] # Author names.
@@ -154,6 +443,8 @@ if __name__=="__main__": # If this is run as a stand-alone script run the verifi
 #    articles = getArticlesCiteULike(authors, tags, years[0], years[1], isbn) # One way, seems to be more restrictive because we can specify additional criteria, like min and max year etc.
 #    article = scholarSearchEngine.search(tags) # Another way, also works.
 
+    scholarSearchEngine.cache = ResponseCache.ResponseCache("pageCache", ttl=24*3600) # Don't download the same pages again when re-running.
+    
     " Search for the desired article. "
     theArticle = Article.Article("The Theory of Collectors in Gaseous Discharges", ["H.M. Mott-Smith", "Irving Langmuir"], 1926, "Physical Review", doi="10.1103/physrev.28.727", volume=28, number=4, citeULikeID=2534514)
     
@@ -163,22 +454,23 @@ if __name__=="__main__": # If this is run as a stand-alone script run the verifi
     papers = scholarSearchEngine.getArticlesFromPage(searchURL, ["Mock","terms"])
     
     # Find the article from the many that will be displayed - will define articleID.
-    articleID = 0 # Which article from the_page we're looking at.
-    currentMaxCited = 0
-    currentHighestAuthorSimilarity = 0
-    for i in range(len(papers)): # Articles that we have to look at to match to the article.
-        if theArticle.Year==papers[i].Year: # This article is from the same year, promising.
-            if difflib.SequenceMatcher(a="".join(theArticle.Authors).lower(), b="".join(papers[i].Authors).lower()).ratio() > currentHighestAuthorSimilarity: # The authors of this article look more like the authors of the input article.
-                currentHighestAuthorSimilarity = difflib.SequenceMatcher(a="".join(theArticle.Authors).lower(), b="".join(papers[i].Authors).lower()).ratio()
-                if papers[i].pubNoCitations> currentMaxCited: # We're probably after the popular articles. Sometimes will get copies of the original article with fewer citations.
-                    articleID = i # This is probably the article we're after.
+    # Compares titles, authors, journals and years; prefers the most cited of equally good matches, not the less cited copies.
+    articleID, score = RecordLinkage.match([theArticle], papers)[0]
+    if articleID is None: # Nothing similar enough, take the top result like Google Scholar would.
+        articleID = 0
     print "Found:\n{}\n when looking for:\n{}.".format(papers[articleID],theArticle)
     
     " Get articles citing theArticle. "
-    citingArticles = [] # Collect citing articles from all the result pages.
-    citingArticlesURLParts = papers[articleID].citingArticlesURL.split("?") # Need to split this to be able to display different result pages.
-    for startArticleIndex in range(0,papers[articleID].pubNoCitations,20): # The first article to be displayed on the Scholar page. Go every 20 articles to limit the number of requests we send.
-        temp = scholarSearchEngine.getArticlesFromPage(citingArticlesURLParts[0]+"?"+"start={}&num=20&".format(startArticleIndex)+citingArticlesURLParts[1],papers[articleID].Keywords)
-        citingArticles.extend(temp) # Add articles from this page to the results.
+    # Go every 20 articles to limit the number of requests we send, download a few pages at a time.
+    # If this dies half-way through, re-running it only downloads the pages that are missing.
+    citingArticles = scholarSearchEngine.getCitingArticles(papers[articleID].citingArticlesURL, papers[articleID].pubNoCitations,
+                                                           papers[articleID].Keywords, pageSize=20, maxWorkers=4, maxRequestsPerSecond=2,
+                                                           checkpoint=Checkpoint.Checkpoint("harvest.checkpoint"))
+    
+#    relatedArticles = scholarSearchEngine.getArticlesFromPage(papers[articleID].relatedArticlesURL,papers[articleID].Keywords)
+    scholarSearchEngine.close()
     
-#    relatedArticles = scholarSearchEngine.getArticlesFromPage(papers[articleID].relatedArticlesURL,papers[articleID].Keywords)
\ No newline at end of file
+    " Keep everything for later analyses. "
+    with ArticleRepository.ArticleRepository("articles.db") as repository:
+        added, merged = repository.upsert([theArticle] + papers + citingArticles)
+        print "Stored {} new articles, merged {} with the ones already stored.".format(added, merged)
\ No newline at end of file
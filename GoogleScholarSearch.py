@@ -8,19 +8,114 @@ I've updated it to BeautifulSoup4 and current syntax of Google Scholar source.
 Also started saving the results in a class object for compatibility with other code.
 
 @author: Alek
-@version: 1.0.2
+@version: 1.10.2
 @since: Mon  5 Oct 2015
 
 CHANGELOG:
 Sat  3 Oct 2015 - 1.0.0 - Alek - Issued the first version based on a class from the Internet.
 Mon  5 Oct 2015 - 1.0.1 - Alek - Now don't try to parse citations.
                 - 1.0.2 - Alek - Now convert authors' list to str from Unicode.
+Sun 18 Oct 2026 - 1.1.0 - Alek - Configurable search host and concurrent, rate-limited
+                                 harvesting of citing articles' result pages.
+                - 1.2.0 - Alek - Reuse keep-alive connections from a pool owned by the engine.
+                - 1.3.0 - Alek - Optional on-disk cache of the results pages.
+                - 1.3.1 - Alek - Pass the URLs and citations to the Article constructor, reset them for every record.
+                - 1.4.0 - Alek - Optional parser that only builds the soup of the records, parity checks of the parsers.
+                - 1.5.0 - Alek - Checkpoints of the harvests of citing articles, refreshing them when the citations grow.
+                - 1.6.0 - Alek - Optional metrics of the time spent getting and parsing every page.
+                - 1.7.0 - Alek - Optional RequestPolicy that throttles, retries and follows redirects.
+                - 1.8.0 - Alek - Ask for gzip-compressed results pages.
+                - 1.9.0 - Alek - Optional pipeline that parses the harvested pages in parser processes.
+                - 1.10.0 - Alek - Batches of searches with the duplicate queries sent once.
+                - 1.10.1 - Alek - Checkpoints of harvests go with the number of citations, skip redirected
+                                  pages and are removed when the harvest is complete.
+                - 1.10.2 - Alek - Don't download the queued pages or send the queued searches after an error
+                                  or when the caller stops early.
 """
-import httplib, urllib, re
-from bs4 import BeautifulSoup
-import Article
+import urllib, urlparse, re, time, threading
+from multiprocessing.pool import ThreadPool
+from bs4 import BeautifulSoup, SoupStrainer, Tag, NavigableString, CData
+import Article, HTTPTransport, Pipeline
 
 IntegerPattern = re.compile('\s+\d+\s*') # Expects at least one whitespace in front the integer. May be followed by a whtitespace too.
+RecordStrainer = SoupStrainer('div', attrs={'class': re.compile('(^|\s)gs_r(\s|$)')}) # Only the results records get parsed by the 'strainer' parser, their class isn't split into a list yet when parsing.
+Parsers = ['soup', 'strainer'] # Ways of finding the records in the results pages.
+RecordTextTypes = (NavigableString, CData) # Strings that make up the text of a Tag, i.e. not the comments.
+ParserEngine = None # Engine that parses the pages in a parser process, @see initParserProcess.
+
+class HostRateLimiter(object):
+    """ Spaces out the requests sent to every host so that no more than a given
+    number of them is started per second. Can be shared between many threads.
+    """
+    def __init__(self, maxRequestsPerSecond):
+        """ Initialise the limiter.
+        
+        Arguments
+        ----------
+        @param maxRequestsPerSecond - float, how many requests may be started per
+            second and per host; None or non-positive means no limit.
+        """
+        self.interval = 1.0/maxRequestsPerSecond if maxRequestsPerSecond else 0.
+        self.lock = threading.Lock()
+        self.nextSlot = {} # Earliest time at which the next request to every host may start.
+        
+    def wait(self, host):
+        """ Block until a request to host may be sent. """
+        if self.interval <= 0:
+            return
+        with self.lock: # Book the next free slot for this host, then sleep outside the lock.
+            now = time.time()
+            slot = max(now, self.nextSlot.get(host, now))
+            self.nextSlot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class SingleFlight(object):
+    """ Calls a function once for all the threads that ask for the same key at
+    the same time; the others wait for it and get the same result or exception.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {} # key : [threading.Event set when done, result, exception] of the calls in flight.
+        self.nCalls = 0 # Made.
+        self.nShared = 0 # Not made because an identical one was in flight.
+
+    def do(self, key, function):
+        """ Get function() or the result of the call with the same key in flight. """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = [threading.Event(), None, None]
+                self.nCalls += 1
+            else:
+                self.nShared += 1
+        if leader:
+            try:
+                call[1] = function()
+            except Exception as e:
+                call[2] = e
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call[0].set()
+        else:
+            call[0].wait()
+        if call[2] is not None:
+            raise call[2]
+        return call[1]
+
+def normaliseQuery(searchTerms):
+    """ Get the search terms that give the same results as searchTerms, Google
+    Scholar ignores the case, the extra whitespace and the order of the terms.
+
+    Returns
+    ----------
+    @return tuple of unique, lower-case str in alphabetical order.
+    """
+    terms = set(" ".join(term.split()).lower() for term in searchTerms)
+    terms.discard("")
+    return tuple(sorted(terms))
 
 class GoogleScholarSearchEngine:
     """ This class searches Google Scholar (http://scholar.google.com)
@@ -32,14 +127,80 @@ class GoogleScholarSearchEngine:
     <tt>
     > from google_search import *\n
     > searcher = GoogleScholarSearch()\n
-    > searcher.search(['breast cancer', 'gene'])
+    > searcher.search(['breast cancer', 'gene'])\n
+    > searcher.close()
     </tt>
     """
-    def __init__(self):
-        """  Empty initialiser.
+    def __init__(self, searchHost="scholar.google.com", searchPort=None, maxConnections=4, cache=None, parser='soup', metrics=None, policy=None, compress=True,
+                 nParsers=0):
+        """ Initialise the search engine.
+        
+        Arguments
+        ----------
+        @param searchHost - str, host to send the queries to (default=scholar.google.com),
+            can be changed e.g. to point at a local server that serves saved pages.
+        @param searchPort - int, port of the searchHost; default port for HTTP if None.
+        @param maxConnections - int, maximum number of keep-alive connections to
+            the searchHost that will be kept open and reused by all the requests (default=4).
+        @param cache - ResponseCache.ResponseCache where the downloaded results pages
+            will be kept and looked up before going on-line; no caching if None (default).
+        @param parser - str, how to find the records in the results pages: 'soup'
+            builds the soup of the whole page (default), 'strainer' only that of the
+            records and goes through each of them once, which is faster.
+        @param metrics - Metrics.MetricsRegistry where an event is recorded for every
+            results page under 'scholar'; nothing is recorded if None (default).
+        @param policy - RequestPolicy.RequestPolicy that adapts the rate of the
+            requests to the throttling by the searchHost, retries them and follows
+            the redirects; every request is sent once and a redirect gives no
+            Articles if None (default).
+        @param compress - bool, whether to ask for compressed results pages, they're
+            decompressed as they're read (default=True).
+        @param nParsers - int, number of processes that parse the pages harvested
+            by getCitingArticles while they're being downloaded, started when first
+            needed; the downloading threads parse the pages if 0 (default).
         """
-        self.SEARCH_HOST = "scholar.google.com"
+        if not parser in Parsers:
+            raise ValueError("Unknown parser {}, use one of {}.".format(parser, ", ".join(Parsers)))
+        self.SEARCH_HOST = searchHost
+        self.SEARCH_PORT = searchPort
         self.SEARCH_BASE_URL = "/scholar"
+        self.transport = HTTPTransport.ConnectionPool(maxConnectionsPerHost=maxConnections, timeout=30)
+        self.cache = cache
+        self.parser = parser
+        self.metrics = metrics
+        self.policy = policy
+        self.compress = compress
+        self.nParsers = nParsers
+        self.parsers = None # Pipeline.ParserPool, @see getParsers.
+        self.searches = SingleFlight() # Of searchMany, shared by all the threads that use the engine.
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def close(self):
+        """ Close all the connections to the searchHost and stop the parser processes. """
+        self.transport.close()
+        if self.parsers is not None:
+            self.parsers.close()
+            self.parsers = None
+
+    def getParsers(self):
+        """ Get the pool of nParsers parser processes, start it if needed. """
+        if self.parsers is None:
+            self.parsers = Pipeline.ParserPool(self.nParsers, initializer=initParserProcess, initargs=(self.parser,))
+        return self.parsers
+
+    def getHeaders(self):
+        """ Get the headers of the requests for the results pages. """
+        return {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.11 (KHTML, like Gecko) Chrome/23.0.1271.64 Safari/537.11',
+       'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+       'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.3',
+       'Accept-Encoding': HTTPTransport.AcceptEncoding if self.compress else 'identity',
+       'Accept-Language': 'en-US,en;q=0.8',
+       'Connection': 'keep-alive'}
 
     def search(self, searchTerms, limit=10):
         """ Searches Google Scholar using the specified terms.
@@ -82,6 +243,83 @@ class GoogleScholarSearchEngine:
         params = urllib.urlencode({'q': "+".join(searchTerms), 'num': limit})
         url = self.SEARCH_BASE_URL+"?"+params # URL of the actual search with all the terms.
         return self.getArticlesFromPage( url, searchTerms)
+
+    def searchMany(self, queries, limit=10, maxWorkers=4, maxRequestsPerSecond=None, rateLimiter=None):
+        """ Search for many lists of terms, e.g. the titles of many articles. The
+        queries are normalised (@see normaliseQuery) and every distinct one is sent
+        once, maxWorkers at a time over the engine's connection pool. Queries that
+        other threads are searching for with this engine at the same time aren't
+        sent again either, their results are shared.
+        
+        Arguments
+        ----------
+        @param queries - list of lists of str with the terms of every search.
+        @param limit - int, maximum number of results of every search (default=10).
+        @param maxWorkers - int, maximum number of searches sent at the same time (default=4).
+        @param maxRequestsPerSecond, rateLimiter - @see getCitingArticles.
+        
+        Returns
+        ----------
+        @return tuple of (list with the Articles of every query in the order of
+            queries, None for the ones that failed; dict with the numbers of
+            'queries', 'empty' ones that weren't sent, 'unique' non-empty ones,
+            'requests' sent, requests 'saved' out of those the non-empty queries
+            would need, 'shared' searches that were in flight in other threads and
+            the 'errors', a dict of the index of every failed query : its exception). The results of the
+            queries that are the same after normalising are the same list of Articles,
+            whose Keywords are the normalised terms.
+        """
+        if rateLimiter is None:
+            rateLimiter = HostRateLimiter(maxRequestsPerSecond)
+        keys = [normaliseQuery(terms) for terms in queries]
+        unique, seen = [], set() # Distinct non-empty queries in the order in which they first appear.
+        for key in keys:
+            if len(key) > 0 and not key in seen:
+                seen.add(key)
+                unique.append(key)
+        nSent, nShared = [0], [0]
+        countLock = threading.Lock()
+        
+        def searchOnce(key):
+            sent = [False]
+            def send():
+                rateLimiter.wait(self.SEARCH_HOST)
+                sent[0] = True
+                with countLock:
+                    nSent[0] += 1
+                return self.search(list(key), limit)
+            try:
+                return key, self.searches.do( (key, limit), send ), None
+            except Exception as e:
+                return key, None, e
+            finally:
+                if not sent[0]: # Another thread searched for it.
+                    with countLock:
+                        nShared[0] += 1
+        
+        found, failed = {(): []}, {} # Nothing to search for in the empty queries.
+        if len(unique) > 0:
+            pool = ThreadPool(max(1, min(maxWorkers, len(unique))))
+            completed = False
+            try:
+                for key, articles, error in pool.imap_unordered(searchOnce, unique):
+                    if error is None:
+                        found[key] = articles
+                    else:
+                        failed[key] = error
+                completed = True
+            finally:
+                if completed:
+                    pool.close()
+                else: # Don't send the queued searches, e.g. after a KeyboardInterrupt.
+                    pool.terminate()
+                pool.join()
+        
+        results = [found.get(key) for key in keys]
+        errors = dict((i, failed[key]) for i, key in enumerate(keys) if key in failed)
+        nEmpty = sum(1 for key in keys if len(key) == 0)
+        return results, {'queries': len(queries), 'empty': nEmpty, 'unique': len(unique), 'requests': nSent[0],
+                         'saved': len(queries)-nEmpty-nSent[0], 'shared': nShared[0], 'errors': errors}
         
     def getArticlesFromPage(self, url, searchTerms):
         """ Parses a given Google Scholar results page and returns a list of 
@@ -124,106 +362,533 @@ class GoogleScholarSearchEngine:
         ----------
         IOError when the connection to Google Scholar cannot be established.
         """
-        headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.11 (KHTML, like Gecko) Chrome/23.0.1271.64 Safari/537.11',
-       'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-       'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.3',
-       'Accept-Encoding': 'none',
-       'Accept-Language': 'en-US,en;q=0.8',
-       'Connection': 'keep-alive'}
+        articles = self.readArticlesFromPage(url, searchTerms)
+        return [] if articles is None else articles
+
+    def readArticlesFromPage(self, url, searchTerms):
+        """ Get the Articles from a results page like getArticlesFromPage, but tell
+        a redirected request (e.g. to a captcha) apart from a page without results.
+        
+        Returns
+        ----------
+        @return List of Articles (@see Article.Article), or None if we got redirected.
+        """
+        headers = self.getHeaders()
+        if self.metrics is None:
+            html = self.getPage(url, headers)
+            if html is None: # We got a redirect.
+                return None
+            return self.parseArticles(html, searchTerms)
 
-        conn = httplib.HTTPConnection(self.SEARCH_HOST, timeout=30)
-        conn.request("GET", url, body=None, headers=headers)
-        resp = conn.getresponse()
-        results = [] # The list of Articles we'll return.
+        event = {'url': url}
+        try:
+            html = self.getPage(url, headers, event)
+            articles = None if html is None else self.parseArticles(html, searchTerms, event)
+        except Exception as e:
+            event['error'] = type(e).__name__
+            raise
+        finally:
+            self.metrics.record('scholar', event)
+        return articles
+
+    def getPage(self, url, headers, event=None):
+        """ Download a results page from the searchHost, or take it from the
+        cache if the engine has one.
+        
+        Arguments
+        ----------
+        @param url - str, URL to be appended to the self.SEARCH_HOST.
+        @param headers - dict of str with the headers of the request.
+        @param event - dict where the 'status', the number of 'bytes' received and
+            'pageBytes' after decompressing, whether the page was 'cached' and
+            the timings of the response are put, @see
+            Metrics.MetricsRegistry; nothing is put anywhere if None (default).
+        
+        Returns
+        ----------
+        @return str with the raw HTML of the page, None if we got redirected.
+        
+        Raises
+        ----------
+        IOError when the connection to Google Scholar cannot be established or
+            the page isn't cached and the cache is offline, @see also
+            RequestPolicy.RequestPolicy.fetch if the engine has a policy.
+        """
+        cacheURL = "http://{}{}{}".format(self.SEARCH_HOST, ":{}".format(self.SEARCH_PORT) if self.SEARCH_PORT else "", url)
+        if self.cache is not None:
+            html = self.cache.get(cacheURL)
+            if html is not None:
+                if event is not None:
+                    event.update(cached=True, bytes=0, pageBytes=len(html))
+                return html
+            elif self.cache.offline:
+                raise IOError("Page isn't cached and the cache is offline: {}".format(cacheURL))
         
-        if resp.status==302: # We got a redirect.
-            pass#print resp.geturl() # TODO handle this
-            print "Got error 302 - redirection."
+        if self.policy is None:
+            resp = self.transport.request(self.SEARCH_HOST, self.SEARCH_PORT, "GET", url, headers=headers)
+        else:
+            resp = self.policy.fetch(cacheURL, lambda pageURL: self.send(pageURL, headers))
+        if event is not None:
+            event.update(resp.timings, status=resp.status, cached=False, bytes=resp.wireBytes, pageBytes=len(resp.body))
+        if resp.status==302: # We got a redirect, the metrics count it under its status.
+            return None
         elif resp.status==200:
-            html = resp.read()
-            html = html.decode('ascii', 'ignore') # Raw HTML file of the website with the search results.
-            # Screen-scrape the result to obtain the publication information
-            soup = BeautifulSoup(html)
-            
-            for record in soup.find_all('div',{'class': 'gs_r'}):#soup('p', {'class': 'g'}):
-                if "[CITATION]" in record.text: # This isn't an actual article.
-                    continue
-                else:
-                    allAs = record.find_all('a') # All <a></a> fields corresponding to this article.
-    
-                    " Get the public URL and the title, amybe full text URL if we're lucky. "
-                    if len( allAs[0].find_all("span") ): # The first <a> has some <span> children.
-                        fullURL = allAs[0].attrs['href'] # URL to the full text in HTML or PDF format (typically).
-                        pubURL = allAs[1].attrs['href'] # This will be the public URL one gets when they click on the title.
-                        pubTitle = allAs[1].text # Public URL has the title of the article as text.
-                    else: # The first <a> of the result is the one with the title and public URL.
-                        fullURL = "Unavailable" # No full text for this article... :(
-                        pubURL = allAs[0].attrs['href']
-                        pubTitle = allAs[0].text
-                        
-                    " Get the articles citing and related to this one. "
-                    for a in allAs:
-                        if "Cited by" in a.text:
-                            pubNoCitations = int(  IntegerPattern.findall(a.text)[0] )
-                            citingArticlesURL = a.attrs['href'] # Articles that cite this one.
-                        elif "Related articles" in a.text:
-                            relatedArticlesURL = a.attrs['href'] # URL to the related articles.
-                    
-                    " Get the authors; they're displayed in green, use it. "
-                    authorPart = record.find('div',attrs={'class':'gs_a'}).text #record.first('font', {'color': 'green'}).string
-                    if authorPart is None:    
-                        authorPart = ''
-                        # Sometimes even BeautifulSoup can fail, fall back to regex.
-                        m = re.findall('<font color="green">(.*)</font>', str(record))
-                        if len(m)>0:
-                            authorPart = m[0]
-    
-                    " Get journal name, publication year, and authors' list. "
-                    # Assume that the fields are delimited by ' - ', the first entry will be the
-                    # list of authors, the last entry is the journal URL. We also have journal name and year there.
-                    pubJournalYear = int(IntegerPattern.findall(authorPart)[0]) # We might get other integers, but not preceded by whitespaces.
-                    
-                    idx_start = authorPart.find(' - ') # Here the authors' list ends.
-                    idx_end = authorPart.rfind(' - ') # Here the journal's public URL starts.
-                    idx_jrnlNameEnd = authorPart.rfind(',') # After the journal name.
-                    
-                    pubJournalName = authorPart[idx_start:idx_jrnlNameEnd].lstrip().lstrip("-")
-                    
-                    pubAuthors = authorPart[:idx_start]                
-                    pubJournalURL = authorPart[idx_end + 3:]
-                    # If (only one ' - ' is found) and (the end bit contains '\d\d\d\d')
-                    # then the last bit is journal year instead of journal URL
-                    if pubJournalYear=='' and re.search('\d\d\d\d', pubJournalURL)!=None:
-                        pubJournalYear = pubJournalURL
-                        pubJournalURL = 'Unavailable'
-                    
-                    " Get the abstract. "
-                    abstractDiv = record.find('div',attrs={'class':'gs_rs'}) # Abstract info sits here.
-                    if not abstractDiv is None:
-                        pubAbstract = abstractDiv.text
-                    else:
-                        pubAbstract = "Abstract unavailable"
-                        print record#TODO see why this might trigger and maybe filter out such cases
-                        print "-"*10
-                    
-                    " Save the results. "
-                    results.append( Article.Article(pubTitle,map(str,pubAuthors.split(',')),pubJournalYear,pubJournalName,tagList=searchTerms,abstract=pubAbstract) )
-                    # All the URLs.
-                    results[-1].fullURL = fullURL
-                    results[-1].pubURL = pubURL
-                    results[-1].citingArticlesURL = citingArticlesURL
-                    results[-1].relatedArticlesURL = relatedArticlesURL
-                    # This might be useful to something, e.g. seeing whcih publications have the most impact.
-                    results[-1].pubNoCitations = pubNoCitations
+            if self.cache is not None:
+                self.cache.put(cacheURL, resp.body)
+            return resp.body
         else:
             raise IOError("Connection can't be established. Error code: {}, Reason: {}".format(resp.status,resp.reason))
+    
+    def send(self, url, headers):
+        """ Send a GET request to an absolute url through the connection pool,
+        used by the policy, which may be redirected to other hosts.
+        """
+        parts = urlparse.urlsplit(url)
+        return self.transport.request(parts.hostname, parts.port, "GET", urlparse.urlunsplit(('', '', parts.path, parts.query, '')), headers=headers)
+
+    def parseArticles(self, html, searchTerms, event=None):
+        """ Screen-scrape a Google Scholar results page and make Articles out
+        of all the results there, @see getArticlesFromPage. The records are
+        found by the parser chosen when creating the engine.
+        
+        Arguments
+        ----------
+        @param html - str with the raw HTML of the results page.
+        @param searchTerms - list of str, will be set as Keywords of the Articles.
+        @param event - dict where the seconds spent to 'decode' and 'parse' the
+            page and the number of 'records' found are put; nowhere if None (default).
+        
+        Returns
+        ----------
+        @return List of Articles (@see Article.Article), or an empty list if
+            nothing is found.
+        """
+        start = time.time() if event is not None else None
+        html = html.decode('ascii', 'ignore') # Raw HTML file of the website with the search results.
+        decoded = time.time() if event is not None else None
+        if self.parser == 'strainer':
+            records = self.findRecordsStrainer(html)
+        else:
+            records = self.findRecordsSoup(html)
+        articles = [self.makeArticle(allAs, authorPart, abstractDiv, record, searchTerms)
+                    for allAs, authorPart, abstractDiv, record in records]
+        if event is not None:
+            event.update(decode=decoded-start, parse=time.time()-decoded, records=len(articles))
+        return articles
+
+    def findRecordsSoup(self, html):
+        """ Find the parts of all the records on a results page by building the
+        whole soup of the page and searching every record a few times.
+        
+        Arguments
+        ----------
+        @param html - unicode with the HTML of the results page.
+        
+        Returns
+        ----------
+        @return generator of tuples of (list of all the <a> Tags, str with the text
+            of the gs_a div, gs_rs div Tag or None, the record's div Tag), one for
+            every record that isn't a [CITATION].
+        """
+        # Screen-scrape the result to obtain the publication information
+        soup = BeautifulSoup(html, "html.parser")
+        
+        for record in soup.find_all('div',{'class': 'gs_r'}):#soup('p', {'class': 'g'}):
+            if "[CITATION]" in record.text: # This isn't an actual article.
+                continue
+            allAs = record.find_all('a') # All <a></a> fields corresponding to this article.
             
-        return results # If everything's gone smoothly...
+            " Get the authors; they're displayed in green, use it. "
+            authorPart = record.find('div',attrs={'class':'gs_a'}).text #record.first('font', {'color': 'green'}).string
+            if authorPart is None:    
+                authorPart = ''
+                # Sometimes even BeautifulSoup can fail, fall back to regex.
+                m = re.findall('<font color="green">(.*)</font>', str(record))
+                if len(m)>0:
+                    authorPart = m[0]
+            
+            abstractDiv = record.find('div',attrs={'class':'gs_rs'}) # Abstract info sits here.
+            yield allAs, authorPart, abstractDiv, record
+
+    def findRecordsStrainer(self, html):
+        """ Find the parts of all the records on a results page like findRecordsSoup,
+        but only build the soup of the gs_r divs and go through every one of them once.
+        """
+        soup = BeautifulSoup(html, "html.parser", parse_only=RecordStrainer)
+        for record in soup.contents:
+            if not isinstance(record, Tag):
+                continue
+            allAs, authorDiv, abstractDiv = [], None, None
+            for element in record.descendants:
+                if type(element) in RecordTextTypes:
+                    if "[CITATION]" in element: # This isn't an actual article.
+                        break
+                elif element.name == 'a':
+                    allAs.append(element)
+                elif element.name == 'div':
+                    classes = element.get('class') or []
+                    if authorDiv is None and 'gs_a' in classes:
+                        authorDiv = element
+                    elif abstractDiv is None and 'gs_rs' in classes:
+                        abstractDiv = element
+            else:
+                yield allAs, authorDiv.text, abstractDiv, record
+
+    def makeArticle(self, allAs, authorPart, abstractDiv, record, searchTerms):
+        """ Make an Article out of the parts of a Google Scholar record.
+        
+        Arguments
+        ----------
+        @param allAs - list of all the <a> Tags of the record.
+        @param authorPart - str with the text of the gs_a div, i.e. authors, journal and year.
+        @param abstractDiv - gs_rs div Tag with the abstract or None.
+        @param record - the record's div Tag.
+        @param searchTerms - list of str, will be set as Keywords of the Article.
+        
+        Returns
+        ----------
+        @return Article.Article
+        """
+        " Get the public URL and the title, amybe full text URL if we're lucky. "
+        if len( allAs[0].find_all("span") ): # The first <a> has some <span> children.
+            fullURL = allAs[0].attrs['href'] # URL to the full text in HTML or PDF format (typically).
+            pubURL = allAs[1].attrs['href'] # This will be the public URL one gets when they click on the title.
+            pubTitle = allAs[1].text # Public URL has the title of the article as text.
+        else: # The first <a> of the result is the one with the title and public URL.
+            fullURL = "Unavailable" # No full text for this article... :(
+            pubURL = allAs[0].attrs['href']
+            pubTitle = allAs[0].text
+            
+        " Get the articles citing and related to this one. "
+        pubNoCitations = 0 # Not every article has been cited or has related ones.
+        citingArticlesURL = ""
+        relatedArticlesURL = ""
+        for a in allAs:
+            if "Cited by" in a.text:
+                pubNoCitations = int(  IntegerPattern.findall(a.text)[0] )
+                citingArticlesURL = a.attrs['href'] # Articles that cite this one.
+            elif "Related articles" in a.text:
+                relatedArticlesURL = a.attrs['href'] # URL to the related articles.
+        
+        " Get journal name, publication year, and authors' list. "
+        # Assume that the fields are delimited by ' - ', the first entry will be the
+        # list of authors, the last entry is the journal URL. We also have journal name and year there.
+        pubJournalYear = int(IntegerPattern.findall(authorPart)[0]) # We might get other integers, but not preceded by whitespaces.
+        
+        idx_start = authorPart.find(' - ') # Here the authors' list ends.
+        idx_end = authorPart.rfind(' - ') # Here the journal's public URL starts.
+        idx_jrnlNameEnd = authorPart.rfind(',') # After the journal name.
+        
+        pubJournalName = authorPart[idx_start:idx_jrnlNameEnd].lstrip().lstrip("-")
+        
+        pubAuthors = authorPart[:idx_start]                
+        pubJournalURL = authorPart[idx_end + 3:]
+        # If (only one ' - ' is found) and (the end bit contains '\d\d\d\d')
+        # then the last bit is journal year instead of journal URL
+        if pubJournalYear=='' and re.search('\d\d\d\d', pubJournalURL)!=None:
+            pubJournalYear = pubJournalURL
+            pubJournalURL = 'Unavailable'
+        
+        " Get the abstract. "
+        if not abstractDiv is None:
+            pubAbstract = abstractDiv.text
+        else:
+            pubAbstract = "Abstract unavailable" # E.g. citations and books without a snippet.
+        
+        " Save the results. "
+        # All the URLs and the number of citations, this might be useful to something,
+        # e.g. seeing whcih publications have the most impact.
+        return Article.Article(pubTitle,map(str,pubAuthors.split(',')),pubJournalYear,pubJournalName,tagList=searchTerms,abstract=pubAbstract,
+                                        fullURL=fullURL,pubURL=pubURL,citingArticlesURL=citingArticlesURL,
+                                        relatedArticlesURL=relatedArticlesURL,pubNoCitations=pubNoCitations)
+
+    def getCitingArticles(self, citingArticlesURL, pubNoCitations, searchTerms, pageSize=20,
+                          maxWorkers=4, maxRequestsPerSecond=None, rateLimiter=None, checkpoint=None):
+        """ Get all the Articles citing a given one by downloading all the result
+        pages at citingArticlesURL concurrently.
+        
+        Arguments
+        ----------
+        @param citingArticlesURL - str, citingArticlesURL field of the cited Article.
+        @param pubNoCitations - int, number of citations of the Article; decides how
+            many result pages there are.
+        @param searchTerms - list of str, will be set as Keywords of the Articles.
+        @param pageSize - int, number of Articles requested per result page (default=20).
+        @param maxWorkers - int, maximum number of pages downloaded at the same time (default=4);
+            all of them share the connection pool of the engine. The pages are
+            parsed in the engine's nParsers processes if it has any, @see iterArticlesFromPages.
+        @param maxRequestsPerSecond - float, maximum number of requests started per second
+            and per host; None means no limit (default).
+        @param rateLimiter - HostRateLimiter to share between many harvests; a new one
+            with maxRequestsPerSecond is created if None (default).
+        @param checkpoint - Checkpoint.Checkpoint where the pages downloaded so far
+            are saved every now and then and when a page can't be downloaded. The
+            pages saved there for the same citingArticlesURL, pubNoCitations and
+            pageSize aren't downloaded again, so a harvest that failed can be
+            resumed by calling this again. Pages we got redirected from aren't
+            saved, they're downloaded again when resuming. The checkpoint is removed
+            once all the pages have been downloaded. None means no checkpoints (default).
+        
+        Returns
+        ----------
+        @return List of Articles (@see Article.Article) from all the pages, in the
+            same order in which Google Scholar displays them; pages we got redirected
+            from have no Articles.
+        
+        Raises
+        ----------
+        IOError when any of the result pages cannot be downloaded.
+        """
+        if rateLimiter is None:
+            rateLimiter = HostRateLimiter(maxRequestsPerSecond)
+        starts = range(0, pubNoCitations, pageSize) # Of all the result pages.
+        # Articles from every page downloaded so far. Google Scholar orders the results
+        # differently when the number of citations changes, so the pages only go with that number.
+        state = {'url': citingArticlesURL, 'pubNoCitations': pubNoCitations, 'pageSize': pageSize, 'pages': {}}
+        if checkpoint is not None:
+            saved = checkpoint.load()
+            if saved is not None and all(saved.get(key) == state[key] for key in ['url', 'pubNoCitations', 'pageSize']):
+                state = saved
+        pages = state['pages']
+        toDownload = dict((self.getResultPageURL(citingArticlesURL, start, pageSize), start) for start in starts if not start in pages)
+        
+        nRedirected = 0
+        if len(toDownload) > 0:
+            try:
+                for url, articles in self.iterArticlesFromPages(sorted(toDownload, key=toDownload.get), searchTerms,
+                                                                maxWorkers, rateLimiter, ordered=False):
+                    if articles is None: # Redirected, e.g. to a captcha, not a page without results.
+                        nRedirected += 1
+                        continue
+                    pages[toDownload[url]] = articles
+                    if checkpoint is not None and checkpoint.due():
+                        checkpoint.save(state)
+            except:
+                if checkpoint is not None: # Keep what we've got for when this is resumed.
+                    checkpoint.save(state)
+                raise
+        if checkpoint is not None:
+            if nRedirected > 0: # Get the missing pages when this is resumed.
+                checkpoint.save(state)
+            else:
+                checkpoint.remove()
+        
+        results = []
+        for start in starts: # Keep the order of the pages.
+            results.extend(pages.get(start, []))
+        return results
+
+    def iterArticlesFromPages(self, urls, searchTerms, maxWorkers=4, rateLimiter=None, ordered=True):
+        """ Get the Articles from many results pages, downloading maxWorkers of them
+        at the same time. If the engine has nParsers, the downloaded pages are
+        parsed in that many processes while the next ones are being downloaded;
+        the downloads wait if the parsers fall behind. Otherwise every page is
+        parsed by the thread that downloaded it.
+        
+        Arguments
+        ----------
+        @param urls - list of str, URLs of the results pages on the searchHost.
+        @param searchTerms - list of str, will be set as Keywords of the Articles.
+        @param maxWorkers - int, maximum number of pages downloaded at the same time (default=4).
+        @param rateLimiter - HostRateLimiter to wait for before every request; no limit if None (default).
+        @param ordered - bool, whether to yield the pages in the order of urls (default)
+            or as soon as they're parsed.
+        
+        Returns
+        ----------
+        @return generator of tuples of (str url, list of Articles from the page or
+            None if we got redirected instead of getting the page).
+        
+        Raises
+        ----------
+        IOError when any of the result pages cannot be downloaded.
+        """
+        if rateLimiter is None:
+            rateLimiter = HostRateLimiter(None)
+        if self.nParsers == 0:
+            def getPage(url):
+                rateLimiter.wait(self.SEARCH_HOST)
+                return url, self.readArticlesFromPage(url, searchTerms)
+            pool = ThreadPool(max(1, min(maxWorkers, len(urls))))
+            completed = False
+            try:
+                for result in (pool.imap if ordered else pool.imap_unordered)(getPage, urls):
+                    yield result
+                completed = True
+            finally:
+                if completed:
+                    pool.close()
+                else: # A page failed or the caller stopped early, don't download the queued ones.
+                    pool.terminate()
+                pool.join()
+            return
+        
+        def fetch(url): # In the downloading threads.
+            rateLimiter.wait(self.SEARCH_HOST)
+            event = {'url': url} if self.metrics is not None else None
+            try:
+                return self.getPage(url, self.getHeaders(), event), searchTerms, event
+            except Exception as e:
+                if event is not None:
+                    event['error'] = type(e).__name__
+                    self.metrics.record('scholar', event)
+                raise
+        
+        for url, (articles, event) in Pipeline.pipeline(urls, fetch, parseResultsPage, self.getParsers(), maxWorkers, ordered):
+            if event is not None:
+                self.metrics.record('scholar', event)
+            yield url, articles
+
+    def refreshCitingArticles(self, articles, lastCounts, searchTerms, **harvestSettings):
+        """ Get the Articles citing those of articles that have been cited more
+        times than when this was last done. Google Scholar doesn't list the citing
+        articles by date, so all the pages of those articles are downloaded again.
+        
+        Arguments
+        ----------
+        @param articles - list of Articles, e.g. the results of the same search as
+            last time, with up-to-date pubNoCitations.
+        @param lastCounts - dict of citingArticlesURL : int with pubNoCitations when
+            the citing Articles were last downloaded, e.g. the one returned last time
+            or an empty one. Updated here with the current numbers.
+        @param searchTerms - list of str, will be set as Keywords of the Articles.
+        @param harvestSettings - passed on to getCitingArticles, e.g. pageSize.
+        
+        Returns
+        ----------
+        @return dict of citingArticlesURL : List of Articles citing the article,
+            only for the articles whose number of citations has grown.
+        
+        Raises
+        ----------
+        IOError when any of the result pages cannot be downloaded; the numbers of
+            the articles refreshed until then are already updated in lastCounts.
+        """
+        refreshed = {}
+        for article in articles:
+            if not article.citingArticlesURL or article.pubNoCitations <= lastCounts.get(article.citingArticlesURL, 0):
+                continue
+            refreshed[article.citingArticlesURL] = self.getCitingArticles(article.citingArticlesURL, article.pubNoCitations,
+                                                                          searchTerms, **harvestSettings)
+            lastCounts[article.citingArticlesURL] = article.pubNoCitations
+        return refreshed
+
+    def getResultPageURL(self, url, start, pageSize=20):
+        """ Make a URL that displays pageSize results from a Google Scholar results
+        page url, starting from the result with index start.
+        
+        Arguments
+        ----------
+        @param url - str, URL of the results page, e.g. citingArticlesURL of an Article;
+            the host part, if present, is dropped.
+        @param start - int, index of the first result to display.
+        @param pageSize - int, how many results to display.
+        
+        Returns
+        ----------
+        @return str with the URL to be appended to self.SEARCH_HOST.
+        """
+        parts = urlparse.urlsplit(url)
+        query = [(k, v) for k, v in urlparse.parse_qsl(parts.query, keep_blank_values=True) if not k in ('start', 'num')]
+        query = [('start', start), ('num', pageSize)] + query
+        return urlparse.urlunsplit(('', '', parts.path, urllib.urlencode(query), ''))
+
+def initParserProcess(parser):
+    """ Set up a parser process for parseResultsPage, @see Pipeline.ParserPool. """
+    global ParserEngine
+    ParserEngine = GoogleScholarSearchEngine(parser=parser)
+
+def parseResultsPage(page):
+    """ Parse a results page in a parser process.
+    
+    Arguments
+    ----------
+    @param page - tuple of (str with the raw HTML of the page or None if we got
+        redirected, list of str searchTerms, dict event or None), @see
+        GoogleScholarSearchEngine.parseArticles.
+    
+    Returns
+    ----------
+    @return tuple of (list of Articles or None if we got redirected, the event
+        with the parsing timings).
+    """
+    html, searchTerms, event = page
+    if html is None:
+        return None, event
+    return ParserEngine.parseArticles(html, searchTerms, event), event
+
+def compareParsers(html, searchTerms=[]):
+    """ Parse a results page with all the parsers and compare the Articles they
+    make field by field.
+    
+    Arguments
+    ----------
+    @param html - str with the raw HTML of the results page.
+    @param searchTerms - list of str, will be set as Keywords of the Articles.
+    
+    Returns
+    ----------
+    @return list of str describing every difference, empty if all the parsers agree.
+    """
+    engines = [GoogleScholarSearchEngine(parser=parser) for parser in Parsers]
+    results = [engine.parseArticles(html, searchTerms) for engine in engines]
+    differences = []
+    for parser, articles in zip(Parsers[1:], results[1:]):
+        if len(articles) != len(results[0]):
+            differences.append("{} found {} articles, {} found {}.".format(Parsers[0], len(results[0]), parser, len(articles)))
+            continue
+        for i, (expected, found) in enumerate(zip(results[0], articles)):
+            for field, a, b in zip(Article.Article.__slots__, expected.__getstate__(), found.__getstate__()):
+                if a != b:
+                    differences.append("Article {} {}: {} gives {!r}, {} gives {!r}.".format(i, field, Parsers[0], a, parser, b))
+    return differences
+
+def benchmarkParsers(pages, repeats=3):
+    """ Check that all the parsers make the same Articles out of the results pages
+    and time how many pages per second every one of them parses.
+    
+    Arguments
+    ----------
+    @param pages - list of str with the raw HTML of the results pages.
+    @param repeats - int, how many times to time each parser, the best time is kept.
+    
+    Returns
+    ----------
+    @return dict with the numbers of pages/s parsed with every parser.
+    
+    Raises
+    ----------
+    AssertionError if the parsers disagree on any page.
+    """
+    for n, html in enumerate(pages):
+        differences = compareParsers(html)
+        assert not differences, "Parsers disagree on page {}:\n{}".format(n, "\n".join(differences))
+    
+    rates = {}
+    for parser in Parsers:
+        engine = GoogleScholarSearchEngine(parser=parser)
+        best = float('inf')
+        for r in range(repeats):
+            start = time.time()
+            for html in pages:
+                engine.parseArticles(html, [])
+            best = min(best, time.time()-start)
+        rates[parser] = len(pages)/best
+    return rates
 
 if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1: # Saved results pages to check and time the parsers on.
+        rates = benchmarkParsers([open(path, 'rb').read() for path in sys.argv[1:]])
+        print "All the parsers agree on all {} pages.".format(len(sys.argv)-1)
+        for parser in sorted(rates):
+            print "{}: {:.1f} pages/s".format(parser, rates[parser])
+        sys.exit()
+    
     search = GoogleScholarSearchEngine()
     pubs = search.search(["breast cancer", "gene"], 10)
     for pub in pubs:
         print pub
         # This is how to get the citing abd related Articles.
-#        search.getArticlesFromPage(pub.citingArticlesURL,["breast cancer", "gene"],)
\ No newline at end of file
+#        search.getArticlesFromPage(pub.citingArticlesURL,["breast cancer", "gene"],)
+    search.close()
\ No newline at end of file
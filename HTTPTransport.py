@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:12:31 2026
+
+A pool of persistent (keep-alive) HTTP connections that can be shared by many
+requests and threads, so that every request doesn't have to open a new TCP
+connection to the same host.
+
+@author: Alek
+@version: 1.2.0
+@since: Sun Oct 18 10:12:31 2026
+
+CHANGELOG:
+Sun Oct 18 10:12:31 2026 - 1.0.0 - Alek - Issued the first version.
+                         - 1.1.0 - Alek - Time the connect, first byte and body phases of every response.
+                         - 1.2.0 - Alek - Decompress gzip and deflate bodies as they're read.
+"""
+import httplib, socket, select, threading, time, zlib
+
+ChunkSize = 64*1024 # Bytes read from the socket at a time.
+ContentEncodings = {'gzip': 16+zlib.MAX_WBITS, 'x-gzip': 16+zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS} # zlib window bits of every encoding.
+AcceptEncoding = "gzip, deflate" # What to ask for in the Accept-Encoding header to get compressed pages.
+
+class Decompressor(object):
+    """ Decompresses a body sent with a given Content-Encoding piece by piece,
+    so that the whole compressed body never has to be kept.
+    """
+    def __init__(self, encoding):
+        """ Initialise the decompressor.
+
+        Arguments
+        ----------
+        @param encoding - str with the Content-Encoding of the body, None or
+            'identity' if it's not compressed.
+
+        Raises
+        ----------
+        IOError if the encoding isn't one of ContentEncodings.
+        """
+        self.encoding = (encoding or "identity").strip().lower()
+        if self.encoding == "identity":
+            self.decompressor = None
+        elif self.encoding in ContentEncodings:
+            self.decompressor = zlib.decompressobj(ContentEncodings[self.encoding])
+        else:
+            raise IOError("Unsupported Content-Encoding: {}".format(encoding))
+        self.started = False
+
+    def decompress(self, chunk):
+        """ Get the decompressed data in the next chunk of the body. """
+        if self.decompressor is None:
+            return chunk
+        if self.started or self.encoding != 'deflate' or not chunk:
+            return self.decompressor.decompress(chunk)
+        self.started = True
+        try:
+            return self.decompressor.decompress(chunk)
+        except zlib.error: # Some servers send raw deflate data without the zlib header.
+            self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self.decompressor.decompress(chunk)
+
+    def flush(self):
+        """ Get what's left after the last chunk. """
+        return self.decompressor.flush() if self.decompressor is not None else ""
+
+def readBody(fileobj, encoding):
+    """ Read a whole body from fileobj (e.g. an httplib.HTTPResponse) and
+    decompress it as it arrives.
+
+    Arguments
+    ----------
+    @param fileobj - object whose read(n) returns the next n bytes of the body, "" at the end.
+    @param encoding - str with the Content-Encoding of the body or None, @see Decompressor.
+
+    Returns
+    ----------
+    @return tuple of (str with the decompressed body, int number of bytes read).
+    """
+    decompressor = Decompressor(encoding)
+    parts = []
+    nBytes = 0
+    while True:
+        chunk = fileobj.read(ChunkSize)
+        if not chunk:
+            break
+        nBytes += len(chunk)
+        parts.append(decompressor.decompress(chunk))
+    parts.append(decompressor.flush())
+    return "".join(parts), nBytes
+
+class Response(object):
+    """ A fully-read HTTP response; the connection it came from can already be
+    serving other requests.
+
+    Attributes
+    ----------
+    status - int with the HTTP status code.
+    reason - str with the reason phrase sent by the server.
+    headers - dict of str with the response headers, names in lower case.
+    body - str with the body of the response, decompressed if it was sent compressed.
+    wireBytes - int, number of bytes of the body as it was sent.
+    timings - dict of float, seconds spent opening the connection ('connect', 0
+        for a reused one), sending the request and waiting for the status line
+        and the headers ('firstByte') and reading and decompressing the body ('body').
+    """
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.wireBytes = len(body)
+        self.timings = {}
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name.lower(), default)
+
+class ConnectionPool(object):
+    """ Keeps idle keep-alive connections to every host and hands them out to
+    requests to the same host. At most maxConnectionsPerHost connections to any
+    host are open at any time; requests wait for a free one if needed.
+
+    Example
+    ----------
+    <tt>
+    > pool = ConnectionPool()\n
+    > resp = pool.request("scholar.google.com", None, "GET", "/scholar?q=gene")\n
+    > pool.close()
+    </tt>
+    """
+    def __init__(self, maxConnectionsPerHost=4, timeout=30, maxIdleTime=60.):
+        """ Initialise an empty pool.
+
+        Arguments
+        ----------
+        @param maxConnectionsPerHost - int, maximum number of connections that may
+            be open to any single host, in use or idle (default=4).
+        @param timeout - float, socket timeout of the connections in seconds (default=30).
+        @param maxIdleTime - float, idle connections older than this many seconds
+            are not reused, servers tend to drop them anyway (default=60).
+        """
+        self.maxConnectionsPerHost = maxConnectionsPerHost
+        self.timeout = timeout
+        self.maxIdleTime = maxIdleTime
+        self.condition = threading.Condition()
+        self.idle = {} # (host, port) : list of (connection, time when it was released)
+        self.nOpen = {} # (host, port) : number of open connections, idle or in use.
+        self.closed = False
+        self.nCreated = 0 # How many connections have been opened so far.
+        self.nReused = 0 # How many requests have been sent through an already open connection.
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def request(self, host, port, method, url, headers={}, body=None):
+        """ Send a request through a pooled connection and read the response.
+
+        Arguments
+        ----------
+        @param host - str, host to send the request to.
+        @param port - int, port of the host, default one for HTTP if None.
+        @param method - str, HTTP method, e.g. GET.
+        @param url - str, path and query to request.
+        @param headers - dict of str with the request headers.
+        @param body - str with the request body or None.
+
+        Returns
+        ----------
+        @return Response with the whole body already read.
+
+        Raises
+        ----------
+        IOError (socket.error or httplib.HTTPException) when the request fails
+            on a newly opened connection.
+        """
+        key = (host, port)
+        conn, reused = self.acquire(key)
+        try:
+            try:
+                resp = self.send(conn, method, url, headers, body)
+            except (httplib.HTTPException, socket.error):
+                if not reused:
+                    raise
+                # The server closed the idle connection in the meantime, try a fresh one.
+                conn.close()
+                conn = self.connect(key)
+                resp = self.send(conn, method, url, headers, body)
+        except:
+            conn.close()
+            self.release(key, None)
+            raise
+        self.release(key, None if resp.willClose else conn)
+        return resp
+
+    def send(self, conn, method, url, headers, body):
+        """ Send one request through conn and read and decompress the whole response. """
+        start = time.time()
+        if conn.sock is None: # Connect explicitly, httplib would do it when sending, to time it separately.
+            conn.connect()
+        connected = time.time()
+        conn.request(method, url, body=body, headers=headers)
+        r = conn.getresponse()
+        firstByte = time.time()
+        body, wireBytes = readBody(r, r.getheader('content-encoding'))
+        resp = Response(r.status, r.reason, dict(r.getheaders()), body)
+        resp.wireBytes = wireBytes
+        resp.timings = {'connect': connected-start, 'firstByte': firstByte-connected, 'body': time.time()-firstByte}
+        resp.willClose = r.will_close
+        return resp
+
+    def connect(self, key):
+        """ Open a new connection to key=(host, port). """
+        self.nCreated += 1
+        return httplib.HTTPConnection(key[0], key[1], timeout=self.timeout)
+
+    def acquire(self, key):
+        """ Get a healthy idle connection to key=(host, port) or open a new one,
+        wait if there are already maxConnectionsPerHost connections in use.
+
+        Returns
+        ----------
+        @return tuple of (httplib.HTTPConnection, bool that is True if it had been used before).
+        """
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise IOError("The connection pool has been closed.")
+                idle = self.idle.get(key, [])
+                while idle:
+                    conn, released = idle.pop() # The most recently used one is the least likely to be stale.
+                    if time.time()-released < self.maxIdleTime and self.isHealthy(conn):
+                        self.nReused += 1
+                        return conn, True
+                    conn.close()
+                    self.nOpen[key] -= 1
+                if self.nOpen.get(key, 0) < self.maxConnectionsPerHost:
+                    self.nOpen[key] = self.nOpen.get(key, 0) + 1
+                    break
+                self.condition.wait()
+        return self.connect(key), False
+
+    def release(self, key, conn):
+        """ Return conn to the pool of idle connections to key=(host, port), or
+        forget about a connection that has been closed if conn is None.
+        """
+        with self.condition:
+            if conn is None or self.closed:
+                if conn is not None:
+                    conn.close()
+                self.nOpen[key] -= 1
+            else:
+                self.idle.setdefault(key, []).append( (conn, time.time()) )
+            self.condition.notify()
+
+    @staticmethod
+    def isHealthy(conn):
+        """ Check whether an idle connection can still be used. An idle socket
+        should have nothing to read - if it's readable the server has closed it
+        or sent something we don't expect.
+        """
+        if conn.sock is None:
+            return False
+        try:
+            readable, _, _ = select.select([conn.sock], [], [], 0)
+        except (select.error, socket.error, ValueError):
+            return False
+        return len(readable) == 0
+
+    def close(self):
+        """ Close all the idle connections; the ones in use are closed when
+        they're released. No new requests may be sent afterwards.
+        """
+        with self.condition:
+            self.closed = True
+            for key in self.idle:
+                for conn, _ in self.idle[key]:
+                    conn.close()
+                    self.nOpen[key] -= 1
+            self.idle = {}
+            self.condition.notify_all()
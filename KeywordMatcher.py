@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:48:36 2026
+
+Find all of many keywords in a text in a single pass over it, using the
+Aho-Corasick automaton. The time it takes to scan a page depends on the length
+of the page and the number of matches, not on how many keywords we look for.
+
+The automaton steps through the text one character at a time in Python, whereas
+'in' and regular expressions scan it in C, so checking the keywords one by one is
+faster unless there are very many of them. matchedKeywords does that for fewer
+than AutomatonThreshold keywords.
+
+Running this file benchmarks the matcher against checking every keyword with
+a separate 'in' to find where the automaton starts to pay off.
+
+@author: Alek
+@version: 1.1.0
+@since: Sun Oct 18 15:48:36 2026
+
+CHANGELOG:
+Sun Oct 18 15:48:36 2026 - 1.0.0 - Alek - Issued the first version.
+                         - 1.1.0 - Alek - Look for fewer than AutomatonThreshold keywords one by one.
+"""
+import collections, re
+
+WordCharacterPattern = re.compile('\w', re.UNICODE) # Characters that make up words.
+AutomatonThreshold = 400 # Number of keywords from which the automaton finds them faster than looking for them one by one.
+
+class KeywordMatcher(object):
+    """ Aho-Corasick automaton built from a list of keywords.
+
+    Example
+    ----------
+    <tt>
+    > matcher = KeywordMatcher(['TerraPower', 'Bill Gates'], caseSensitive=False)\n
+    > matcher.findAll("Bill Gates founded terrapower")\n
+    [('Bill Gates', 0), ('TerraPower', 19)]
+    </tt>
+    """
+    def __init__(self, keywords, caseSensitive=True, wholeWords=False):
+        """ Build the automaton.
+
+        Arguments
+        ----------
+        @param keywords - list of str (or unicode) to look for.
+        @param caseSensitive - bool, if False upper and lower case letters are
+            treated as the same (default=True).
+        @param wholeWords - bool, if True keywords only match when they aren't a
+            part of a longer word, e.g. 'Gates' won't match 'Gatestone' (default=False).
+        """
+        self.keywords = list(keywords)
+        self.caseSensitive = caseSensitive
+        self.wholeWords = wholeWords
+
+        " Build the trie of the keywords. "
+        self.goto = [{}] # Transitions of every state, state 0 is the root.
+        self.output = [[]] # Indices of the keywords that end in every state.
+        for i, keyword in enumerate(self.keywords):
+            state = 0
+            for char in self.normalise(keyword):
+                if not char in self.goto[state]:
+                    self.goto.append({})
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto)-1
+                state = self.goto[state][char]
+            self.output[state].append(i)
+
+        " Add the failure links breadth-first, so the ones of shorter prefixes are known first. "
+        self.fail = [0]*len(self.goto)
+        queue = collections.deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nextState in self.goto[state].items():
+                queue.append(nextState)
+                f = self.fail[state]
+                while f and not char in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nextState] = self.goto[f].get(char, 0)
+                self.output[nextState] = self.output[nextState] + self.output[self.fail[nextState]]
+        self.delta = [dict(g) for g in self.goto] # Transitions with the failure links already followed, filled in as the text is scanned.
+
+        " Ways of finding every keyword on its own, used by matchedKeywords when there are few keywords. "
+        self.normalisedKeywords = [self.normalise(keyword) for keyword in self.keywords]
+        self.wordPatterns = None
+        if wholeWords:
+            self.wordPatterns = [re.compile('(?<!\w)' + re.escape(keyword) + '(?!\w)', re.UNICODE) for keyword in self.normalisedKeywords]
+
+    def transition(self, state, char):
+        """ Follow the failure links from state until char can be consumed and
+        remember where this led, so it's a single dict lookup next time.
+        """
+        s = state
+        while s and not char in self.goto[s]:
+            s = self.fail[s]
+        nextState = self.goto[s].get(char, 0)
+        self.delta[state][char] = nextState
+        return nextState
+
+    def normalise(self, text):
+        """ Bring text to the form in which it's matched. """
+        return text if self.caseSensitive else text.lower()
+
+    def finditer(self, text):
+        """ Scan text once and yield every occurrence of every keyword.
+
+        Arguments
+        ----------
+        @param text - str (or unicode) to search.
+
+        Returns
+        ----------
+        @return generator of tuples of (str with the keyword, int with the index
+            in text where it starts), in the order in which the keywords end.
+        """
+        delta, output = self.delta, self.output
+        state = 0
+        for i, char in enumerate(self.normalise(text)):
+            nextState = delta[state].get(char)
+            state = self.transition(state, char) if nextState is None else nextState
+            for k in output[state]:
+                start = i+1-len(self.keywords[k])
+                if self.wholeWords and not self.isWholeWord(text, start, i+1):
+                    continue
+                yield self.keywords[k], start
+
+    def findAll(self, text):
+        """ Get a list of all the (keyword, start index) matches in text, @see finditer. """
+        return list(self.finditer(text))
+
+    def matchedKeywords(self, text, useAutomaton=None):
+        """ Get the set of keywords that occur in text at least once.
+
+        Arguments
+        ----------
+        @param text - str (or unicode) to search.
+        @param useAutomaton - bool, whether to scan text with the automaton once or
+            to look for every keyword separately; the former if there are at least
+            AutomatonThreshold keywords if None (default).
+        """
+        if useAutomaton is None:
+            useAutomaton = len(self.keywords) >= AutomatonThreshold
+        if useAutomaton:
+            return set(keyword for keyword, _ in self.finditer(text))
+        text = self.normalise(text)
+        if self.wordPatterns is None:
+            return set(keyword for keyword, normalised in zip(self.keywords, self.normalisedKeywords) if normalised in text)
+        return set(keyword for keyword, pattern in zip(self.keywords, self.wordPatterns) if pattern.search(text))
+
+    @staticmethod
+    def isWholeWord(text, start, end):
+        """ Check if text[start:end] isn't preceded or followed by a word character. """
+        return ((start == 0 or not WordCharacterPattern.match(text[start-1])) and
+                (end == len(text) or not WordCharacterPattern.match(text[end])))
+
+def benchmark(textLength=200000, keywordCounts=[1, 2, 10, 100, 300, 500, 1000, 3000], repeats=3):
+    """ Time scanning a random text for growing numbers of keywords with the
+    automaton of a KeywordMatcher, with a separate 'in' for every keyword and
+    with KeywordMatcher.matchedKeywords, which picks one of the two.
+
+    Returns
+    ----------
+    @return list of dicts with the number of keywords and the best times of the
+        three methods in seconds.
+    """
+    import random, time
+    rng = random.Random(0)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10))) for _ in range(5000)]
+    text = " ".join(rng.choice(words) for _ in range(textLength//7))
+    results = []
+    for n in keywordCounts:
+        keywords = ["{} {}".format(rng.choice(words), rng.choice(words)) for _ in range(n)]
+        matcher = KeywordMatcher(keywords)
+        timeAutomaton, timeIn, timeMatcher = [], [], []
+        for r in range(repeats):
+            start = time.time()
+            matcher.matchedKeywords(text, useAutomaton=True)
+            timeAutomaton.append(time.time()-start)
+            start = time.time()
+            [key for key in keywords if key in text]
+            timeIn.append(time.time()-start)
+            start = time.time()
+            matcher.matchedKeywords(text)
+            timeMatcher.append(time.time()-start)
+        results.append({'keywords': n, 'automaton': min(timeAutomaton), 'in': min(timeIn), 'matcher': min(timeMatcher)})
+    return results
+
+if __name__ == '__main__':
+    results = benchmark()
+    for result in results:
+        print ("{keywords:5d} keywords: automaton {automaton:.4f} s, 'in' per keyword {in:.4f} s, "
+               "matchedKeywords {matcher:.4f} s").format(**result)
+    faster = [result['keywords'] for result in results if result['automaton'] < result['in']]
+    print "The automaton is faster from {} keywords on, AutomatonThreshold is {}.".format(faster[0] if faster else "more than {}".format(results[-1]['keywords']), AutomatonThreshold)
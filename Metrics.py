@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:48:30 2026
+
+Find out where the time of a harvest or a crawl goes. The search engines and
+netWorm can be given a MetricsRegistry; they then record an event for every page
+with the time spent in each phase of getting it (connect, first byte, body,
+decode, parse), the number of bytes, the records found and the status code.
+The registry keeps histograms of all of these and passes the events on to any
+listeners. Without a registry nothing is recorded and nearly no time is spent.
+
+@author: Alek
+@version: 1.0.0
+@since: Sun Oct 18 22:48:30 2026
+
+CHANGELOG:
+Sun Oct 18 22:48:30 2026 - 1.0.0 - Alek - Issued the first version.
+"""
+import math, threading, time
+
+Phases = ['connect', 'firstByte', 'body', 'decode', 'parse'] # Of getting a page, timed in seconds.
+Quantities = ['bytes', 'pageBytes', 'records'] # Sizes of a page (bytes on the wire and decompressed) that are also kept in histograms.
+
+class Histogram(object):
+    """ Distribution of non-negative values in logarithmic buckets, each about
+    19% wider than the previous one, so the quantiles are accurate to ~10%
+    and the memory used doesn't grow with the number of values.
+    """
+    Base = 2**0.25 # Ratio of the edges of consecutive buckets.
+
+    def __init__(self):
+        self.buckets = {} # Index : number of values, bucket i holds [Base**i, Base**(i+1)); None holds the zeros.
+        self.count = 0
+        self.sum = 0.
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, value):
+        bucket = int(math.floor(math.log(value, self.Base))) if value > 0 else None
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """ Estimate the value below which fraction q of the values lie. """
+        if self.count == 0:
+            return None
+        rank = q*self.count
+        seen = self.buckets.get(None, 0)
+        if seen >= rank and seen > 0:
+            return 0.
+        for bucket in sorted(b for b in self.buckets if b is not None):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.max, max(self.min, self.Base**(bucket+0.5))) # Middle of the bucket.
+        return self.max
+
+    def summary(self):
+        """ Get a dict with the count, sum, min, mean, 50th, 90th and 99th percentiles and max. """
+        if self.count == 0:
+            return {'count': 0}
+        return {'count': self.count, 'sum': self.sum, 'min': self.min, 'mean': self.sum/self.count,
+                'p50': self.quantile(0.5), 'p90': self.quantile(0.9), 'p99': self.quantile(0.99), 'max': self.max}
+
+class MetricsRegistry(object):
+    """ Collects the events of getting pages from many threads.
+
+    An event is a dict with the 'url' of the page and any of: 'status' (int HTTP
+    code), 'cached' (bool), the Phases and Quantities, and 'error' (str with the
+    type of the exception). It's recorded under a source, e.g. 'scholar'.
+
+    Example
+    ----------
+    <tt>
+    > metrics = MetricsRegistry()\n
+    > metrics.addListener(lambda source, event: sys.stdout.write("{} {}\\n".format(source, event)))\n
+    > engine = GoogleScholarSearchEngine(metrics=metrics)\n
+    > engine.getCitingArticles(url, 500, terms)\n
+    > print metrics.report()
+    </tt>
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {} # "source.phase" : Histogram.
+        self.counters = {} # "source.what" : int.
+        self.listeners = []
+
+    def addListener(self, listener):
+        """ Call listener(source, event) with every recorded event, in the thread
+        that records it.
+        """
+        self.listeners.append(listener)
+
+    def increment(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        """ Add value to the histogram called name. """
+        with self.lock:
+            self.histogram(name).add(value)
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def record(self, source, event):
+        """ Record an event of getting a page, @see MetricsRegistry. """
+        with self.lock:
+            self.counters[source+".requests"] = self.counters.get(source+".requests", 0) + 1
+            for name in ['status', 'error']:
+                if event.get(name) is not None:
+                    key = "{}.{}.{}".format(source, name, event[name])
+                    self.counters[key] = self.counters.get(key, 0) + 1
+            if event.get('cached'):
+                self.counters[source+".cached"] = self.counters.get(source+".cached", 0) + 1
+            for name in Phases + Quantities:
+                if event.get(name) is not None:
+                    self.histogram(source+"."+name).add(event[name])
+        for listener in self.listeners:
+            listener(source, event)
+
+    def summary(self):
+        """ Get a dict with the 'counters' and the summaries of all the 'histograms'. """
+        with self.lock:
+            return {'counters': dict(self.counters),
+                    'histograms': dict((name, h.summary()) for name, h in self.histograms.items())}
+
+    def report(self):
+        """ Get a table of the counters and the histograms as str. """
+        summary = self.summary()
+        lines = ["{:40s} {:>10d}".format(name, value) for name, value in sorted(summary['counters'].items())]
+        lines.append("{:40s} {:>8s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s}".format("", "count", "mean", "p50", "p90", "p99", "max"))
+        for name, h in sorted(summary['histograms'].items()):
+            lines.append("{:40s} {:>8d} {:>10.4g} {:>10.4g} {:>10.4g} {:>10.4g} {:>10.4g}".format(
+                name, h['count'], h['mean'], h['p50'], h['p90'], h['p99'], h['max']))
+        return "\n".join(lines)
+
+def timedIterator(iterable, event, name):
+    """ Go through iterable and add the time spent waiting for its items, but not
+    the time spent using them, to event[name].
+    """
+    iterator = iter(iterable)
+    event[name] = event.get(name, 0.)
+    while True:
+        start = time.time()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            event[name] += time.time()-start
+            return
+        event[name] += time.time()-start
+        yield item
+
+if __name__ == '__main__':
+    import StandInServer, GoogleScholarSearch
+    server = StandInServer.startServer(StandInServer.ScholarHandler, nPages=1000)
+    " Harvest the same citing articles without and with metrics to see what they cost. "
+    for metrics in [None, MetricsRegistry()]:
+        engine = GoogleScholarSearch.GoogleScholarSearchEngine("127.0.0.1", server.server_address[1], parser='strainer', metrics=metrics)
+        start = time.time()
+        for repeat in range(5):
+            engine.getCitingArticles("/scholar?q=probe&hl=en", 1000, ["probe"]) # All the articles the stand-in has.
+        print "{} metrics: {:.3f} s".format("Without" if metrics is None else "With", time.time()-start)
+        engine.close()
+    print metrics.report()
+    server.shutdown()
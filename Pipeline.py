@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 00:26:53 2026
+
+Download pages in threads and parse them in processes at the same time. Fetching
+waits for the network and parsing for the CPU, which one thread can't share
+with the others because of the GIL. Here fetcher threads hand the raw pages to
+a pool of parser processes, at most a given number at a time, so the fetchers
+wait when the parsers fall behind instead of piling up pages in memory.
+
+The parsing functions run in other processes, so they have to be defined at the
+top level of a module and take and return things that can be pickled.
+
+@author: Alek
+@version: 1.0.2
+@since: Mon Oct 19 00:26:53 2026
+
+CHANGELOG:
+Mon Oct 19 00:26:53 2026 - 1.0.0 - Alek - Issued the first version.
+                         - 1.0.1 - Alek - Don't fetch further ahead of the consumer than the pipeline holds,
+                                          re-raise errors with their tracebacks.
+                         - 1.0.2 - Alek - Fail the pages whose results can't be pickled, that take too long or
+                                          whose parser process dies instead of waiting for them forever.
+"""
+import multiprocessing, sys, threading, time, traceback, Queue
+
+def callSafely(function, args):
+    """ Call function(*args) in a parser process and return (result, None), or
+    (None, exception) if it raises, because Pool.apply_async can't report errors.
+    Tracebacks can't be pickled, so the exception gets the text of its own as
+    parserTraceback.
+    """
+    try:
+        return function(*args), None
+    except Exception as e:
+        e.parserTraceback = traceback.format_exc()
+        return None, e
+
+class ParserPool(object):
+    """ A pool of parser processes with at most maxPending pages submitted and
+    not parsed yet; submitting more blocks until a page has been parsed.
+
+    multiprocessing.Pool never reports on a page whose parser process dies and
+    only reports a result that can't be pickled to someone waiting for it, so a
+    thread watches the pages that are pending and fails those, as well as the
+    ones that take longer than timeout.
+
+    Example
+    ----------
+    <tt>
+    > parsers = ParserPool(4)\n
+    > parsers.submit(parsePage, (html,), lambda result, error: results.put( (result, error) ))\n
+    > parsers.close()
+    </tt>
+    """
+    def __init__(self, nParsers=None, maxPending=None, initializer=None, initargs=(), timeout=None):
+        """ Start the parser processes.
+
+        Arguments
+        ----------
+        @param nParsers - int, number of processes; one per CPU if None (default).
+        @param maxPending - int, maximum number of pages waiting for or being
+            parsed; twice nParsers if None (default).
+        @param initializer - function called with initargs in every process when
+            it starts, e.g. to set up what the parsing functions need; or None (default).
+        @param timeout - float, seconds after which a page that's been submitted
+            and not parsed fails; no limit if None (default).
+        """
+        self.nParsers = nParsers or multiprocessing.cpu_count()
+        self.maxPending = maxPending or 2*self.nParsers
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(self.maxPending)
+        self.lock = threading.Lock()
+        self.pending = {} # Number of the page : [AsyncResult, callback, time submitted].
+        self.nSubmitted = 0
+        self.broken = False # Whether the pool still waits for pages that have been failed.
+        self.pool = multiprocessing.Pool(self.nParsers, initializer, initargs)
+        self.workers = set(process.pid for process in self.pool._pool)
+        self.stopped = threading.Event()
+        self.watcher = threading.Thread(target=self.watch)
+        self.watcher.daemon = True
+        self.watcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def submit(self, function, args, callback):
+        """ Parse in a process: call function(*args) there and then callback(result,
+        error) in a thread of this process, error is None if function didn't raise.
+        Blocks while maxPending pages are waiting to be parsed.
+        """
+        self.slots.acquire()
+        with self.lock:
+            job, self.nSubmitted = self.nSubmitted, self.nSubmitted+1
+            self.pending[job] = [None, callback, time.time()]
+            self.pending[job][0] = self.pool.apply_async(callSafely, (function, args),
+                                                         callback=lambda outcome: self.settle(job, outcome))
+
+    def settle(self, job, outcome):
+        """ Free the slot of job and call its callback with outcome, unless that's been done already. """
+        with self.lock:
+            entry = self.pending.pop(job, None)
+        if entry is not None:
+            self.slots.release()
+            entry[1](*outcome)
+
+    def watch(self):
+        """ Check the pending pages every now and then until the pool is closed. """
+        while not self.stopped.wait(0.2):
+            self.check()
+
+    def check(self):
+        """ Fail the pending pages that won't be parsed: those whose result the pool
+        couldn't pass back and, if a parser process has died or is about to be
+        replaced, all the others, as it's not known which one it was parsing.
+        Also fail the pages that have been pending for longer than timeout.
+        """
+        processes = list(self.pool._pool)
+        died = any(process.exitcode for process in processes) or any(not process.pid in self.workers for process in processes)
+        self.workers = set(process.pid for process in processes)
+        now = time.time()
+        with self.lock:
+            pending = self.pending.items()
+        for job, (result, callback, submitted) in pending:
+            if result.ready():
+                if not result.successful(): # Otherwise the pool calls settle.
+                    try:
+                        result.get(0)
+                    except Exception as e:
+                        self.settle(job, (None, e))
+            elif died:
+                self.broken = True
+                self.settle(job, (None, multiprocessing.ProcessError("A parser process died, the page may not have been parsed.")))
+            elif self.timeout is not None and now-submitted > self.timeout:
+                self.broken = True
+                self.settle(job, (None, multiprocessing.TimeoutError("The page hasn't been parsed in {} s.".format(self.timeout))))
+
+    def close(self):
+        """ Parse what's been submitted and stop the processes. """
+        while self.pending: # Those that won't be parsed are failed by the watcher.
+            time.sleep(0.05)
+        self.stopped.set()
+        self.watcher.join()
+        if self.broken: # The pool would wait for the pages that were failed.
+            self.pool.terminate()
+        else:
+            self.pool.close()
+        self.pool.join()
+
+    def terminate(self):
+        """ Stop the processes right away, without parsing what's left. """
+        self.stopped.set()
+        self.watcher.join()
+        self.pool.terminate()
+        self.pool.join()
+
+def pipeline(items, fetch, parse, parsers, nFetchers=4, ordered=True):
+    """ Fetch every item in threads and parse what's fetched in parser processes.
+
+    Arguments
+    ----------
+    @param items - iterable of things to fetch, e.g. URLs.
+    @param fetch - function that gets the page of an item, called in the fetcher
+        threads; what it returns is passed to parse and has to be picklable.
+    @param parse - top-level function that parses a fetched page in a parser process.
+    @param parsers - ParserPool to parse in; it's shared, so it isn't closed here.
+    @param nFetchers - int, number of fetcher threads (default=4).
+    @param ordered - bool, whether to yield the results in the order of items
+        (default) or as soon as they're parsed.
+
+    Returns
+    ----------
+    @return generator of (item, what parse returned for it). Closing it early
+        stops the fetchers after the pages they're fetching. Items are only fetched
+        when fewer than nFetchers + parsers.maxPending of them are being fetched,
+        parsed or waiting to be yielded, so the pages don't pile up in memory
+        when the consumer or, if ordered, the page in front is slow.
+
+    Raises
+    ----------
+    The first exception raised by fetch or parse, with its traceback (that of
+    parse is in its parserTraceback), once the fetchers have stopped.
+    """
+    items = list(items)
+    toFetch = Queue.Queue()
+    for index, item in enumerate(items):
+        toFetch.put( (index, item) )
+    results = Queue.Queue() # (index, item, result, exc_info of the error or None)
+    stopping = threading.Event()
+    window = nFetchers + parsers.maxPending # Maximum number of items fetched and not yielded yet.
+    progress = threading.Condition()
+    nYielded = [0]
+
+    def parsed(index, item, result, error):
+        results.put( (index, item, result, None if error is None else (type(error), error, None)) )
+
+    def fetcher():
+        while not stopping.is_set():
+            try:
+                index, item = toFetch.get_nowait() # In the order of items, so the one in front is always in the window.
+            except Queue.Empty:
+                return
+            with progress:
+                while index >= nYielded[0] + window and not stopping.is_set():
+                    progress.wait(1.)
+            if stopping.is_set():
+                return
+            try:
+                page = fetch(item)
+            except Exception:
+                results.put( (index, item, None, sys.exc_info()) )
+                continue
+            parsers.submit(parse, (page,), lambda result, error, index=index, item=item: parsed(index, item, result, error))
+
+    def taken(): # By the consumer, let the fetchers go on.
+        with progress:
+            nYielded[0] += 1
+            progress.notify_all()
+
+    threads = [threading.Thread(target=fetcher) for i in range(max(1, min(nFetchers, len(items))))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    try:
+        waiting = {} # index : (item, result) parsed before the items in front of them.
+        nextIndex = 0
+        for n in range(len(items)):
+            while True:
+                try: # Wait with a timeout, otherwise Ctrl+C doesn't interrupt it.
+                    index, item, result, error = results.get(timeout=1.)
+                    break
+                except Queue.Empty:
+                    pass
+            if error is not None:
+                raise error[0], error[1], error[2]
+            if not ordered:
+                taken()
+                yield item, result
+                continue
+            waiting[index] = (item, result)
+            while nextIndex in waiting:
+                taken()
+                yield waiting.pop(nextIndex)
+                nextIndex += 1
+    finally:
+        stopping.set()
+        with progress:
+            progress.notify_all()
+        for thread in threads:
+            thread.join()
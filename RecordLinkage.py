@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:12:37 2026
+
+Find which of many candidate Articles (e.g. Google Scholar results) is the same
+publication as each of many target Articles (e.g. CiteULike.org records).
+
+Comparing every target with every candidate doesn't scale, so the candidates are
+put in blocks: one for every (year, pair of consecutive title words) and every
+(year, author's surname). Only the candidates that share a block with a target
+are scored. Titles, authors and journals are summarised as MinHash signatures,
+so the similarity of all the pairs is computed at once with numpy.
+
+Running this file times matching synthetic targets against synthetic candidates,
+by default 100 000 of each; give another number as an argument.
+
+@author: Alek
+@version: 1.0.0
+@since: Sun Oct 18 19:12:37 2026
+
+CHANGELOG:
+Sun Oct 18 19:12:37 2026 - 1.0.0 - Alek - Issued the first version.
+"""
+import re, unicodedata
+import numpy
+from ArticleStore import asInt
+
+NonWordPattern = re.compile('[\W_]+', re.UNICODE) # Punctuation and whitespace between the words.
+MersennePrime = (1 << 31) - 1 # Modulus of the MinHash hash functions.
+
+def normalise(text):
+    """ Bring text to lower case ASCII-ish words separated by single spaces, so
+    that e.g. u'Théorie  of-Collectors' and 'theorie of collectors' are the same.
+    """
+    if isinstance(text, str):
+        text = text.decode('utf-8', 'ignore')
+    try:
+        text.encode('ascii')
+    except UnicodeEncodeError: # Get rid of the accents.
+        text = u"".join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return u" ".join(NonWordPattern.sub(u" ", text.lower()).split())
+
+def surname(author):
+    """ Get the normalised surname out of a name like 'H.M. Mott-Smith', 'HM Mott-Smith'
+    or 'Irving Langmuir', i.e. the last word with the hyphens and apostrophes removed.
+    """
+    words = normalise(author.replace('-', '').replace("'", '')).split()
+    return words[-1] if words else u""
+
+def trigrams(texts):
+    """ Get the three-byte pieces of many normalised texts at once.
+
+    Arguments
+    ----------
+    @param texts - list of unicode.
+
+    Returns
+    ----------
+    @return tuple of (numpy array of uint32 with the pieces of all the texts as
+        24-bit ints, one text after another; numpy array of int with the number
+        of pieces of every text).
+    """
+    data = [u" {} ".format(text).encode('utf-8') for text in texts]
+    sizes = numpy.array([len(d) for d in data], dtype=numpy.int64)
+    lengths = sizes-2
+    if lengths.sum() == 0:
+        return numpy.zeros(0, dtype=numpy.uint32), lengths
+    chars = numpy.frombuffer("".join(data), dtype=numpy.uint8).astype(numpy.uint32)
+    codes = (chars[:-2] << 16) | (chars[1:-1] << 8) | chars[2:]
+    # Drop the pieces that span two texts.
+    positions = numpy.arange(len(chars), dtype=numpy.int64) - numpy.repeat(numpy.cumsum(sizes)-sizes, sizes)
+    return codes[(positions < numpy.repeat(lengths, sizes))[:-2]], lengths
+
+class LinkageRecords(object):
+    """ The features of many Articles used for blocking and scoring them. """
+    def __init__(self, articles, nHashes=32, seed=0):
+        """ Extract the features.
+
+        Arguments
+        ----------
+        @param articles - list of Article.Articles.
+        @param nHashes - int, length of the MinHash signatures of the titles; the
+            authors and journals get half as many (default=32).
+        @param seed - int, seed of the random hash functions; records can only be
+            compared if they were made with the same one (default=0).
+        """
+        self.titleWords = []
+        self.surnames = []
+        titles, journals, authorHashes = [], [], []
+        self.years = numpy.empty(len(articles), dtype=numpy.int32)
+        self.citations = numpy.empty(len(articles), dtype=numpy.int64)
+        for i, article in enumerate(articles):
+            title = normalise(article.Title)
+            names = set(surname(a) for a in article.Authors) - set([u""])
+            self.titleWords.append(title.split())
+            self.surnames.append(names)
+            titles.append(title)
+            journals.append(normalise(article.Journal))
+            authorHashes.append([hash(name) & 0xffffffff for name in names])
+            self.years[i] = asInt(article.Year)
+            self.citations[i] = asInt(article.pubNoCitations, 0)
+
+        rng = numpy.random.RandomState(seed)
+        self.titles = minHash(trigrams(titles), rng, nHashes)
+        self.authors = minHash((numpy.fromiter((h for hashes in authorHashes for h in hashes), dtype=numpy.uint32),
+                                numpy.array([len(hashes) for hashes in authorHashes], dtype=numpy.int64)),
+                               rng, max(1, nHashes//2))
+        self.journals = minHash(trigrams(journals), rng, max(1, nHashes//2))
+
+    def __len__(self):
+        return len(self.titleWords)
+
+    def blockingKeys(self, i, year=None):
+        """ Get the keys of the blocks record i belongs to, i.e. (year, pair of
+        consecutive title words) and (year, surname). A title with one word is
+        its own key. Records with unknown year (-1) only share blocks with each other.
+
+        Arguments
+        ----------
+        @param i - int, index of the record.
+        @param year - int to put in the keys instead of the record's own year, to
+            look up the neighbouring years; the record's year if None (default).
+        """
+        year = self.years[i] if year is None else year
+        words = self.titleWords[i]
+        keys = [u"{}|t|{} {}".format(year, words[j], words[j+1]) for j in xrange(len(words)-1)]
+        if len(words) == 1:
+            keys.append(u"{}|t|{}".format(year, words[0]))
+        keys.extend(u"{}|a|{}".format(year, name) for name in self.surnames[i])
+        return keys
+
+def minHash(sets, rng, nHashes):
+    """ Compute the MinHash signatures of many sets of ints at once; the fraction
+    of equal entries in two signatures estimates the Jaccard similarity of the two
+    sets. Repeated elements don't matter.
+
+    Arguments
+    ----------
+    @param sets - tuple of (numpy array of ints in [0, 2**32) with the elements of
+        all the sets one after another, numpy array of int with the size of every set).
+    @param rng - numpy.random.RandomState used to pick the hash functions.
+    @param nHashes - int, length of the signatures.
+
+    Returns
+    ----------
+    @return numpy array of uint32 with shape (number of sets, nHashes); the rows
+        of empty sets are all MersennePrime.
+    """
+    elements, lengths = sets
+    a = rng.randint(1, MersennePrime, nHashes).astype(numpy.uint64)
+    b = rng.randint(0, MersennePrime, nHashes).astype(numpy.uint64)
+    signatures = numpy.full((len(lengths), nHashes), MersennePrime, dtype=numpy.uint32)
+    nonEmpty = numpy.flatnonzero(lengths)
+    if len(nonEmpty) == 0:
+        return signatures
+    elements = elements.astype(numpy.uint64) % MersennePrime
+    starts = (numpy.cumsum(lengths)-lengths)[nonEmpty] # Elements of set i start at starts[i].
+    for k in xrange(nHashes):
+        values = (a[k]*elements + b[k]) % MersennePrime
+        signatures[nonEmpty, k] = numpy.minimum.reduceat(values, starts)
+    return signatures
+
+def signatureSimilarity(signaturesA, signaturesB):
+    """ Fraction of equal entries in pairs of MinHash signatures, 0 where either
+    set was empty.
+    """
+    similarity = (signaturesA == signaturesB).mean(axis=1)
+    similarity[(signaturesA[:, 0] == MersennePrime) | (signaturesB[:, 0] == MersennePrime)] = 0.
+    return similarity
+
+class BlockingIndex(object):
+    """ The candidates put in blocks, ready to be matched against any number of targets.
+
+    Example
+    ----------
+    <tt>
+    > index = BlockingIndex(scholarArticles)\n
+    > for target, (i, score) in zip(citeULikeArticles, index.match(citeULikeArticles)):\n
+    >     print target.Title, "->", None if i is None else scholarArticles[i].Title, score
+    </tt>
+    """
+    def __init__(self, candidates, maxBlockSize=100, nHashes=32):
+        """ Build the index.
+
+        Arguments
+        ----------
+        @param candidates - list of Article.Articles to look for the targets among.
+        @param maxBlockSize - int, blocks with more candidates than this, e.g. of
+            common words, aren't used because they'd lead to too many comparisons (default=100).
+        @param nHashes - int, length of the MinHash signatures of the titles (default=32).
+        """
+        self.records = LinkageRecords(candidates, nHashes)
+        self.nHashes = nHashes
+        self.maxBlockSize = maxBlockSize
+        " Postings of the blocks: candidates of the block with id k are members[starts[k]:starts[k+1]]. "
+        self.keyIDs = {}
+        keys, members = [], []
+        for i in xrange(len(self.records)):
+            for key in self.records.blockingKeys(i):
+                keys.append(self.keyIDs.setdefault(key, len(self.keyIDs)))
+                members.append(i)
+        keys = numpy.array(keys, dtype=numpy.int64)
+        order = numpy.argsort(keys, kind='mergesort') # Stable, so every block lists its candidates in order.
+        self.members = numpy.array(members, dtype=numpy.int64)[order]
+        self.sizes = numpy.bincount(keys, minlength=len(self.keyIDs)).astype(numpy.int64)
+        self.starts = numpy.cumsum(self.sizes)-self.sizes
+
+    def candidatePairs(self, targets, yearTolerance=1):
+        """ Find all the (target, candidate) pairs that share a block.
+
+        Arguments
+        ----------
+        @param targets - LinkageRecords of the targets.
+        @param yearTolerance - int, also look for candidates published this many
+            years before or after the target (default=1).
+
+        Returns
+        ----------
+        @return tuple of two numpy arrays of int with the indices of the targets
+            and of the candidates of every distinct pair.
+        """
+        queryTargets, queryKeys = [], []
+        for i in xrange(len(targets)):
+            year = targets.years[i]
+            years = [year] if year == -1 else range(year-yearTolerance, year+yearTolerance+1)
+            for y in years:
+                for key in targets.blockingKeys(i, y):
+                    k = self.keyIDs.get(key)
+                    if k is not None:
+                        queryTargets.append(i)
+                        queryKeys.append(k)
+        queryTargets = numpy.array(queryTargets, dtype=numpy.int64)
+        queryKeys = numpy.array(queryKeys, dtype=numpy.int64)
+        lengths = self.sizes[queryKeys]
+        usable = lengths <= self.maxBlockSize
+        queryTargets, queryKeys, lengths = queryTargets[usable], queryKeys[usable], lengths[usable]
+
+        " Expand every (target, block) into (target, member of the block). "
+        total = lengths.sum()
+        offsets = numpy.arange(total, dtype=numpy.int64) - numpy.repeat(numpy.cumsum(lengths)-lengths, lengths)
+        pairTargets = numpy.repeat(queryTargets, lengths)
+        pairCandidates = self.members[numpy.repeat(self.starts[queryKeys], lengths) + offsets]
+        pairs = numpy.unique(pairTargets*len(self.records) + pairCandidates)
+        return pairs // len(self.records), pairs % len(self.records)
+
+    def score(self, targets, pairTargets, pairCandidates, weights=(0.6, 0.25, 0.1, 0.05), yearTolerance=1):
+        """ Score the similarity of pairs of targets and candidates.
+
+        Arguments
+        ----------
+        @param targets - LinkageRecords of the targets.
+        @param pairTargets, pairCandidates - numpy arrays of int with the indices
+            of the target and the candidate of every pair.
+        @param weights - tuple of float with the weights of the similarities of
+            the titles, authors, journals and years, should add up to 1.
+        @param yearTolerance - int, years this far apart count as half-similar.
+
+        Returns
+        ----------
+        @return numpy array of float in [0, 1] with the score of every pair.
+        """
+        candidates = self.records
+        yearDifference = numpy.abs(targets.years[pairTargets] - candidates.years[pairCandidates])
+        return (weights[0]*signatureSimilarity(targets.titles[pairTargets], candidates.titles[pairCandidates]) +
+                weights[1]*signatureSimilarity(targets.authors[pairTargets], candidates.authors[pairCandidates]) +
+                weights[2]*signatureSimilarity(targets.journals[pairTargets], candidates.journals[pairCandidates]) +
+                weights[3]*numpy.where(yearDifference == 0, 1., numpy.where(yearDifference <= yearTolerance, 0.5, 0.)))
+
+    def match(self, targets, minScore=0.5, yearTolerance=1, weights=(0.6, 0.25, 0.1, 0.05), chunkSize=1000000):
+        """ Find the best matching candidate of every target. Of the equally good
+        ones, e.g. copies of the same article, the most cited one is picked.
+
+        Arguments
+        ----------
+        @param targets - list of Article.Articles to find.
+        @param minScore - float, candidates that score less than this aren't
+            considered a match (default=0.5).
+        @param yearTolerance - int, also look at candidates published this many
+            years before or after the target (default=1).
+        @param weights - tuple of float with the weights of the similarities of
+            the titles, authors, journals and years, @see score.
+        @param chunkSize - int, how many pairs to score at once, limits the memory used.
+
+        Returns
+        ----------
+        @return list with a tuple of (int index of the best candidate or None if
+            there isn't one, float with its score) for every target.
+        """
+        targets = LinkageRecords(targets, self.nHashes)
+        pairTargets, pairCandidates = self.candidatePairs(targets, yearTolerance)
+        scores = numpy.empty(len(pairTargets))
+        for start in xrange(0, len(pairTargets), chunkSize):
+            chunk = slice(start, start+chunkSize)
+            scores[chunk] = self.score(targets, pairTargets[chunk], pairCandidates[chunk], weights, yearTolerance)
+
+        good = scores >= minScore
+        pairTargets, pairCandidates, scores = pairTargets[good], pairCandidates[good], scores[good]
+        order = numpy.lexsort((-self.records.citations[pairCandidates], -scores, pairTargets))
+        pairTargets, pairCandidates, scores = pairTargets[order], pairCandidates[order], scores[order]
+        first = numpy.ones(len(pairTargets), dtype=bool) # The best pair of every target comes first.
+        first[1:] = pairTargets[1:] != pairTargets[:-1]
+
+        results = [(None, 0.)]*len(targets)
+        for i, c, s in zip(pairTargets[first], pairCandidates[first], scores[first]):
+            results[i] = (int(c), float(s))
+        return results
+
+def match(targets, candidates, minScore=0.5, yearTolerance=1, maxBlockSize=100):
+    """ Find the best matching candidate of every target, @see BlockingIndex.match.
+
+    Arguments
+    ----------
+    @param targets - list of Article.Articles to find.
+    @param candidates - list of Article.Articles to look for them among.
+    @param minScore - float, candidates that score less than this aren't
+        considered a match (default=0.5).
+    @param yearTolerance - int, also look at candidates published this many
+        years before or after the target (default=1).
+    @param maxBlockSize - int, @see BlockingIndex (default=100).
+
+    Returns
+    ----------
+    @return list with a tuple of (int index in candidates of the best one or None
+        if there isn't one, float with its score) for every target.
+    """
+    return BlockingIndex(candidates, maxBlockSize).match(targets, minScore, yearTolerance)
+
+def benchmark(n=100000, seed=0):
+    """ Match n synthetic targets against n synthetic candidates. The targets are
+    altered copies of random candidates: different case, author names written with
+    full first names, a typo in the title and sometimes the year off by one; each
+    also has a copy among the candidates that is less cited.
+
+    Returns
+    ----------
+    @return dict with the times of building the index and of matching in seconds,
+        and the fraction of targets matched to the candidate they were made from.
+    """
+    import random, time, Article
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10))) for _ in range(20000)]
+    surnames = [w.capitalize() for w in words[:5000]]
+    journals = ["Journal of {} {}".format(rng.choice(words).capitalize(), rng.choice(words).capitalize()) for _ in range(500)]
+
+    candidates = []
+    for i in range(n):
+        candidates.append(Article.Article(" ".join(rng.choice(words) for _ in range(rng.randint(4, 12))).capitalize(),
+                                          ["{}.{}. {}".format(rng.choice("ABCDEFGH"), rng.choice("ABCDEFGH"), rng.choice(surnames))
+                                           for _ in range(rng.randint(1, 5))],
+                                          rng.randint(1900, 2015), rng.choice(journals), pubNoCitations=rng.randint(0, 1000)))
+    sources = rng.sample(range(n), n//2)
+    for i in sources[:n//10]: # Less cited copies of some of the articles.
+        original = candidates[i]
+        candidates.append(Article.Article(original.Title, original.Authors, original.Year, original.Journal,
+                                          pubNoCitations=original.pubNoCitations//2))
+    targets = []
+    for i in sources:
+        original = candidates[i]
+        title = list(original.Title.upper())
+        title[rng.randrange(len(title))] = rng.choice("abcdefghijklmnopqrstuvwxyz") # Typo.
+        targets.append(Article.Article("".join(title),
+                                       ["{} {}".format(rng.choice(words).capitalize(), a.split()[-1]) for a in original.Authors],
+                                       original.Year + (rng.choice([-1, 1]) if rng.random() < 0.1 else 0), original.Journal))
+    for _ in range(n-len(targets)): # Articles that aren't among the candidates.
+        targets.append(Article.Article(" ".join(rng.choice(words) for _ in range(8)), [rng.choice(surnames)],
+                                       rng.randint(1900, 2015), rng.choice(journals)))
+
+    start = time.time()
+    index = BlockingIndex(candidates)
+    indexTime = time.time()-start
+    start = time.time()
+    results = index.match(targets)
+    matchTime = time.time()-start
+    nCorrect = sum(1 for (c, _), i in zip(results, sources) if c == i)
+    nFalse = sum(1 for c, _ in results[len(sources):] if c is not None)
+    return {'targets': len(targets), 'candidates': len(candidates), 'index': indexTime, 'match': matchTime,
+            'recall': float(nCorrect)/len(sources), 'falseMatches': float(nFalse)/max(1, len(targets)-len(sources))}
+
+if __name__ == '__main__':
+    import sys
+    result = benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
+    print ("{targets} targets, {candidates} candidates: index built in {index:.2f} s, matched in {match:.2f} s, "
+           "{recall:.1%} of the findable targets matched correctly, {falseMatches:.1%} of the others matched to something.").format(**result)
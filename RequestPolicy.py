@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 23:31:47 2026
+
+Get as many pages per minute as a server is willing to give instead of hammering
+it and losing the pages it refuses. Every host gets a token bucket whose rate
+goes down when the host signals that it's overloaded (429, 503 with Retry-After
+or a redirect to a captcha page) and slowly back up while it answers, and a circuit breaker that
+stops sending it requests for a while after it keeps failing. Failed requests
+are retried after an exponential backoff with jitter and redirects are followed.
+
+Running this file checks that the circuit breaker recovers from a throttled
+probe and harvests from a throttling stand-in with and without a policy.
+
+@author: Alek
+@version: 1.0.1
+@since: Sun Oct 18 23:31:47 2026
+
+CHANGELOG:
+Sun Oct 18 23:31:47 2026 - 1.0.0 - Alek - Issued the first version.
+                         - 1.0.1 - Alek - A throttled request opens a half-open circuit breaker again.
+"""
+import httplib, random, re, threading, time, urlparse
+
+CaptchaPattern = re.compile('/sorry/|captcha', re.IGNORECASE) # Where Google Scholar sends the clients it thinks are robots.
+RedirectStatuses = (301, 302, 303, 307, 308)
+ThrottleStatuses = (429, 503) # Too Many Requests and Service Unavailable, the latter only with a Retry-After.
+
+class ThrottledError(IOError):
+    """ The host kept refusing to serve a page because of too many requests. """
+
+class CircuitOpenError(IOError):
+    """ No requests are being sent to the host because it kept failing. """
+
+class TokenBucket(object):
+    """ Lets requests through at a rate that backs off multiplicatively when the
+    host throttles us and grows additively while it doesn't (AIMD, like TCP).
+    Can be shared between many threads.
+    """
+    def __init__(self, rate, burst=1., minRate=0.1, maxRate=None, increase=0.1, decrease=0.5, holdOff=1.):
+        """ Initialise a full bucket.
+
+        Arguments
+        ----------
+        @param rate - float, initial number of requests let through per second.
+        @param burst - float, how many requests may be let through at once after
+            a quiet period (default=1).
+        @param minRate - float, the rate is never decreased below this (default=0.1).
+        @param maxRate - float, the rate is never increased above this; ten times
+            the initial rate if None (default).
+        @param increase - float, requests per second added to the rate after every
+            request that wasn't throttled (default=0.1).
+        @param decrease - float, the rate is multiplied by this when throttled (default=0.5).
+        @param holdOff - float, seconds after a decrease during which further throttled
+            requests, likely sent before the decrease, don't decrease the rate again (default=1).
+        """
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.minRate = minRate
+        self.maxRate = maxRate if maxRate is not None else 10.*rate
+        self.increase = increase
+        self.decrease = decrease
+        self.holdOff = holdOff
+        self.lock = threading.Lock()
+        self.tokens = self.burst # Negative when requests have booked the tokens that haven't been refilled yet.
+        self.lastRefill = time.time()
+        self.lastDecrease = float('-inf')
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now-self.lastRefill)*self.rate)
+        self.lastRefill = now
+
+    def acquire(self):
+        """ Block until a request may be sent. """
+        with self.lock: # Book a token, then sleep outside the lock until it's been refilled.
+            now = time.time()
+            self.refill(now)
+            self.tokens -= 1.
+            wait = -self.tokens/self.rate if self.tokens < 0 else 0.
+        if wait > 0:
+            time.sleep(wait)
+
+    def slowDown(self, retryAfter=None):
+        """ Decrease the rate after being throttled and make sure that the next
+        request isn't sent before retryAfter (float) seconds if it's given.
+        """
+        with self.lock:
+            now = time.time()
+            self.refill(now)
+            if now-self.lastDecrease >= self.holdOff:
+                self.rate = max(self.minRate, self.rate*self.decrease)
+                self.lastDecrease = now
+            self.tokens = min(self.tokens, 0.)
+            if retryAfter:
+                self.tokens = min(self.tokens, -retryAfter*self.rate)
+
+    def speedUp(self):
+        """ Increase the rate after a request that wasn't throttled. """
+        with self.lock:
+            self.rate = min(self.maxRate, self.rate+self.increase)
+
+class CircuitBreaker(object):
+    """ Stops sending requests to a host after failureThreshold consecutive
+    failures (open), lets one request through after resetTimeout seconds to see if
+    the host is back (half-open) and lets all of them through again if it
+    succeeds (closed).
+    """
+    def __init__(self, failureThreshold=5, resetTimeout=30.):
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self.lock = threading.Lock()
+        self.state = 'closed'
+        self.nFailures = 0 # Consecutive ones.
+        self.openedAt = None
+
+    def allow(self):
+        """ Check whether a request may be sent now. """
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.time()-self.openedAt >= self.resetTimeout:
+                self.state = 'halfOpen' # Only this request is let through until we know how it went.
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            self.state = 'closed'
+            self.nFailures = 0
+
+    def failure(self):
+        with self.lock:
+            self.nFailures += 1
+            if self.state == 'halfOpen' or self.nFailures >= self.failureThreshold:
+                self.state = 'open'
+                self.openedAt = time.time()
+
+    def throttled(self):
+        """ A request was throttled: that's not a failure, but if it was the one let
+        through to see if the host is back, wait another resetTimeout before the
+        next one instead of staying half-open and rejecting all of them.
+        """
+        with self.lock:
+            if self.state == 'halfOpen':
+                self.state = 'open'
+                self.openedAt = time.time()
+
+    def retryIn(self):
+        """ Seconds until the breaker lets a request through again. """
+        with self.lock:
+            if self.state != 'open':
+                return 0.
+            return max(0., self.openedAt+self.resetTimeout-time.time())
+
+class RequestPolicy(object):
+    """ Sends requests through a TokenBucket and a CircuitBreaker of their host,
+    retries and follows redirects. Can be shared between many threads; it doesn't
+    send the requests itself, so any transport can be used.
+
+    Example
+    ----------
+    <tt>
+    > policy = RequestPolicy(rate=2., maxRetries=5)\n
+    > pool = HTTPTransport.ConnectionPool()\n
+    > def send(url):\n
+    >     parts = urlparse.urlsplit(url)\n
+    >     return pool.request(parts.hostname, parts.port, "GET", parts.path+"?"+parts.query)\n
+    > resp = policy.fetch("http://scholar.google.com/scholar?q=gene", send)
+    </tt>
+    """
+    def __init__(self, rate=5., maxRetries=5, maxRedirects=5, baseDelay=0.5, maxDelay=60., failureThreshold=5,
+                 resetTimeout=30., seed=None, **bucketSettings):
+        """ Initialise the policy.
+
+        Arguments
+        ----------
+        @param rate - float, initial number of requests per second sent to every host (default=5).
+        @param maxRetries - int, how many times to retry a request that failed or
+            was throttled before giving up (default=5).
+        @param maxRedirects - int, how many redirects to follow at most (default=5).
+        @param baseDelay - float, seconds to wait at most before the first retry;
+            the maximum doubles with every retry, the wait is random (default=0.5).
+        @param maxDelay - float, never wait longer than this many seconds before a retry (default=60).
+        @param failureThreshold, resetTimeout - @see CircuitBreaker.
+        @param seed - seed of the random numbers of the jitter; random if None (default).
+        @param bucketSettings - further settings of the TokenBuckets of the hosts, @see TokenBucket.
+        """
+        self.rate = rate
+        self.maxRetries = maxRetries
+        self.maxRedirects = maxRedirects
+        self.baseDelay = baseDelay
+        self.maxDelay = maxDelay
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self.bucketSettings = bucketSettings
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.hosts = {} # host : (TokenBucket, CircuitBreaker).
+        self.nRequests = 0 # Sent, including the retries and redirects.
+        self.nRetries = 0
+        self.nThrottled = 0 # Responses telling us to slow down.
+        self.nRedirects = 0 # Followed.
+        self.nFailures = 0 # Exceptions and server errors.
+        self.nRejected = 0 # Requests not sent because a circuit breaker was open.
+
+    def hostState(self, host):
+        """ Get the (TokenBucket, CircuitBreaker) of host, str with the host and port. """
+        with self.lock:
+            state = self.hosts.get(host)
+            if state is None:
+                state = self.hosts[host] = (TokenBucket(self.rate, **self.bucketSettings),
+                                            CircuitBreaker(self.failureThreshold, self.resetTimeout))
+            return state
+
+    def backoff(self, attempt, retryAfter=None):
+        """ Sleep before retry number attempt (1, 2, ...): a random time up to
+        baseDelay*2**(attempt-1) ("full jitter", so that the retries of many threads
+        don't come in waves) but at least retryAfter seconds if the host asked for it.
+        """
+        with self.lock:
+            self.nRetries += 1
+            delay = self.rng.uniform(0, min(self.maxDelay, self.baseDelay*2**(attempt-1)))
+        time.sleep(min(self.maxDelay, max(delay, retryAfter or 0.)))
+
+    def fetch(self, url, send):
+        """ Get the page at url, retrying and following redirects as needed.
+
+        Arguments
+        ----------
+        @param url - str, absolute URL of the page.
+        @param send - callable that sends one request to an absolute URL and returns
+            a response with status (int), getheader(name) and body, e.g. an
+            HTTPTransport.Response; it may raise IOError or httplib.HTTPException.
+
+        Returns
+        ----------
+        @return the response to the last request sent; it has a url attribute with
+            the URL the page came from after the redirects. Its status isn't a
+            redirect, a throttle or a server error unless the retries ran out.
+
+        Raises
+        ----------
+        ThrottledError when the host kept throttling us until the retries ran out,
+        CircuitOpenError when the host's circuit breaker doesn't let the request through,
+        IOError or httplib.HTTPException of the last attempt when all of them failed.
+        """
+        attempt = 0
+        nRedirects = 0
+        while True:
+            host = urlparse.urlsplit(url).netloc
+            bucket, breaker = self.hostState(host)
+            if not breaker.allow():
+                with self.lock:
+                    self.nRejected += 1
+                raise CircuitOpenError("Not sending requests to {} for {:.1f} s after {} failures: {}".format(
+                                       host, breaker.retryIn(), breaker.nFailures, url))
+            bucket.acquire()
+            with self.lock:
+                self.nRequests += 1
+            try:
+                resp = send(url)
+            except (IOError, httplib.HTTPException): # socket.error is an IOError.
+                breaker.failure()
+                with self.lock:
+                    self.nFailures += 1
+                if attempt >= self.maxRetries:
+                    raise
+                attempt += 1
+                self.backoff(attempt)
+                continue
+
+            location = resp.getheader('location') if resp.status in RedirectStatuses else None
+            target = urlparse.urljoin(url, location) if location else None
+            if target is not None and not CaptchaPattern.search(target):
+                breaker.success()
+                nRedirects += 1
+                if nRedirects > self.maxRedirects:
+                    raise IOError("More than {} redirects: {}".format(self.maxRedirects, url))
+                with self.lock:
+                    self.nRedirects += 1
+                url = target
+                continue
+
+            retryAfter = parseRetryAfter(resp.getheader('retry-after'))
+            if resp.status == 429 or (resp.status == 503 and retryAfter is not None) or target is not None: # The latter redirects to a captcha.
+                bucket.slowDown(retryAfter)
+                if resp.status == 503:
+                    breaker.failure()
+                else:
+                    breaker.throttled()
+                with self.lock:
+                    self.nThrottled += 1
+                if attempt >= self.maxRetries:
+                    raise ThrottledError("Throttled by {} {} times, last status {}: {}".format(host, attempt+1, resp.status, url))
+                attempt += 1
+                self.backoff(attempt, retryAfter)
+                continue
+
+            if resp.status >= 500:
+                breaker.failure()
+                with self.lock:
+                    self.nFailures += 1
+                if attempt < self.maxRetries:
+                    attempt += 1
+                    self.backoff(attempt)
+                    continue
+            else:
+                breaker.success()
+                bucket.speedUp()
+            resp.url = url
+            return resp
+
+    def summary(self):
+        """ Get a dict with the counters and the current rate of every host. """
+        with self.lock:
+            return {'requests': self.nRequests, 'retries': self.nRetries, 'throttled': self.nThrottled,
+                    'redirects': self.nRedirects, 'failures': self.nFailures, 'rejected': self.nRejected,
+                    'rates': dict((host, bucket.rate) for host, (bucket, breaker) in self.hosts.items())}
+
+def parseRetryAfter(value):
+    """ Get the seconds from a Retry-After header or None; dates aren't understood. """
+    try:
+        return max(0., float(value))
+    except (TypeError, ValueError):
+        return None
+
+def checkCircuitBreaker():
+    """ Check that a breaker whose half-open probe gets throttled opens again and
+    that a later successful request closes it; raises AssertionError if not.
+    """
+    import HTTPTransport
+    policy = RequestPolicy(rate=1000., maxRetries=0, failureThreshold=1, resetTimeout=0.05, seed=0)
+    answers = [] # Statuses the stand-in send gives, one per request.
+    def send(url):
+        return HTTPTransport.Response(answers.pop(0), "", {}, "")
+    def fetch():
+        try:
+            return policy.fetch("http://host/page", send).status
+        except IOError as e:
+            return type(e).__name__
+    bucket, breaker = policy.hostState("host")
+    answers.append(500)
+    assert fetch() == 500 and breaker.state == 'open'
+    assert fetch() == 'CircuitOpenError'
+    time.sleep(0.06)
+    answers.append(429)
+    assert fetch() == 'ThrottledError' and breaker.state == 'open' and breaker.retryIn() > 0.
+    assert fetch() == 'CircuitOpenError'
+    time.sleep(0.06)
+    answers.append(200)
+    assert fetch() == 200 and breaker.state == 'closed'
+
+if __name__ == '__main__':
+    checkCircuitBreaker()
+    print "A throttled probe opens the circuit breaker again and a successful one closes it."
+    import StandInServer, GoogleScholarSearch, Metrics
+    from multiprocessing.pool import ThreadPool
+    " Harvest the pages of a stand-in that allows 20 requests/s, with and without a policy. "
+    for throttle in ['429', 'captcha']:
+        for policy in [None, RequestPolicy(rate=10., maxRetries=8, baseDelay=0.2, seed=0)]:
+            server = StandInServer.startServer(StandInServer.ScholarHandler, latency=0.01, errorRate=0.02, redirectRate=0.05,
+                                               maxRequestsPerSecond=20., throttle=throttle, nPages=6000)
+            metrics = Metrics.MetricsRegistry() # Counts the redirects the engine gives up on.
+            engine = GoogleScholarSearch.GoogleScholarSearchEngine("127.0.0.1", server.server_address[1], parser='strainer',
+                                                                   policy=policy, metrics=metrics)
+            def getPage(start):
+                try:
+                    return len(engine.getArticlesFromPage(engine.getResultPageURL("/scholar?q=probe", start), ["probe"])) > 0
+                except IOError:
+                    return False
+            start = time.time()
+            pool = ThreadPool(8)
+            results = pool.map(getPage, range(0, 6000, 20))
+            pool.close()
+            elapsed = time.time()-start
+            print "Throttling with {}, {}: {} of {} pages in {:.1f} s, {:.0f} pages/min, {} requests sent, {} redirects not followed.".format(
+                throttle, "no policy" if policy is None else "policy", sum(results), len(results), elapsed,
+                60*sum(results)/elapsed, server.nRequests, metrics.summary()['counters'].get('scholar.status.302', 0))
+            if policy is not None:
+                print "    {}".format(policy.summary())
+            engine.close()
+            server.shutdown()
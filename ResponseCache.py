@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:40:05 2026
+
+An on-disk cache of downloaded web pages, so that re-running a search doesn't
+download the same result pages again. Entries expire after a given time and the
+least recently used ones are removed when the cache grows too large.
+
+@author: Alek
+@version: 1.0.1
+@since: Sun Oct 18 11:40:05 2026
+
+CHANGELOG:
+Sun Oct 18 11:40:05 2026 - 1.0.0 - Alek - Issued the first version.
+                         - 1.0.1 - Alek - Sort the query fields of normalised URLs as they are, without re-encoding them.
+"""
+import os, time, zlib, hashlib, threading, urlparse, collections
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def normaliseURL(url):
+    """ Bring a URL to a form that is the same for all the URLs that point to
+    the same resource: lower-case scheme and host, no default port, no fragment
+    and the fields of the query sorted. It's a key to look the URL up by, not
+    necessarily a URL that can be fetched.
+
+    Arguments
+    ----------
+    @param url - str with an absolute URL.
+
+    Returns
+    ----------
+    @return str with the normalised URL.
+    """
+    parts = urlparse.urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host += ":{}".format(parts.port)
+    query = "&".join(sorted(parts.query.split("&"))) if parts.query else "" # As they are, e.g. 'a' and 'a=' may differ.
+    return urlparse.urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+class ResponseCache(object):
+    """ Keeps zlib-compressed bodies of web pages in a directory, one file per
+    normalised URL. Every file starts with a line holding the time when the page
+    was downloaded; the access time of the file records when it was last used.
+
+    Attributes
+    ----------
+    hits - int, how many times a page has been found in the cache.
+    misses - int, how many times a page hasn't been found or has expired.
+    evictions - int, how many pages have been removed to keep the cache small.
+
+    Example
+    ----------
+    <tt>
+    > cache = ResponseCache("pageCache", ttl=24*3600)\n
+    > engine = GoogleScholarSearch.GoogleScholarSearchEngine(cache=cache)
+    </tt>
+    """
+    def __init__(self, directory, ttl=24*3600., maxSize=256*1024**2, offline=False):
+        """ Open the cache in a directory, create it if needed.
+
+        Arguments
+        ----------
+        @param directory - str, where to keep the cached pages.
+        @param ttl - float, number of seconds after which a page is downloaded
+            again (default=one day); None means the pages never expire.
+        @param maxSize - int, maximum number of bytes on disk taken by the cached
+            pages; the least recently used ones are removed above it (default=256 MB).
+        @param offline - bool, if True the users of the cache shouldn't go on-line
+            and raise IOError for pages that aren't cached (default=False).
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.maxSize = maxSize
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        " Read what's already in the cache, least recently used first. "
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(".z"):
+                st = os.stat(os.path.join(directory, name))
+                entries.append( (st.st_atime, name, st.st_size) )
+        self.entries = collections.OrderedDict( (name, size) for _, name, size in sorted(entries) )
+        self.size = sum(self.entries.values())
+
+    def path(self, url):
+        """ Name of the file where the page at url is stored. """
+        return os.path.join(self.directory, hashlib.sha1(normaliseURL(url)).hexdigest()+".z")
+
+    def get(self, url):
+        """ Get the body of the page at url if it's in the cache and hasn't expired.
+
+        Arguments
+        ----------
+        @param url - str, absolute URL of the page.
+
+        Returns
+        ----------
+        @return str with the body of the page or None if it has to be downloaded.
+        """
+        fileName = self.path(url)
+        name = os.path.basename(fileName)
+        with self.lock:
+            if not name in self.entries:
+                self.misses += 1
+                return None
+            try:
+                with open(fileName, 'rb') as f:
+                    storedTime = float(f.readline())
+                    data = f.read()
+            except (IOError, OSError, ValueError): # Removed or corrupted by someone else.
+                self.remove(name)
+                self.misses += 1
+                return None
+            if self.ttl is not None and time.time()-storedTime > self.ttl:
+                self.remove(name)
+                self.misses += 1
+                return None
+            os.utime(fileName, (time.time(), storedTime)) # Mark as recently used.
+            self.entries[name] = self.entries.pop(name)
+            self.hits += 1
+        return zlib.decompress(data)
+
+    def put(self, url, body):
+        """ Store the body of the page at url in the cache.
+
+        Arguments
+        ----------
+        @param url - str, absolute URL of the page.
+        @param body - str with the body of the page.
+        """
+        fileName = self.path(url)
+        name = os.path.basename(fileName)
+        now = time.time()
+        data = "{!r}\n".format(now) + zlib.compress(body, 6)
+        tempName = "{}.{}.tmp".format(fileName, threading.current_thread().ident)
+        with open(tempName, 'wb') as f:
+            f.write(data)
+        with self.lock:
+            os.rename(tempName, fileName) # Readers never see a half-written file.
+            self.size -= self.entries.pop(name, 0)
+            self.entries[name] = len(data)
+            self.size += len(data)
+            while self.size > self.maxSize and len(self.entries) > 1:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def remove(self, name):
+        """ Remove the file called name from the cache; the lock must be held. """
+        self.size -= self.entries.pop(name, 0)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def clear(self):
+        """ Remove all the pages from the cache. """
+        with self.lock:
+            for name in list(self.entries):
+                self.remove(name)
+
+    def stats(self):
+        """ Get a dict with the hits, misses and evictions counters, the number
+        of cached pages and their size in bytes.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self.entries), 'size': self.size}
@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:25:10 2026
+
+A local HTTP server that stands in for the web sites we scrape, so that the
+crawler and the search engines can be tried out and timed without going on-line.
+It serves a synthetic graph of pages that link to each other and some of which
+mention the keywords netWorm looks out for.
+
+It can also make synthetic CiteULike.org and Google Scholar results pages, and
+serve the latter with "Cited by" links that make up a synthetic citation graph,
+or replay recorded pages. All the servers can answer slowly, fail some of the
+requests on purpose, throttle clients that send too many requests, redirect
+some of the requests and compress the pages for the clients that accept it.
+
+Running this file benchmarks netWorm.NetWorm against the stand-in and the
+CiteULike.org and Google Scholar results page parsers on the synthetic pages.
+
+@author: Alek
+@version: 1.2.0
+@since: Sun Oct 18 14:25:10 2026
+
+CHANGELOG:
+Sun Oct 18 14:25:10 2026 - 1.0.0 - Alek - Issued the first version.
+                         - 1.1.0 - Alek - Throttling with 429s or captcha redirects and redirects of some requests.
+                         - 1.2.0 - Alek - gzip or deflate compression of the pages.
+"""
+import BaseHTTPServer, SocketServer, threading, random, time, re, urlparse, urllib, zlib
+
+PagePattern = re.compile('^/page/(\d+)$') # Path of a page in the synthetic link graph.
+MovedPrefix = "/moved" # Redirected requests are sent here, followed by their original path.
+Surnames = ["H.M. Mott-Smith", "I. Langmuir", "L. Tonks", "D. Bohm", "J.E. Allen", "F.F. Chen", "I.H. Hutchinson",
+            "P.M. Chung", "L. Talbot", "K.J. Touryan", "J.G. Laframboise", "R.L. Merlino"] # Authors of the synthetic articles.
+
+class StandInHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """ Serves every request in its own thread, like a real web server would. """
+    daemon_threads = True
+    allow_reuse_address = True
+
+class LinkGraphHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """ Serves /page/<n> for n in [0, server.nPages), every page links to
+    server.linksPerPage other pages picked at random (but always the same ones
+    for the same n) and every server.keywordEvery-th page mentions server.keyword.
+    """
+    protocol_version = "HTTP/1.1" # Keep-alive like the real servers.
+
+    def do_GET(self):
+        if not self.startRequest():
+            return
+        server = self.server
+        m = PagePattern.match(self.path)
+        if m is None or int(m.group(1)) >= server.nPages:
+            self.sendBody(404, "<html><body>Not found</body></html>")
+            return
+        self.sendBody(200, linkGraphPage(int(m.group(1)), server.nPages, server.linksPerPage,
+                                         server.keyword, server.keywordEvery, server.hosts))
+
+    def startRequest(self):
+        """ Count the request, wait for server.latency, throttle the requests above
+        server.maxRequestsPerSecond, fail server.errorRate of the requests on purpose
+        with a 503 and redirect server.redirectRate of them to MovedPrefix+path.
+
+        Returns
+        ----------
+        @return bool, False if the request has already been answered with an error
+            or a redirect.
+        """
+        server = self.server
+        moved = self.path.startswith(MovedPrefix)
+        if moved: # Serve what was asked for before the redirect.
+            self.path = self.path[len(MovedPrefix):]
+        with server.lock:
+            server.nRequests += 1
+            throttle = server.maxRequestsPerSecond is not None and not self.takeToken()
+            fail = not throttle and server.errorRate > 0 and server.rng.random() < server.errorRate
+            redirect = not (throttle or fail or moved) and server.redirectRate > 0 and server.rng.random() < server.redirectRate
+            server.nThrottled += throttle
+            server.nErrors += fail
+            server.nRedirects += redirect
+        if server.latency > 0:
+            time.sleep(server.latency)
+        if throttle and server.throttle == 'captcha': # The way Google Scholar does it.
+            self.sendBody(302, "<html><body>Moved</body></html>", {"Location": "/sorry/index?continue=" + urllib.quote(self.path)})
+        elif throttle:
+            self.sendBody(429, "<html><body>Too many requests</body></html>", {"Retry-After": "1"})
+        elif fail:
+            self.sendBody(503, "<html><body>Service unavailable</body></html>")
+        elif redirect:
+            self.sendBody(302, "<html><body>Moved</body></html>", {"Location": MovedPrefix + self.path})
+        else:
+            return True
+        return False
+
+    def takeToken(self):
+        """ Take a token from the server's bucket of server.maxRequestsPerSecond,
+        which holds a quarter of a second's worth of them; call with server.lock held.
+
+        Returns
+        ----------
+        @return bool, False if the bucket is empty and the request should be throttled.
+        """
+        server = self.server
+        now = time.time()
+        burst = max(1., server.maxRequestsPerSecond/4.)
+        server.tokens = min(burst, server.tokens + (now-server.lastRefill)*server.maxRequestsPerSecond)
+        server.lastRefill = now
+        if server.tokens < 1.:
+            return False
+        server.tokens -= 1.
+        return True
+
+    def sendBody(self, status, body, headers={}):
+        """ Send a response with body, compressed with the first encoding in
+        server.compress that the client accepts.
+        """
+        accepted = [e.split(";")[0].strip().lower() for e in self.headers.getheader("Accept-Encoding", "").split(",")]
+        encoding = next((e for e in self.server.compress if e in accepted), None)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if encoding is not None:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16+zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS)
+            body = compressor.compress(body) + compressor.flush()
+            self.send_header("Content-Encoding", encoding)
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Don't print every request.
+
+class ScholarHandler(LinkGraphHandler):
+    """ Serves synthetic Google Scholar results pages at /scholar, @see scholarPage;
+    understands the start, num and cites parameters. There are server.nPages
+    articles, cited at most server.maxCitations times each.
+    """
+    def do_GET(self):
+        if not self.startRequest():
+            return
+        server = self.server
+        parts = urlparse.urlsplit(self.path)
+        query = dict(urlparse.parse_qsl(parts.query))
+        if parts.path != "/scholar":
+            self.sendBody(404, "<html><body>Not found</body></html>")
+            return
+        try:
+            start, num = int(query.get('start', 0)), int(query.get('num', 10))
+            cites = int(query['cites']) if 'cites' in query else None
+        except ValueError:
+            self.sendBody(400, "<html><body>Bad request</body></html>")
+            return
+        self.sendBody(200, scholarPage(start, num, server.nPages, cites, server.maxCitations))
+
+class ReplayHandler(LinkGraphHandler):
+    """ Serves recorded pages from server.corpus, a dict of the normalised path
+    and query of every page (@see replayKey) : str with its body.
+    """
+    def do_GET(self):
+        if not self.startRequest():
+            return
+        body = self.server.corpus.get(replayKey(self.path))
+        if body is None:
+            self.sendBody(404, "<html><body>Not found</body></html>")
+        else:
+            self.sendBody(200, body)
+
+def replayKey(url):
+    """ Get the path and query of url with the query parameters sorted, so that
+    e.g. '/scholar?start=0&num=20&cites=7' and '/scholar?cites=7&num=20&start=0'
+    are the same page. Percent-encoded characters are decoded, because clients
+    quote URLs differently.
+    """
+    parts = urlparse.urlsplit(url)
+    query = "&".join(sorted(urllib.unquote(p) for p in parts.query.split("&"))) if parts.query else ""
+    return urllib.unquote(parts.path) + ("?" + query if query else "")
+
+def linkGraphPage(n, nPages, linksPerPage, keyword="TerraPower", keywordEvery=10, hosts=[]):
+    """ Make the HTML of page n of the synthetic link graph.
+
+    Arguments
+    ----------
+    @param n - int, index of the page.
+    @param nPages - int, number of pages in the graph.
+    @param linksPerPage - int, number of links on every page.
+    @param keyword - str to mention on some of the pages.
+    @param keywordEvery - int, every how many pages the keyword is mentioned.
+    @param hosts - list of str with "host:port" to spread absolute links over;
+        relative links are used if empty.
+
+    Returns
+    ----------
+    @return str with the HTML of the page.
+    """
+    rng = random.Random(n)
+    links = []
+    for i in range(linksPerPage):
+        target = rng.randrange(nPages)
+        if hosts:
+            links.append('<a href="http://{}/page/{}">Page {}</a>'.format(hosts[target%len(hosts)], target, target))
+        else:
+            links.append('<a href="/page/{}">Page {}</a>'.format(target, target))
+        links.append('<a href="#section{}">Section</a>'.format(i)) # Same page, shouldn't be crawled again.
+    text = "Page {} talks about {}.".format(n, keyword if n%keywordEvery == 0 else "something else")
+    return "<html><head><title>Page {}</title></head><body><p>{}</p><div>{}</div></body></html>".format(
+            n, text, "\n".join(links))
+
+def citeULikePage(pageNo, nArticles=50):
+    """ Make the HTML of a synthetic CiteULike.org results page, laid out the way
+    DownloadArticles.getArticlesCiteULike expects.
+
+    Arguments
+    ----------
+    @param pageNo - int, number of the page, decides the article IDs.
+    @param nArticles - int, number of articles on the page.
+
+    Returns
+    ----------
+    @return str with the HTML of the page.
+    """
+    rng = random.Random(pageNo)
+    lines = ["<html><body><table>"]
+    for i in range(nArticles):
+        articleID = pageNo*nArticles+i
+        lines += ['<tr class="list {{article_id:{}}}" data-article_id={}>'.format(articleID, articleID),
+                  '<td><h2><a class="title" href="/article/{}"><span class="hidden">&nbsp;</span>Article number {} about probes</a></h2>'.format(articleID, articleID),
+                  "<div class='vague'><i>Journal of Synthetic Results {}</i> ({} {}) Vol. {} No. {} <a href='http://dx.doi.org/10.1000/{}'>doi:10.1000/{}</a></div>".format(
+                      rng.randint(1, 20), rng.choice(["Jan", "Jun", "Dec"]), rng.randint(1900, 2015), rng.randint(1, 99), rng.randint(1, 12), articleID, articleID),
+                  '<div>by ' + ", ".join('<a class="author" href="/author/{}">{}</a>'.format(a.replace(" ", ""), a) for a in rng.sample(Surnames, 3)) + '</div>',
+                  '<span class="taglist">' + " ".join('<a href="/tag/{}">{}</a>'.format(t, t) for t in rng.sample(["langmuir", "probe", "plasma", "sheath", "theory"], 2)) + '</span>',
+                  '<h3>Abstract</h3>',
+                  '<p>Synthetic abstract of article {} with some words in it.</p>'.format(articleID),
+                  '<div class="posted">posted to <a href="/group/{}">a group</a> by <a href="/user/u{}">u{}</a> {} days ago</div>'.format(
+                      rng.randint(1, 100), rng.randint(1, 5000), rng.randint(1, 5000), rng.randint(1, 999)),
+                  '<div class="buttons"><a href="/copy/{}">Copy</a> <a href="/export/{}">Export</a></div>'.format(articleID, articleID),
+                  '<script type="text/javascript">showPopup({});</script>'.format(articleID),
+                  '</td></tr>']
+        lines += ['<!-- spacer -->', '<tr class="spacer"><td colspan="3"></td></tr>'] # The real pages have plenty of these.
+    lines.append("</table></body></html>")
+    return "\n".join(lines)
+
+def scholarCiters(n, nArticles=1000, maxCitations=30):
+    """ Get the indices of the synthetic Google Scholar articles that cite article n,
+    always the same ones for the same n. Some articles aren't cited at all.
+    """
+    rng = random.Random("cites{}".format(n))
+    if rng.random() < 0.2:
+        return []
+    return [c for c in rng.sample(xrange(nArticles), min(nArticles, rng.randint(1, maxCitations))) if c != n]
+
+def scholarPage(start, num=20, nResults=1000, cites=None, maxCitations=30):
+    """ Make the HTML of a synthetic Google Scholar results page, laid out the way
+    GoogleScholarSearch.GoogleScholarSearchEngine.parseArticles expects. Some
+    records link to the full text, some are [CITATION]s and some aren't cited.
+    The "Cited by" links lead to pages of the articles that cite every article,
+    @see scholarCiters, so the synthetic articles make up a citation graph.
+
+    Arguments
+    ----------
+    @param start - int, index of the first result on the page.
+    @param num - int, number of results per page.
+    @param nResults - int, total number of synthetic articles; the results are all
+        of them unless cites is given. The page is shorter or empty past the last one.
+    @param cites - int, index of the article whose citing articles to list instead;
+        all the articles if None (default).
+    @param maxCitations - int, maximum number of citations of any article.
+
+    Returns
+    ----------
+    @return str with the HTML of the page.
+    """
+    results = range(nResults) if cites is None else scholarCiters(cites, nResults, maxCitations)
+    lines = ['<html><head><title>Synthetic Scholar</title><script>var gs_ie=0;</script></head><body>',
+             '<div id="gs_hdr"><a href="/scholar?hl=en">Scholar</a> <a href="/citations">My Citations</a></div>',
+             '<div id="gs_ccl">']
+    for n in results[start:start+num]:
+        rng = random.Random(n)
+        lines.append('<div class="gs_r gs_or gs_scl" data-cid="c{}">'.format(n))
+        if rng.random() < 0.3: # Link to the full text, the title link comes second.
+            lines.append('<div class="gs_ggs gs_fl"><div class="gs_ggsd"><a href="http://example.org/{}.pdf"><span class="gs_ctg2">[PDF]</span> example.org</a></div></div>'.format(n))
+        lines.append('<div class="gs_ri">')
+        if rng.random() < 0.1: # Not an actual article.
+            lines.append('<h3 class="gs_rt"><span class="gs_ct1">[CITATION]</span> <span class="gs_ct2">[C]</span> Cited work number {}</h3>'.format(n))
+        else:
+            lines.append('<h3 class="gs_rt"><a href="http://example.org/article/{}">Synthetic article number {} about <b>probes</b></a></h3>'.format(n, n))
+        lines.append('<div class="gs_a">{} - {}, {} - example.org</div>'.format(
+            ", ".join(a.replace(".", "") for a in rng.sample(Surnames, rng.randint(1, 4))),
+            rng.choice(["Physics of Plasmas", "Journal of Applied Physics", "Synthetic Results"]), rng.randint(1900, 2015)))
+        lines.append('<div class="gs_rs">Synthetic abstract of article {} with&nbsp;some <b>words</b> in it&#8230;</div>'.format(n))
+        links = []
+        nCitations = len(scholarCiters(n, nResults, maxCitations))
+        if nCitations > 0:
+            links.append('<a href="/scholar?cites={}&amp;as_sdt=2005&amp;sciodt=0,5&amp;hl=en">Cited by {}</a>'.format(n, nCitations))
+        links.append('<a href="/scholar?q=related:c{}:scholar.google.com/&amp;hl=en">Related articles</a>'.format(n))
+        links.append('<a href="/scholar?cluster={}&amp;hl=en">All {} versions</a>'.format(n, rng.randint(2, 9)))
+        links.append('<a href="#" onclick="return gs_ocit(event,\'c{}\')">Cite</a>'.format(n))
+        lines.append('<div class="gs_fl">{}</div></div></div>'.format(" ".join(links)))
+        lines.append('<!-- record {} -->'.format(n))
+    lines.append('</div><div id="gs_n"><a href="/scholar?start={}&amp;num={}">Next</a></div></body></html>'.format(start+num, num))
+    return "\n".join(lines)
+
+def startServer(handler=LinkGraphHandler, port=0, latency=0., errorRate=0., maxRequestsPerSecond=None, throttle='429',
+                redirectRate=0., compress=['gzip', 'deflate'], **settings):
+    """ Start a stand-in server in a background thread.
+
+    Arguments
+    ----------
+    @param handler - BaseHTTPServer.BaseHTTPRequestHandler subclass that serves the requests.
+    @param port - int, port to listen on at 127.0.0.1; any free one if 0 (default).
+    @param latency - float, seconds to wait before answering every request (default=0).
+    @param errorRate - float, fraction of the requests answered with 503 Service
+        Unavailable, picked at random (default=0).
+    @param maxRequestsPerSecond - float, requests above this rate are throttled;
+        none are if None (default).
+    @param throttle - str, how to throttle: '429' answers Too Many Requests with
+        Retry-After (default), 'captcha' redirects to /sorry/index like Google Scholar.
+    @param redirectRate - float, fraction of the requests redirected to the same
+        path under MovedPrefix, picked at random (default=0).
+    @param compress - list of str, content encodings the pages may be compressed
+        with, in order of preference (default=['gzip', 'deflate']); they're sent
+        uncompressed to clients that accept none of them or if it's empty.
+    @param settings - further attributes of the server used by the handler, e.g.
+        nPages, linksPerPage, keyword, keywordEvery and hosts for LinkGraphHandler
+        or nPages and maxCitations for ScholarHandler or corpus for ReplayHandler.
+
+    Returns
+    ----------
+    @return StandInHTTPServer; its address is server.server_address, stop it
+        with server.shutdown().
+    """
+    server = StandInHTTPServer(("127.0.0.1", port), handler)
+    server.lock = threading.Lock()
+    server.nRequests = 0
+    server.nErrors = 0
+    server.latency = latency
+    server.errorRate = errorRate
+    server.maxRequestsPerSecond = maxRequestsPerSecond
+    server.throttle = throttle
+    server.redirectRate = redirectRate
+    server.compress = compress
+    server.nThrottled = 0
+    server.nRedirects = 0
+    server.tokens = max(1., maxRequestsPerSecond/4.) if maxRequestsPerSecond else 1. # A full bucket.
+    server.lastRefill = time.time()
+    server.rng = random.Random(0)
+    defaults = {'nPages': 1000, 'linksPerPage': 10, 'keyword': "TerraPower", 'keywordEvery': 10, 'hosts': [], 'maxCitations': 30}
+    defaults.update(settings)
+    for name, value in defaults.items():
+        setattr(server, name, value)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+if __name__ == '__main__':
+    import netWorm
+    server = startServer(latency=0.05, nPages=2000, linksPerPage=10)
+    port = server.server_address[1]
+    # Two names of the same server to have two hosts to be polite to.
+    server.hosts = ["127.0.0.1:{}".format(port), "localhost:{}".format(port)]
+    for nWorkers in [1, 4, 16]:
+        worm = netWorm.NetWorm(["TerraPower"], nWorkers=nWorkers, minDelay=0., maxPerHost=nWorkers, verbose=False)
+        start = time.time()
+        worm.crawl(["http://127.0.0.1:{}/page/0".format(port)], maxPages=300)
+        elapsed = time.time()-start
+        print "{:d} workers: {:d} pages in {:.2f} s, {:.1f} pages/s, {:d} of interest".format(
+            nWorkers, worm.nVisited, elapsed, worm.nVisited/elapsed, len(worm.urlsOfInterest))
+    server.shutdown()
+
+    import DownloadArticles
+    rates = DownloadArticles.benchmarkCiteULikeParser([citeULikePage(n) for n in range(50)])
+    for name in sorted(rates):
+        print "{}: {:.1f} CiteULike.org pages/s".format(name, rates[name])
+
+    import GoogleScholarSearch
+    rates = GoogleScholarSearch.benchmarkParsers([scholarPage(n*20) for n in range(50)])
+    for name in sorted(rates):
+        print "{}: {:.1f} Google Scholar pages/s".format(name, rates[name])
@@ -0,0 +1,442 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 01:12:40 2026
+
+Search the titles, abstracts and keywords of the harvested Articles without
+going through all of them. An inverted index keeps, for every term, the articles
+that contain it, how many times and where; queries are ranked with BM25 and can
+require phrases and a range of years.
+
+Articles are added to a buffer in memory, which is written to the index's
+directory as an immutable segment when it's full or flushed. A segment is a few
+flat numpy arrays and a file with its sorted terms, all memory-mapped when the
+index is opened, so opening doesn't read the postings and a query only reads
+the postings of its terms.
+
+Running this file indexes synthetic abstracts and times opening and querying.
+
+@author: Alek
+@version: 1.0.1
+@since: Mon Oct 19 01:12:40 2026
+
+CHANGELOG:
+Mon Oct 19 01:12:40 2026 - 1.0.0 - Alek - Issued the first version.
+                         - 1.0.1 - Alek - Replace the segment left behind by a flush that didn't finish.
+"""
+import array, json, math, mmap, os, re, shutil
+import numpy
+from ArticleStore import asInt
+
+TokenPattern = re.compile('\w+', re.UNICODE) # Terms are runs of letters and digits.
+PhrasePattern = re.compile('"([^"]*)"') # Phrases are quoted in the queries.
+FieldGap = 16 # Positions skipped between the fields, so that the phrases don't span them.
+SegmentArrays = ['termOffsets', 'postingOffsets', 'docs', 'freqs', 'positionOffsets', 'positions', 'lengths', 'years', 'externalIDs']
+
+def tokenise(text):
+    """ Get the lower-case terms of text (str in UTF-8 or unicode) as a list of str in UTF-8. """
+    if isinstance(text, str):
+        text = text.decode('utf-8', 'ignore')
+    return [term.encode('utf-8') for term in TokenPattern.findall(text.lower())]
+
+def parseQuery(query):
+    """ Split query into its terms and its quoted phrases.
+
+    Returns
+    ----------
+    @return tuple of (list of str with the terms, list of lists of str with the
+        terms of every phrase); the phrases' terms are among the former too.
+    """
+    phrases = [tokenise(phrase) for phrase in PhrasePattern.findall(query)]
+    phrases = [phrase for phrase in phrases if phrase]
+    terms = tokenise(PhrasePattern.sub(" ", query))
+    for phrase in phrases:
+        terms.extend(phrase)
+    unique = []
+    for term in terms:
+        if not term in unique:
+            unique.append(term)
+    return unique, phrases
+
+class Segment(object):
+    """ Postings of a batch of documents, which never change.
+
+    The terms are sorted and concatenated in termBlob, term i being
+    termBlob[termOffsets[i]:termOffsets[i+1]]. Its postings are
+    postingOffsets[i]:postingOffsets[i+1] in docs (local numbers of the documents,
+    increasing) and freqs (how many times the term is in them). The positions of
+    the term in the document of posting j are positions[positionOffsets[j]:positionOffsets[j+1]],
+    positionOffsets[j] being sum(freqs[:j]). lengths, years and externalIDs have
+    one entry per document.
+    """
+    def __init__(self, termBlob, arrays, termsFile=None):
+        self.termBlob = termBlob
+        for name in SegmentArrays:
+            setattr(self, name, arrays[name])
+        self.nTerms = len(self.termOffsets)-1
+        self.nDocs = len(self.lengths)
+        self.termsFile = termsFile
+        self.docBase = 0 # Number of the first document in the index.
+
+    @classmethod
+    def load(cls, directory):
+        """ Open a segment written by write, memory-mapping all of it. """
+        arrays = dict((name, numpy.load(os.path.join(directory, name+".npy"), mmap_mode='r')) for name in SegmentArrays)
+        termsFile = open(os.path.join(directory, "terms.bin"), 'rb')
+        size = os.fstat(termsFile.fileno()).st_size
+        termBlob = mmap.mmap(termsFile.fileno(), size, access=mmap.ACCESS_READ) if size > 0 else ""
+        return cls(termBlob, arrays, termsFile)
+
+    def write(self, directory):
+        """ Write the segment to directory, which is created. """
+        os.makedirs(directory)
+        for name in SegmentArrays:
+            numpy.save(os.path.join(directory, name+".npy"), numpy.asarray(getattr(self, name)))
+        with open(os.path.join(directory, "terms.bin"), 'wb') as f:
+            f.write(self.termBlob[:])
+
+    def close(self):
+        if self.termsFile is not None:
+            if not isinstance(self.termBlob, str):
+                self.termBlob.close()
+            self.termsFile.close()
+            self.termsFile = None
+
+    def term(self, i):
+        return self.termBlob[int(self.termOffsets[i]):int(self.termOffsets[i+1])]
+
+    def postingRange(self, term):
+        """ Find the postings of term (str in UTF-8) by bisecting the terms.
+
+        Returns
+        ----------
+        @return tuple of int (start, end) of the postings in docs, (0, 0) if there are none.
+        """
+        low, high = 0, self.nTerms
+        while low < high:
+            middle = (low+high)//2
+            if self.term(middle) < term:
+                low = middle+1
+            else:
+                high = middle
+        if low < self.nTerms and self.term(low) == term:
+            return int(self.postingOffsets[low]), int(self.postingOffsets[low+1])
+        return 0, 0
+
+    def hasPhrases(self, docs, phrases):
+        """ Check which of docs (local numbers) contain all the phrases.
+
+        Returns
+        ----------
+        @return numpy array of bool, one per document.
+        """
+        keep = numpy.ones(len(docs), dtype=bool)
+        for phrase in phrases:
+            starts = None # Document and position at which the phrase might start, as doc*2**32+position.
+            for offset, term in enumerate(phrase):
+                start, end = self.postingRange(term)
+                first, last = self.positionOffsets[start], self.positionOffsets[end]
+                termDocs = numpy.repeat(self.docs[start:end].astype(numpy.int64), self.freqs[start:end])
+                termStarts = termDocs*2**32 + self.positions[first:last] + (len(phrase)-offset)
+                starts = termStarts if starts is None else numpy.intersect1d(starts, termStarts, assume_unique=True)
+            keep &= numpy.in1d(docs, starts//2**32)
+        return keep
+
+class SegmentBuilder(object):
+    """ Postings of the documents added since the last flush, in memory. """
+    def __init__(self):
+        self.postings = {} # term : (array of local document numbers, array of frequencies, array of positions).
+        self.lengths = array.array('i')
+        self.years = array.array('i')
+        self.externalIDs = array.array('l')
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, fields, year, externalID):
+        """ Add a document made of fields (list of str or unicode), return its local number. """
+        doc = len(self.lengths)
+        termPositions = {}
+        position, length = 0, 0
+        for field in fields:
+            terms = tokenise(field)
+            for i, term in enumerate(terms):
+                termPositions.setdefault(term, []).append(position+i)
+            position += len(terms)+FieldGap
+            length += len(terms)
+        for term, positions in termPositions.iteritems():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = (array.array('i'), array.array('i'), array.array('i'))
+            posting[0].append(doc)
+            posting[1].append(len(positions))
+            posting[2].extend(positions)
+        self.lengths.append(length)
+        self.years.append(year)
+        self.externalIDs.append(externalID)
+        return doc
+
+    def build(self):
+        """ Make a Segment out of the postings. """
+        terms = sorted(self.postings)
+        def concatenate(part, dtype):
+            arrays = [numpy.frombuffer(self.postings[term][part], dtype=numpy.int32) for term in terms]
+            return numpy.concatenate(arrays).astype(dtype) if arrays else numpy.zeros(0, dtype=dtype)
+        termOffsets = numpy.zeros(len(terms)+1, dtype=numpy.int64)
+        numpy.cumsum([len(term) for term in terms], out=termOffsets[1:])
+        postingOffsets = numpy.zeros(len(terms)+1, dtype=numpy.int64)
+        numpy.cumsum([len(self.postings[term][0]) for term in terms], out=postingOffsets[1:])
+        freqs = concatenate(1, numpy.int32)
+        positionOffsets = numpy.zeros(len(freqs)+1, dtype=numpy.int64)
+        numpy.cumsum(freqs, out=positionOffsets[1:])
+        arrays = {'termOffsets': termOffsets, 'postingOffsets': postingOffsets, 'docs': concatenate(0, numpy.int32),
+                  'freqs': freqs, 'positionOffsets': positionOffsets, 'positions': concatenate(2, numpy.int32),
+                  'lengths': numpy.array(self.lengths, dtype=numpy.int32), 'years': numpy.array(self.years, dtype=numpy.int32),
+                  'externalIDs': numpy.array(self.externalIDs, dtype=numpy.int64)}
+        return Segment("".join(terms), arrays)
+
+class TextIndex(object):
+    """ Full-text index of the titles, abstracts and keywords of Articles.
+
+    Example
+    ----------
+    <tt>
+    > index = TextIndex("articles.index")\n
+    > for article in articles:\n
+    >     index.add(article)\n
+    > index.flush()\n
+    > for doc, score in index.search('langmuir "sheath edge"', limit=10, yearFrom=1990):\n
+    >     print score, articles[index.externalID(doc)].Title
+    </tt>
+    """
+    def __init__(self, directory=None, flushEvery=100000, k1=1.2, b=0.75):
+        """ Open the index in directory or create it there if it doesn't exist.
+
+        Arguments
+        ----------
+        @param directory - str with the directory of the index; it's kept in memory
+            only if None (default).
+        @param flushEvery - int, write the added documents to a new segment every
+            this many documents (default=100000).
+        @param k1, b - float, parameters of BM25: how quickly the score saturates
+            with the frequency of a term (default=1.2) and how much it's normalised
+            by the length of the document (default=0.75).
+        """
+        self.directory = directory
+        self.flushEvery = flushEvery
+        self.k1 = k1
+        self.b = b
+        self.segments = []
+        self.segmentNames = []
+        self.totalLength = 0 # Of all the documents, in terms.
+        self.buffer = SegmentBuilder()
+        self.bufferSegment = None # Segment of the buffer to search, built when needed.
+        if directory is not None and os.path.exists(os.path.join(directory, "index.json")):
+            with open(os.path.join(directory, "index.json")) as f:
+                meta = json.load(f)
+            self.totalLength = meta['totalLength']
+            for name in meta['segments']:
+                self.addSegment(Segment.load(os.path.join(directory, name)), name)
+
+    def __len__(self):
+        return sum(segment.nDocs for segment in self.segments) + len(self.buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def addSegment(self, segment, name):
+        segment.docBase = sum(s.nDocs for s in self.segments)
+        self.segments.append(segment)
+        self.segmentNames.append(name)
+
+    def add(self, article, externalID=-1):
+        """ Add the Title, Abstract and Keywords of article to the index.
+
+        Arguments
+        ----------
+        @param article - Article.Article to index.
+        @param externalID - int to remember with the article, e.g. its index in a
+            list or its ID in an ArticleRepository (default=-1).
+
+        Returns
+        ----------
+        @return int, number of the document of article in the index.
+        """
+        doc = len(self)
+        fields = [article.Title or "", article.Abstract or ""] + list(article.Keywords or [])
+        self.buffer.add(fields, max(asInt(article.Year, 0), 0), externalID)
+        self.totalLength += self.buffer.lengths[-1]
+        self.bufferSegment = None
+        if len(self.buffer) >= self.flushEvery:
+            self.flush()
+        return doc
+
+    def flush(self):
+        """ Turn the documents added since the last flush into a segment and write
+        it to the directory, if the index has one.
+        """
+        if len(self.buffer) == 0:
+            return
+        segment = self.buffer.build()
+        name = "segment{}".format(len(self.segments))
+        if self.directory is not None:
+            if os.path.exists(os.path.join(self.directory, name)): # Written by a flush that didn't list it, may be incomplete.
+                shutil.rmtree(os.path.join(self.directory, name))
+            segment.write(os.path.join(self.directory, name))
+            segment = Segment.load(os.path.join(self.directory, name)) # Memory-map it instead of keeping it in memory.
+        self.addSegment(segment, name)
+        self.buffer = SegmentBuilder()
+        self.bufferSegment = None
+        if self.directory is not None: # Replace the list of segments atomically, only the complete segments get listed.
+            tempName = os.path.join(self.directory, "index.json.tmp")
+            with open(tempName, 'w') as f:
+                json.dump({'segments': self.segmentNames, 'totalLength': self.totalLength}, f)
+            os.rename(tempName, os.path.join(self.directory, "index.json"))
+
+    def close(self):
+        """ Flush the added documents and unmap the segments. """
+        self.flush()
+        for segment in self.segments:
+            segment.close()
+
+    def searchedSegments(self):
+        """ Get all the segments and that of the buffer, if it's got anything. """
+        if len(self.buffer) == 0:
+            return self.segments
+        if self.bufferSegment is None:
+            self.bufferSegment = self.buffer.build()
+            self.bufferSegment.docBase = sum(s.nDocs for s in self.segments)
+        return self.segments + [self.bufferSegment]
+
+    def search(self, query, limit=10, yearFrom=None, yearTo=None):
+        """ Find the documents that best match query.
+
+        Arguments
+        ----------
+        @param query - str with the terms and quoted phrases to look for, e.g.
+            'langmuir "sheath edge"'. Documents are ranked by BM25 of all the
+            terms and the phrases must be in them.
+        @param limit - int, maximum number of documents to return (default=10).
+        @param yearFrom, yearTo - int, only return documents published in these years
+            or between them, documents without a year are left out; no limit if None (default).
+
+        Returns
+        ----------
+        @return list of tuples of (int number of the document, float score), the
+            best first; @see externalID.
+        """
+        terms, phrases = parseQuery(query)
+        segments = self.searchedSegments()
+        nDocs = len(self)
+        if len(terms) == 0 or nDocs == 0:
+            return []
+        averageLength = max(self.totalLength/float(nDocs), 1.)
+        ranges = [[segment.postingRange(term) for term in terms] for segment in segments]
+        idfs = []
+        for i in range(len(terms)):
+            df = sum(r[i][1]-r[i][0] for r in ranges)
+            idfs.append(math.log(1. + (nDocs-df+0.5)/(df+0.5)))
+
+        found, scores = [], []
+        for segment, segmentRanges in zip(segments, ranges):
+            docs, partial = [], []
+            for idf, (start, end) in zip(idfs, segmentRanges):
+                if end == start:
+                    continue
+                termDocs = segment.docs[start:end]
+                tf = segment.freqs[start:end].astype(numpy.float64)
+                norm = self.k1*(1.-self.b + self.b*segment.lengths[termDocs]/averageLength)
+                docs.append(termDocs)
+                partial.append(idf*tf*(self.k1+1.)/(tf+norm))
+            if len(docs) == 0:
+                continue
+            docs, inverse = numpy.unique(numpy.concatenate(docs), return_inverse=True)
+            segmentScores = numpy.bincount(inverse, weights=numpy.concatenate(partial))
+            keep = numpy.ones(len(docs), dtype=bool)
+            if yearFrom is not None or yearTo is not None:
+                years = segment.years[docs]
+                keep &= years > 0
+                if yearFrom is not None:
+                    keep &= years >= yearFrom
+                if yearTo is not None:
+                    keep &= years <= yearTo
+            if phrases:
+                keep[keep] = segment.hasPhrases(docs[keep], phrases)
+            found.append(docs[keep].astype(numpy.int64) + segment.docBase)
+            scores.append(segmentScores[keep])
+        if len(found) == 0:
+            return []
+        found, scores = numpy.concatenate(found), numpy.concatenate(scores)
+        if len(found) > limit:
+            best = numpy.argpartition(-scores, limit-1)[:limit]
+            found, scores = found[best], scores[best]
+        order = numpy.lexsort((found, -scores)) # Ties go to the documents added first.
+        return [(int(found[i]), float(scores[i])) for i in order]
+
+    def segmentOf(self, doc):
+        for segment in self.searchedSegments():
+            if doc < segment.docBase + segment.nDocs:
+                return segment
+        raise IndexError("No document {} in the index of {}.".format(doc, len(self)))
+
+    def externalID(self, doc):
+        """ Get the externalID given to the article of document number doc. """
+        segment = self.segmentOf(doc)
+        return int(segment.externalIDs[doc-segment.docBase])
+
+    def year(self, doc):
+        """ Get the year of document number doc, 0 if it's not known. """
+        segment = self.segmentOf(doc)
+        return int(segment.years[doc-segment.docBase])
+
+def benchmark(n=200000, directory="textIndex.benchmark", nQueries=200, seed=0):
+    """ Index n synthetic abstracts in directory, open the index again and time
+    queries of two random terms, of a phrase and of a term with years.
+
+    Returns
+    ----------
+    @return dict with the seconds taken to index, flush and open, and the mean
+        milliseconds per query of every kind.
+    """
+    import random, time, Article
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10))) for _ in range(30000)]
+    weights = [1./(i+1) for i in range(len(words))] # Zipf-like, as in real text.
+    cumulative = numpy.cumsum(weights)/sum(weights)
+    def text(nWords):
+        return " ".join(words[i] for i in numpy.searchsorted(cumulative, [rng.random() for _ in range(nWords)]))
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+
+    start = time.time()
+    index = TextIndex(directory, flushEvery=n//4+1)
+    for i in range(n):
+        index.add(Article.Article(text(10), [], rng.randint(1950, 2015), "", abstract=text(120), tagList=[text(2)]), i)
+    indexed = time.time()
+    index.close()
+    flushed = time.time()
+    index = TextIndex(directory)
+    opened = time.time()
+    results = {'indexSeconds': indexed-start, 'flushSeconds': flushed-indexed, 'openSeconds': opened-flushed}
+    queries = {'terms': ["{} {}".format(rng.choice(words[:3000]), rng.choice(words[:3000])) for _ in range(nQueries)],
+               'phrase': ['"{}"'.format(text(2)) for _ in range(nQueries)],
+               'years': ["{}".format(rng.choice(words[:3000])) for _ in range(nQueries)]}
+    for kind in ['terms', 'phrase', 'years']:
+        start = time.time()
+        for query in queries[kind]:
+            index.search(query, 10, *((1990, 2000) if kind == 'years' else (None, None)))
+        results[kind+'QueryMilliseconds'] = 1000*(time.time()-start)/nQueries
+    index.close()
+    shutil.rmtree(directory)
+    return results
+
+if __name__ == '__main__':
+    import sys
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    result = benchmark(n)
+    print ("{} articles indexed in {indexSeconds:.2f} s, flushed in {flushSeconds:.2f} s, opened in {openSeconds:.4f} s.").format(n, **result)
+    print ("Mean query times: {termsQueryMilliseconds:.2f} ms for two terms, {phraseQueryMilliseconds:.2f} ms for a phrase, "
+           "{yearsQueryMilliseconds:.2f} ms for a term and a range of years.").format(**result)
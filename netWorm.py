@@ -5,9 +5,15 @@ Created on Fri Oct  2 17:58:41 2015
 @author: artur
 """
 
-import urllib2, copy
+import urllib2, threading, time, heapq, collections, Queue
 from bs4 import BeautifulSoup
-from urlparse import urljoin
+from urlparse import urljoin, urlsplit
+from CrawlFrontier import CrawlFrontier
+from KeywordMatcher import KeywordMatcher
+from LinkExtractor import extractLinks
+from Checkpoint import Checkpoint
+from HTTPTransport import Response, AcceptEncoding, readBody
+from Pipeline import ParserPool
 
 # what keywords to look out for
 keywords = [
@@ -15,9 +21,6 @@ keywords = [
     'Bill Gates',
     ]
 
-# this will bookmark pages of interest
-urlsOfInterest = []
-
 # start list of urls to initiate the search
 urls = [
 #    'https://en.wikipedia.org/wiki/Portal:Contents',
@@ -37,48 +40,406 @@ urls = [
 hdrs = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.11 (KHTML, like Gecko) Chrome/23.0.1271.64 Safari/537.11',
        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
        'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.3',
-       'Accept-Encoding': 'none',
+       'Accept-Encoding': AcceptEncoding, # Pages are decompressed as they're read.
        'Accept-Language': 'en-US,en;q=0.8',
        'Connection': 'keep-alive'}
 
-# holds visited sites - avoid going around in circles
-visited = copy.deepcopy(urls)
+ParserWorm = None # NetWorm that parses the pages in a parser process, @see initParserProcess.
+
+class PolitenessScheduler(object):
+    """ Decides which hosts may be sent a request now: at most maxPerHost requests
+    to a host may be in flight and consecutive requests to it have to be started
+    at least minDelay seconds apart. Hosts are kept in a heap ordered by the time
+    when they become ready, so picking the next one doesn't depend on how many
+    hosts there are. Not thread-safe, meant to be used by one dispatching thread.
+    """
+    def __init__(self, minDelay=1.0, maxPerHost=1):
+        self.minDelay = minDelay
+        self.maxPerHost = maxPerHost
+        self.pending = {} # host : deque of urls waiting to be fetched.
+        self.inFlight = collections.defaultdict(int) # host : number of requests being fetched.
+        self.lastStart = {} # host : time when the last request to it was started.
+        self.heap = [] # (time when ready, host) for the hosts that have pending urls and aren't at maxPerHost.
+        self.inHeap = set()
+        self.nPending = 0
+
+    def add(self, url):
+        """ Queue url to be fetched when its host is ready. """
+        host = urlsplit(url).netloc
+        self.pending.setdefault(host, collections.deque()).append(url)
+        self.nPending += 1
+        self.schedule(host)
+
+    def schedule(self, host):
+        """ Put host in the heap if it has pending urls and may be sent a request. """
+        if host in self.inHeap or not self.pending.get(host) or self.inFlight[host] >= self.maxPerHost:
+            return
+        heapq.heappush(self.heap, (self.lastStart.get(host, 0.)+self.minDelay, host))
+        self.inHeap.add(host)
+
+    def next(self, now):
+        """ Get a url whose host is ready at time now or None if there isn't one. """
+        if not self.heap or self.heap[0][0] > now:
+            return None
+        _, host = heapq.heappop(self.heap)
+        self.inHeap.discard(host)
+        url = self.pending[host].popleft()
+        if not self.pending[host]:
+            del self.pending[host]
+        self.nPending -= 1
+        self.inFlight[host] += 1
+        self.lastStart[host] = now
+        self.schedule(host)
+        return url
 
-# keep looping until there are no more sites to search or stopping criteria has been reached
-while (len(urls) > 0) and (len(visited) < 10000):
-    # skip over invalid links
-#    try:
+    def done(self, url):
+        """ Mark the request to url as finished. """
+        host = urlsplit(url).netloc
+        self.inFlight[host] -= 1
+        if self.inFlight[host] == 0:
+            del self.inFlight[host]
+        self.schedule(host)
+
+    def pendingURLs(self):
+        """ Get a list of all the urls waiting to be fetched. """
+        return [url for urls in self.pending.itervalues() for url in urls]
+
+    def timeToNext(self, now):
+        """ Seconds until the next host becomes ready, None if no host is waiting. """
+        if not self.heap:
+            return None
+        return max(0., self.heap[0][0]-now)
+
+def fetchPage(url, headers=hdrs, timeout=10):
+    """ Download the source of the page at url, decompressed if it was sent compressed. """
     # request the page, supply extra config stuff found on the web
-    req = urllib2.Request(urls[0], headers=hdrs)
-    
-    # attempt to access the source of the current url - treat the urls list as a stack
-    currentContent = urllib2.urlopen(req, timeout = 10).read()
-    
-    # search the contents for whatever may be of interest
-    for key in keywords:
-        if key in currentContent:
-            print key, urls[0]
-            if not urls[0] in urlsOfInterest:
-                urlsOfInterest.append(urls[0])
-#    except:
-#        currentContent = ''
-    
-    # remove the current url from the list of sites to search
-    visited.append(urls[0])
-    urls.pop(0)
-    
+    req = urllib2.Request(url, headers=headers)
+    resp = urllib2.urlopen(req, timeout=timeout)
+    return readBody(resp, resp.info().getheader('content-encoding'))[0]
+
+class NoRedirectHandler(urllib2.HTTPRedirectHandler):
+    """ Makes urllib2 return the redirects as HTTPErrors, so that the RequestPolicy
+    can tell the redirects to captchas from the rest.
+    """
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+def initParserProcess(keywords, caseSensitive, wholeWords):
+    """ Set up a parser process for parsePage, @see Pipeline.ParserPool. """
+    global ParserWorm
+    ParserWorm = NetWorm(keywords, caseSensitive=caseSensitive, wholeWords=wholeWords)
+
+def parsePage(url, content):
+    """ Parse a page in a parser process, @see NetWorm.parse. """
+    return ParserWorm.parse(url, content)
+
+def findLinks(url, content):
+    """ Get all the absolute urls linked to from content of the page at url by
+    building the whole soup; LinkExtractor.extractLinks finds the same ones faster.
+    """
     # create a soup
-    soup = BeautifulSoup(currentContent)
+    soup = BeautifulSoup(content, "html.parser")
     soup.prettify()
-    
+
     # find all urls available on this site
-    for tag in soup.findAll('a',href=True):
-        # make the url absolute (e.g. add https://en.wikipedia.org at the beginning)
-        link = urljoin(visited[-1], tag['href'])
-        
-        # keep this link for future searches only if it's not been visited before
-        if link and link not in visited:
-            urls.append(link)
-    
-    print "Searched {:d} sites, have {:d} on the stack".format(len(visited),len(urls))
-    
\ No newline at end of file
+    # make the url absolute (e.g. add https://en.wikipedia.org at the beginning)
+    return [urljoin(url, tag['href']) for tag in soup.findAll('a',href=True)]
+
+class NetWorm(object):
+    """ Crawls the web starting from given urls and bookmarks the pages that
+    mention any of the keywords. Pages are downloaded by a pool of worker threads,
+    a single dispatching thread keeps the frontier and decides what to download
+    next so that no host is asked too often.
+
+    Example
+    ----------
+    <tt>
+    > worm = NetWorm(['TerraPower'], nWorkers=8, minDelay=0.5)\n
+    > worm.crawl(['http://www.bbc.co.uk/news/business'], maxPages=1000)\n
+    > print worm.urlsOfInterest
+    </tt>
+    """
+    def __init__(self, keywords, nWorkers=8, minDelay=1.0, maxPerHost=1, headers=hdrs, timeout=10, verbose=True,
+                 caseSensitive=True, wholeWords=False, metrics=None, policy=None, nParsers=0):
+        """ Initialise the crawler.
+
+        Arguments
+        ----------
+        @param keywords - list of str to look out for in the sources of the pages.
+        @param nWorkers - int, maximum number of pages downloaded at the same time (default=8).
+        @param minDelay - float, minimum number of seconds between starting two
+            requests to the same host (default=1).
+        @param maxPerHost - int, maximum number of requests in flight to the same host (default=1).
+        @param headers - dict of str with the headers sent with every request.
+        @param timeout - float, socket timeout in seconds (default=10).
+        @param verbose - bool, whether to print the progress and the pages of interest (default=True).
+        @param caseSensitive - bool, whether the keywords have to match the case of the page (default=True).
+        @param wholeWords - bool, whether the keywords may only match whole words (default=False).
+        @param metrics - Metrics.MetricsRegistry where an event is recorded for every
+            page under 'netWorm'; nothing is recorded if None (default). urllib2
+            connects when sending the request, so 'firstByte' includes connecting.
+        @param policy - RequestPolicy.RequestPolicy that adapts the rate of the
+            requests to every host to its throttling, retries them and follows the
+            redirects; urllib2 sends every request once and follows the redirects
+            if None (default).
+        @param nParsers - int, number of processes that look for the keywords and
+            the links in the pages while the workers download the next ones; the
+            workers do it if 0 (default). The parsing time isn't in the metrics then.
+        """
+        self.keywords = keywords
+        self.caseSensitive = caseSensitive
+        self.wholeWords = wholeWords
+        self.matcher = KeywordMatcher(keywords, caseSensitive, wholeWords) # Looks for few keywords one by one and for many in one pass over the page.
+        self.nWorkers = nWorkers
+        self.minDelay = minDelay
+        self.maxPerHost = maxPerHost
+        self.headers = headers
+        self.timeout = timeout
+        self.verbose = verbose
+        self.stopEvent = threading.Event()
+        # this will bookmark pages of interest
+        self.urlsOfInterest = []
+        self.nVisited = 0
+        self.nErrors = 0
+        self.metrics = metrics
+        self.policy = policy
+        self.nParsers = nParsers
+        self.opener = urllib2.build_opener(NoRedirectHandler)
+
+    def stop(self):
+        """ Stop crawling after the pages being downloaded now are finished. """
+        self.stopEvent.set()
+
+    def visit(self, url):
+        """ Download url and process it, runs in the worker threads.
+
+        Returns
+        ----------
+        @return tuple of (list of str with the keywords found, list of str with
+            the absolute urls linked to from the page).
+        """
+        if self.metrics is None:
+            return self.parse(url, self.download(url))
+        event = {'url': url}
+        try:
+            currentContent = self.download(url, event)
+            downloaded = time.time()
+            found, links = self.parse(url, currentContent)
+            event.update(parse=time.time()-downloaded, records=len(links))
+            return found, links
+        finally:
+            self.metrics.record('netWorm', event)
+
+    def download(self, url, event=None):
+        """ Download the source of the page at url, through the policy if there's one.
+
+        Arguments
+        ----------
+        @param url - str with the url of the page.
+        @param event - dict where the 'status', the numbers of 'bytes' received
+            and 'pageBytes' after decompressing and the timings are put, and the
+            'error' if there is one; nowhere if None (default). The policy reads
+            whole responses, so with one the retries and the body count as 'firstByte'.
+
+        Returns
+        ----------
+        @return str with the source of the page.
+        """
+        if event is None:
+            if self.policy is None:
+                return fetchPage(url, self.headers, self.timeout)
+            return self.fetch(url)
+        try:
+            start = time.time()
+            if self.policy is None:
+                resp = urllib2.urlopen(urllib2.Request(url, headers=self.headers), timeout=self.timeout)
+                firstByte = time.time()
+                currentContent, wireBytes = readBody(resp, resp.info().getheader('content-encoding'))
+                status = resp.getcode()
+            else:
+                resp = self.policy.fetch(url, self.sendRequest)
+                firstByte = time.time()
+                currentContent, wireBytes = self.checkResponse(resp), resp.wireBytes
+                status = 200
+            event.update(status=status, bytes=wireBytes, pageBytes=len(currentContent), firstByte=firstByte-start, body=time.time()-firstByte)
+            return currentContent
+        except urllib2.HTTPError as e:
+            event.update(status=e.code, error=type(e).__name__)
+            raise
+        except Exception as e:
+            event['error'] = type(e).__name__
+            raise
+
+    def parse(self, url, currentContent):
+        """ Find the keywords in and the links from the source of the page at url, @see visit. """
+        # search the contents for whatever may be of interest
+        matched = self.matcher.matchedKeywords(currentContent)
+        found = [key for key in self.keywords if key in matched]
+        return found, extractLinks(url, currentContent)
+
+    def fetch(self, url):
+        """ Download the source of the page at url through the policy.
+
+        Raises
+        ----------
+        urllib2.HTTPError if the final response isn't 200 OK, like urllib2.urlopen,
+        @see also RequestPolicy.RequestPolicy.fetch.
+        """
+        return self.checkResponse(self.policy.fetch(url, self.sendRequest))
+
+    @staticmethod
+    def checkResponse(resp):
+        """ Get the body of a Response from the policy, raise urllib2.HTTPError unless it's 200 OK. """
+        if resp.status != 200:
+            raise urllib2.HTTPError(resp.url, resp.status, resp.reason, resp.headers, None)
+        return resp.body
+
+    def sendRequest(self, url):
+        """ Send one request to url without following redirects, for the policy. """
+        try:
+            resp = self.opener.open(urllib2.Request(url, headers=self.headers), timeout=self.timeout)
+        except urllib2.HTTPError as resp: # Any status but 200, also a response.
+            pass
+        body, wireBytes = readBody(resp, resp.info().getheader('content-encoding'))
+        response = Response(resp.getcode(), resp.msg, dict(resp.info().items()), body)
+        response.wireBytes = wireBytes
+        return response
+
+    def work(self, tasks, results, parsers=None):
+        """ Main loop of the worker threads; None in tasks stops it. The pages are
+        handed over to parsers, a Pipeline.ParserPool, if it's given; this waits
+        if the parsers have too many of them already.
+        """
+        while True:
+            url = tasks.get()
+            if url is None:
+                return
+            try:
+                if parsers is None:
+                    results.put( (url, self.visit(url), None) )
+                else:
+                    event = {'url': url} if self.metrics is not None else None
+                    try:
+                        currentContent = self.download(url, event)
+                    finally:
+                        if event is not None:
+                            self.metrics.record('netWorm', event)
+                    parsers.submit(parsePage, (url, currentContent), lambda result, error, url=url: results.put( (url, result, error) ))
+            except Exception as e: # skip over invalid links, but don't let the dispatcher wait for them forever
+                results.put( (url, None, e) )
+
+    def crawl(self, seeds, maxPages=10000, useBloomFilter=False, checkpoint=None):
+        """ Crawl the web breadth-first, starting from seeds, until there are no
+        more pages to visit, maxPages have been visited or stop() is called.
+
+        Arguments
+        ----------
+        @param seeds - list of str with the urls to start from.
+        @param maxPages - int, maximum number of pages to download (default=10000).
+        @param useBloomFilter - bool, remember the seen urls in a Bloom filter,
+            @see CrawlFrontier.CrawlFrontier (default=False).
+        @param checkpoint - Checkpoint.Checkpoint to save the state of the crawl to
+            every now and then and when it stops. If something has been saved there,
+            the crawl is resumed from it and seeds are ignored; maxPages then counts
+            the pages visited before too. None means no checkpoints (default).
+
+        Returns
+        ----------
+        @return list of str with the urls of the pages that contain any of the
+            keywords, also kept in self.urlsOfInterest.
+        """
+        # queue of sites to search, remembers every site ever queued - avoid going around in circles
+        frontier = CrawlFrontier(seeds, useBloomFilter=useBloomFilter)
+        scheduler = PolitenessScheduler(self.minDelay, self.maxPerHost)
+        state = checkpoint.load() if checkpoint is not None else None
+        if state is not None: # Resume, the pages that were pending or being downloaded go first.
+            frontier = state['frontier']
+            for url in state['pending']:
+                scheduler.add(url)
+            self.urlsOfInterest, self.nVisited, self.nErrors = state['urlsOfInterest'], state['nVisited'], state['nErrors']
+        inFlightURLs = set()
+        tasks, results = Queue.Queue(), Queue.Queue()
+        parsers = None
+        capacity = self.nWorkers # Pages that may be downloaded or parsed at the same time.
+        if self.nParsers > 0:
+            parsers = ParserPool(self.nParsers, initializer=initParserProcess, initargs=(self.keywords, self.caseSensitive, self.wholeWords))
+            capacity += parsers.maxPending
+        workers = [threading.Thread(target=self.work, args=(tasks, results, parsers)) for i in range(self.nWorkers)]
+        for w in workers:
+            w.daemon = True
+            w.start()
+
+        nDispatched, inFlight = (0 if state is None else state['nVisited']), 0
+        self.stopEvent.clear()
+        try:
+            # keep looping until there are no more sites to search or stopping criteria has been reached
+            while True:
+                while len(frontier) > 0:
+                    scheduler.add(frontier.pop())
+
+                stopping = self.stopEvent.is_set() or nDispatched >= maxPages
+                now = time.time()
+                while not stopping and inFlight < capacity and nDispatched < maxPages:
+                    url = scheduler.next(now)
+                    if url is None:
+                        break
+                    tasks.put(url)
+                    inFlightURLs.add(url)
+                    nDispatched += 1
+                    inFlight += 1
+
+                if inFlight == 0 and (stopping or scheduler.nPending == 0):
+                    break # Nothing being downloaded and nothing more to download.
+
+                # wait for a page to be downloaded or for another host to become ready
+                wait = None if (stopping or inFlight == capacity) else scheduler.timeToNext(now)
+                try:
+                    url, result, error = results.get(timeout=wait if wait is None else max(wait, 1e-3))
+                except Queue.Empty:
+                    continue
+                inFlight -= 1
+                inFlightURLs.discard(url)
+                scheduler.done(url)
+                self.processResult(url, result, error, frontier)
+                if self.verbose:
+                    print "Searched {:d} sites, have {:d} on the stack".format(self.nVisited,len(frontier)+scheduler.nPending)
+                if checkpoint is not None and checkpoint.due():
+                    self.saveCheckpoint(checkpoint, frontier, scheduler.pendingURLs()+list(inFlightURLs))
+        finally:
+            if checkpoint is not None: # Pages still being downloaded will be downloaded again when resuming.
+                self.saveCheckpoint(checkpoint, frontier, scheduler.pendingURLs()+list(inFlightURLs))
+            for w in workers:
+                tasks.put(None)
+            for w in workers:
+                w.join()
+            if parsers is not None:
+                parsers.close()
+        return self.urlsOfInterest
+
+    def saveCheckpoint(self, checkpoint, frontier, pending):
+        """ Save everything needed to resume the crawl, @see crawl. """
+        checkpoint.save({'frontier': frontier, 'pending': pending, 'urlsOfInterest': self.urlsOfInterest,
+                         'nVisited': self.nVisited, 'nErrors': self.nErrors})
+
+    def processResult(self, url, result, error, frontier):
+        """ Bookmark a downloaded page and queue its links, runs in the dispatching thread. """
+        self.nVisited += 1
+        if error is not None:
+            self.nErrors += 1
+            return
+        found, links = result
+        for key in found:
+            if self.verbose:
+                print key, url
+            if not url in self.urlsOfInterest:
+                self.urlsOfInterest.append(url)
+
+        # keep the links for future searches only if they've not been queued before
+        frontier.extend(links)
+
+if __name__ == '__main__':
+    worm = NetWorm(keywords, nWorkers=8, minDelay=1.0, maxPerHost=1)
+    # Re-running this after it's been interrupted carries on from where it stopped.
+    checkpoint = Checkpoint("netWorm.checkpoint", interval=60)
+    urlsOfInterest = worm.crawl(urls, maxPages=10000, checkpoint=checkpoint)
+    checkpoint.remove() # The crawl is finished, the next run starts anew.